@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark do cardápio: N+1 consultas x snapshot em uma consulta
+
+Monta um catálogo (padrão: 2000 produtos, 1 em cada 4 com três variações) e
+compara o /api/produtos antigo (uma consulta de produtos + uma conexão e uma
+consulta de variações por produto) com database.models.get_menu_snapshot.
+Os dois modos montam o mesmo JSON do handler; mede a latência p50/p95 de
+cada um, com e sem filtro de busca.
+
+Uso:
+    python benchmarks/bench_cardapio.py [--produtos 2000] [--repeticoes 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database.db as db
+from database.db import init_db, get_connection, close_all_connections
+from database.models import get_menu_snapshot
+
+
+def popular_banco(num_produtos):
+    init_db()
+    conn = get_connection()
+    cursor = conn.cursor()
+    for i in range(num_produtos):
+        tem_variacoes = 1 if i % 4 == 0 else 0
+        cursor.execute(
+            "INSERT INTO products (name, description, price, stock, category_id, has_variations) VALUES (?, ?, ?, ?, ?, ?)",
+            (f"Produto {i:05d}", "Descrição de teste", 100 + i, 50, 1 + i % 5, tem_variacoes)
+        )
+        if tem_variacoes:
+            product_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO product_variations (product_id, variation_name, price, stock) VALUES (?, ?, ?, ?)",
+                [(product_id, nome, 100 + i, 20) for nome in ("Pequena", "Média", "Grande")]
+            )
+    conn.commit()
+    conn.close()
+
+
+def format_metical(value):
+    return f"{value:,.2f} MT"
+
+
+def variacao_json(v_id, nome, preco, estoque):
+    return {'id': v_id, 'name': nome, 'price': preco, 'price_formatted': format_metical(preco), 'stock': estoque}
+
+
+def produto_json(p_id, nome, descricao, preco, imagem, estoque, tem_variacoes, variacoes):
+    return {
+        'id': p_id,
+        'name': nome,
+        'description': descricao or 'Sem descrição',
+        'price': preco,
+        'price_formatted': format_metical(preco),
+        'image_url': imagem or '/static/default_product.png',
+        'stock': estoque,
+        'has_variations': int(tem_variacoes),
+        'variations': variacoes,
+    }
+
+
+def cardapio_n_mais_1(busca=""):
+    """Reproduz o get_produtos antigo: busca em Python e variações por produto."""
+    conn = get_connection()
+    produtos = conn.execute('''
+        SELECT id, name, description, price, image_url, stock, has_variations
+        FROM products
+        WHERE is_active = 1 AND stock > 0
+        ORDER BY name
+    ''').fetchall()
+    conn.close()
+    if busca:
+        produtos = [p for p in produtos if busca.lower() in p[1].lower()]
+    resultado = []
+    for produto in produtos:
+        variacoes = []
+        if produto[6]:
+            conn = get_connection()
+            variacoes = conn.execute('''
+                SELECT id, variation_name, price, stock
+                FROM product_variations
+                WHERE product_id = ? AND is_active = 1 AND stock > 0
+                ORDER BY variation_name
+            ''', (produto[0],)).fetchall()
+            conn.close()
+        resultado.append(produto_json(*produto, [variacao_json(*v) for v in variacoes]))
+    return resultado
+
+
+def cardapio_snapshot(busca=""):
+    return [
+        produto_json(p['id'], p['name'], p['description'], p['price'], p['image_url'], p['stock'], p['has_variations'],
+                     [variacao_json(v['id'], v['name'], v['price'], v['stock']) for v in p['variations']])
+        for p in get_menu_snapshot(search=busca, in_stock_only=True)
+    ]
+
+
+def medir(funcao, repeticoes, busca=""):
+    funcao(busca)  # aquece cache de páginas e statements
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(busca)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return tempos[len(tempos) // 2] * 1000, tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--produtos", type=int, default=2000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = os.path.join(tmp, "cardapio.db")
+        popular_banco(args.produtos)
+        assert cardapio_n_mais_1() == cardapio_snapshot()
+
+        print(f"{args.produtos} produtos | {args.repeticoes} repetições")
+        print(f"{'modo':<22}{'p50':>10}{'p95':>10}")
+        for busca in ("", "00 1"):
+            rotulo = f" busca={busca!r}" if busca else ""
+            for nome, funcao in (("N+1", cardapio_n_mais_1), ("snapshot", cardapio_snapshot)):
+                p50, p95 = medir(funcao, args.repeticoes, busca)
+                print(f"{nome + rotulo:<22}{p50:>7.1f} ms{p95:>7.1f} ms")
+        close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
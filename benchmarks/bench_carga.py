@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Teste de carga dos fluxos web do cliente e da equipe
+
+Usuários virtuais repetem uma mistura ponderada de cenários reais contra o
+app Flask, até acabar o tempo:
+
+    navegar   GET /api/categorias + GET /api/produtos (categoria ou busca)
+    pedido    POST /api/fazer_pedido
+    equipe    GET /api/pedidos (polling da tela da equipe)
+    pagar     POST /api/pedido/<id>/pagar
+    venda     POST /api/pedido/<id>/finalizar-venda
+
+Pagamentos e vendas usam pedidos criados pelo cenário "pedido" na mesma
+rodada. O app roda no próprio processo (test_client do Flask, uma thread por
+usuário) ou num gunicorn local iniciado com gunicorn.conf.py. O banco é uma
+cópia temporária (de --db ou gerada aqui), então o restaurant.db nunca é
+alterado. O resultado sai em JSON: vazão, latência p50/p95/p99, erros e
+erros de lock ("database is locked") por cenário, para comparar rodadas.
+
+Uso:
+    python benchmarks/bench_carga.py [--modo processo|gunicorn] [--app web_server]
+        [--usuarios 16] [--segundos 30] [--mix navegar=50,pedido=15,equipe=25,pagar=5,venda=5]
+        [--db banco.db] [--saida resultado.json]
+"""
+
+import argparse
+import http.cookiejar
+import importlib
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import database.db as db
+from database.db import init_db, get_pool, hash_password
+
+MIX_PADRAO = {"navegar": 50, "pedido": 15, "equipe": 25, "pagar": 5, "venda": 5}
+USUARIO = ("carga", "carga123")
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def preparar_banco(destino, origem=None, produtos=300, mesas=50):
+    """Copia ``origem`` ou cria um cardápio pequeno; garante o usuário da carga"""
+    if origem:
+        src = sqlite3.connect(origem)
+        dest = sqlite3.connect(destino)
+        src.backup(dest)
+        src.close()
+        dest.close()
+    init_db(destino)
+    conn = sqlite3.connect(destino)
+    if not origem:
+        rnd = random.Random(42)
+        categorias = [row[0] for row in conn.execute("SELECT id FROM categories")]
+        conn.executemany(
+            "INSERT INTO products (name, description, price, stock, category_id, cost_price) VALUES (?, ?, ?, ?, ?, ?)",
+            [(f"Produto {i}", f"Descrição do produto {i}", rnd.randint(50, 900), 10 ** 7, rnd.choice(categorias), 30)
+             for i in range(produtos)]
+        )
+        conn.executemany(
+            "INSERT INTO tables (number, capacity) VALUES (?, ?)",
+            [(n, 10 ** 6) for n in range(1, mesas + 1)]
+        )
+    else:
+        # Estoque e capacidade folgados: a carga mede o servidor, não a regra de negócio
+        conn.execute("UPDATE products SET stock = 10000000")
+        conn.execute("UPDATE tables SET capacity = 1000000")
+    conn.execute(
+        "INSERT OR REPLACE INTO users (username, password, name, role, active) VALUES (?, ?, 'Carga', 'admin', 1)",
+        (USUARIO[0], hash_password(USUARIO[1]))
+    )
+    conn.commit()
+    conn.close()
+    get_pool(destino).clear()
+
+
+class ClienteProcesso:
+    """Cliente sobre o test_client do Flask; cada instância tem os seus cookies"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, payload=None, headers=None):
+        response = self.client.open(path, method=method, json=payload, headers=headers or {})
+        return response.status_code, response.get_data()
+
+
+class ClienteHttp:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, payload=None, headers=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json", **(headers or {})})
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class Resultados:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cenarios = {}
+
+    def registrar(self, cenario, segundos, ok, lock):
+        with self.lock:
+            r = self.cenarios.setdefault(cenario, {"latencias": [], "erros": 0, "erros_lock": 0})
+            r["latencias"].append(segundos)
+            if not ok:
+                r["erros"] += 1
+            if lock:
+                r["erros_lock"] += 1
+
+    def resumo(self, segundos):
+        saida = {}
+        for nome, r in sorted(self.cenarios.items()):
+            lat = r["latencias"]
+            saida[nome] = {
+                "requisicoes": len(lat),
+                "vazao_rps": round(len(lat) / segundos, 2),
+                "p50_ms": round(percentil(lat, 0.50) * 1000, 2),
+                "p95_ms": round(percentil(lat, 0.95) * 1000, 2),
+                "p99_ms": round(percentil(lat, 0.99) * 1000, 2),
+                "erros": r["erros"],
+                "erros_lock": r["erros_lock"],
+            }
+        return saida
+
+
+class UsuarioVirtual:
+    def __init__(self, cliente, catalogo, mix, resultados, pendentes, semente):
+        self.cliente = cliente
+        self.catalogo = catalogo
+        self.cenarios = list(mix)
+        self.pesos = [mix[c] for c in self.cenarios]
+        self.resultados = resultados
+        self.pendentes = pendentes
+        self.rnd = random.Random(semente)
+        self.logado = False
+
+    def chamar(self, cenario, method, path, payload=None, headers=None):
+        inicio = time.perf_counter()
+        try:
+            status, corpo = self.cliente.request(method, path, payload, headers)
+        except OSError:
+            # Conexão recusada/timeout conta como erro do cenário
+            status, corpo = 599, b""
+        segundos = time.perf_counter() - inicio
+        dados = None
+        if corpo[:1] in (b"{", b"["):
+            try:
+                dados = json.loads(corpo)
+            except ValueError:
+                pass
+        ok = status < 400 and not (isinstance(dados, dict) and dados.get("success") is False)
+        self.resultados.registrar(cenario, segundos, ok, b"locked" in corpo)
+        return ok, dados
+
+    def login(self):
+        if not self.logado:
+            ok, _ = self.chamar("login", "POST", "/api/login", {"username": USUARIO[0], "password": USUARIO[1]})
+            self.logado = ok
+
+    def navegar(self):
+        self.chamar("navegar", "GET", "/api/categorias")
+        if self.rnd.random() < 0.3:
+            termo = self.rnd.choice(self.catalogo["nomes"]).split()[0][:4]
+            self.chamar("navegar", "GET", f"/api/produtos?busca={urllib.request.quote(termo)}")
+        else:
+            categoria = self.rnd.choice(self.catalogo["categorias"])
+            self.chamar("navegar", "GET", f"/api/produtos?categoria_id={categoria}")
+
+    def pedido(self):
+        itens = []
+        for produto_id, preco in self.rnd.sample(self.catalogo["produtos"], self.rnd.randint(1, 4)):
+            itens.append({"product_id": produto_id, "quantity": self.rnd.randint(1, 3), "price": preco})
+        ok, dados = self.chamar("pedido", "POST", "/api/fazer_pedido",
+                                {"mesa_id": self.rnd.choice(self.catalogo["mesas"]), "itens": itens},
+                                {"Idempotency-Key": str(uuid.uuid4())})
+        if ok and dados and dados.get("order_id"):
+            with self.pendentes["lock"]:
+                self.pendentes["ids"].append(dados["order_id"])
+
+    def equipe(self):
+        self.login()
+        self.chamar("equipe", "GET", "/api/pedidos")
+
+    def _pagamento(self, cenario, rota):
+        self.login()
+        with self.pendentes["lock"]:
+            order_id = self.pendentes["ids"].pop() if self.pendentes["ids"] else None
+        if order_id is None:
+            return self.pedido()
+        self.chamar(cenario, "POST", f"/api/pedido/{order_id}/{rota}",
+                    {"payment_method": "mpesa", "amount_paid": 0})
+
+    def pagar(self):
+        self._pagamento("pagar", "pagar")
+
+    def venda(self):
+        self._pagamento("venda", "finalizar-venda")
+
+    def rodar(self, parar):
+        while not parar.is_set():
+            getattr(self, self.rnd.choices(self.cenarios, self.pesos)[0])()
+
+
+def ler_catalogo(db_path):
+    conn = sqlite3.connect(db_path)
+    catalogo = {
+        "produtos": conn.execute("SELECT id, price FROM products WHERE is_active = 1").fetchall(),
+        "nomes": [row[0] for row in conn.execute("SELECT name FROM products WHERE is_active = 1")],
+        "categorias": [row[0] for row in conn.execute("SELECT id FROM categories WHERE is_active = 1")],
+        "mesas": [row[0] for row in conn.execute("SELECT id FROM tables")],
+    }
+    conn.close()
+    return catalogo
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_gunicorn(app_modulo, db_path):
+    porta = porta_livre()
+    env = dict(os.environ, PDV_DB_PATH=db_path, PORT=str(porta))
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(RAIZ, "gunicorn.conf.py"),
+         "--bind", f"127.0.0.1:{porta}", f"{app_modulo}:app"],
+        cwd=RAIZ, env=env
+    )
+    base_url = f"http://127.0.0.1:{porta}"
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError("gunicorn terminou antes de aceitar conexões")
+        try:
+            urllib.request.urlopen(base_url + "/api/categorias", timeout=1).read()
+            return processo, base_url
+        except OSError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("gunicorn não respondeu em 30 s")
+
+
+def parse_mix(texto):
+    mix = {}
+    for parte in texto.split(","):
+        nome, _, peso = parte.partition("=")
+        if nome.strip() not in MIX_PADRAO:
+            raise argparse.ArgumentTypeError(f"cenário desconhecido: {nome}")
+        mix[nome.strip()] = float(peso)
+    return {nome: peso for nome, peso in mix.items() if peso > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modo", choices=["processo", "gunicorn"], default="processo")
+    parser.add_argument("--app", default="web_server", help="módulo com o app Flask (ex.: web_server_heroku_improved)")
+    parser.add_argument("--usuarios", type=int, default=16)
+    parser.add_argument("--segundos", type=float, default=30.0)
+    parser.add_argument("--mix", type=parse_mix, default=dict(MIX_PADRAO))
+    parser.add_argument("--db", help="banco de origem (copiado antes da carga)")
+    parser.add_argument("--semente", type=int, default=1)
+    parser.add_argument("--saida", help="arquivo JSON do resultado (padrão: stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "carga.db")
+        preparar_banco(db_path, args.db)
+        catalogo = ler_catalogo(db_path)
+
+        processo = None
+        if args.modo == "gunicorn":
+            processo, base_url = iniciar_gunicorn(args.app, db_path)
+            novo_cliente = lambda: ClienteHttp(base_url)
+        else:
+            db.DB_PATH = db_path
+            app = importlib.import_module(args.app).app
+            novo_cliente = lambda: ClienteProcesso(app)
+
+        resultados = Resultados()
+        pendentes = {"lock": threading.Lock(), "ids": []}
+        parar = threading.Event()
+        usuarios = [UsuarioVirtual(novo_cliente(), catalogo, args.mix, resultados, pendentes, args.semente + i)
+                    for i in range(args.usuarios)]
+        threads = [threading.Thread(target=u.rodar, args=(parar,)) for u in usuarios]
+        inicio = time.perf_counter()
+        try:
+            for t in threads:
+                t.start()
+            time.sleep(args.segundos)
+        finally:
+            parar.set()
+            for t in threads:
+                t.join()
+            duracao = time.perf_counter() - inicio
+            if processo:
+                processo.terminate()
+                processo.wait(timeout=30)
+
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "modo": args.modo,
+        "app": args.app,
+        "usuarios": args.usuarios,
+        "segundos": round(duracao, 2),
+        "mix": args.mix,
+        "db": args.db,
+        "cenarios": resultados.resumo(duracao),
+    }
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
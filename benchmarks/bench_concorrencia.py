@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concorrência: 1 escritor (checkout) x N leitores (relatório)
+
+Compara os padrões do SQLite (journal DELETE, synchronous FULL) com o perfil
+de database.db.PRAGMAS (WAL, synchronous NORMAL, cache/mmap maiores,
+busy_timeout). O escritor grava pedidos como o PDV; os leitores repetem uma
+consulta de relatório sobre vendas. Mede transações/s do escritor, latência
+p95 do checkout, consultas/s dos leitores e erros "database is locked".
+
+Uso:
+    python benchmarks/bench_concorrencia.py [--leitores 4] [--segundos 5] [--vendas 20000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import init_db, get_pool, ConnectionPool, PRAGMAS
+
+PERFIS = {
+    "padrao_sqlite": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    "perfil_pdv": PRAGMAS,
+}
+
+RELATORIO_SQL = '''
+    SELECT p.name, SUM(oi.quantity), SUM(oi.quantity * oi.unit_price)
+    FROM sales s
+    JOIN order_items oi ON oi.order_id = s.order_id
+    JOIN products p ON p.id = oi.product_id
+    GROUP BY p.id
+    ORDER BY 3 DESC
+'''
+
+
+def popular_banco(db_path, num_vendas):
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO products (name, price, stock, cost_price) VALUES (?, ?, ?, ?)",
+        [(f"Produto {i}", 100 + i, 10 ** 6, 50) for i in range(100)]
+    )
+    rnd = random.Random(42)
+    conn.executemany(
+        "INSERT INTO orders (id, status, total_amount) VALUES (?, 'entregue', 0)",
+        [(i,) for i in range(1, num_vendas + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
+        [(i, rnd.randint(1, 100), rnd.randint(1, 3), 150) for i in range(1, num_vendas + 1) for _ in range(3)]
+    )
+    conn.executemany(
+        "INSERT INTO sales (order_id, user_id, payment_method, total_amount) VALUES (?, 1, 'dinheiro', 450)",
+        [(i,) for i in range(1, num_vendas + 1)]
+    )
+    conn.commit()
+    conn.close()
+    get_pool(db_path).clear()
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def rodar_perfil(db_path, pragmas, num_leitores, segundos):
+    pool = ConnectionPool(db_path, pragmas=pragmas)
+    # A primeira conexão converte o journal_mode antes de haver concorrência
+    pool.acquire().close()
+    parar = threading.Event()
+    resultado = {"escritas": [], "leituras": 0, "erros_lock": 0}
+    lock = threading.Lock()
+
+    def escritor():
+        rnd = random.Random(7)
+        conn = pool.acquire()
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("INSERT INTO orders (status, total_amount) VALUES ('pendente', 0)")
+                order_id = cursor.lastrowid
+                for _ in range(3):
+                    product_id = rnd.randint(1, 100)
+                    cursor.execute(
+                        "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, ?, 1, 150)",
+                        (order_id, product_id)
+                    )
+                    cursor.execute("UPDATE products SET stock = stock - 1 WHERE id = ?", (product_id,))
+                conn.commit()
+                resultado["escritas"].append(time.perf_counter() - inicio)
+            except sqlite3.OperationalError:
+                conn.rollback()
+                with lock:
+                    resultado["erros_lock"] += 1
+        conn.close()
+
+    def leitor():
+        conn = pool.acquire()
+        while not parar.is_set():
+            try:
+                conn.execute(RELATORIO_SQL).fetchall()
+                with lock:
+                    resultado["leituras"] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    resultado["erros_lock"] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=escritor)] + [threading.Thread(target=leitor) for _ in range(num_leitores)]
+    for t in threads:
+        t.start()
+    time.sleep(segundos)
+    parar.set()
+    for t in threads:
+        t.join()
+    pool.clear()
+
+    return {
+        "escritas_por_s": len(resultado["escritas"]) / segundos,
+        "checkout_p95_ms": percentil(resultado["escritas"], 0.95) * 1000,
+        "leituras_por_s": resultado["leituras"] / segundos,
+        "erros_lock": resultado["erros_lock"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--leitores", type=int, default=4)
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--vendas", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"1 escritor x {args.leitores} leitores | {args.vendas} vendas | {args.segundos}s por perfil")
+    print(f"{'perfil':<15}{'escritas/s':>12}{'p95 checkout':>15}{'leituras/s':>12}{'locks':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for nome, pragmas in PERFIS.items():
+            db_path = os.path.join(tmp, f"{nome}.db")
+            popular_banco(db_path, args.vendas)
+            r = rodar_perfil(db_path, pragmas, args.leitores, args.segundos)
+            print(f"{nome:<15}{r['escritas_por_s']:>12.1f}{r['checkout_p95_ms']:>12.1f} ms"
+                  f"{r['leituras_por_s']:>12.1f}{r['erros_lock']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: conexão nova por chamada x pool de conexões (database.db.get_connection)
+
+Simula o handler de /api/produtos (uma consulta de produtos + uma consulta de
+variações por produto com variações) sobre um banco temporário e mede
+requisições por segundo nos dois modos.
+
+Uso:
+    python benchmarks/bench_conexoes.py [--produtos 200] [--segundos 3] [--threads 4]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import init_db, get_connection, close_all_connections
+
+PRODUTOS_SQL = '''
+    SELECT id, name, description, price, image_url, stock, has_variations
+    FROM products
+    WHERE is_active = 1 AND stock > 0
+    ORDER BY name
+'''
+VARIACOES_SQL = '''
+    SELECT id, variation_name, price, stock
+    FROM product_variations
+    WHERE product_id = ? AND is_active = 1 AND stock > 0
+    ORDER BY variation_name
+'''
+
+
+def popular_banco(db_path, num_produtos):
+    init_db(db_path)
+    conn = get_connection(db_path)
+    cursor = conn.cursor()
+    for i in range(num_produtos):
+        tem_variacoes = 1 if i % 4 == 0 else 0
+        cursor.execute(
+            "INSERT INTO products (name, description, price, stock, category_id, has_variations) VALUES (?, ?, ?, ?, ?, ?)",
+            (f"Produto {i:05d}", "Descrição de teste", 100 + i, 50, 1 + i % 5, tem_variacoes)
+        )
+        if tem_variacoes:
+            product_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO product_variations (product_id, variation_name, price, stock) VALUES (?, ?, ?, ?)",
+                [(product_id, nome, 100 + i, 20) for nome in ("Pequena", "Média", "Grande")]
+            )
+    conn.commit()
+    conn.close()
+
+
+def handler_sem_pool(db_path):
+    """Reproduz o padrão antigo: sqlite3.connect a cada consulta."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    produtos = conn.execute(PRODUTOS_SQL).fetchall()
+    conn.close()
+    for produto in produtos:
+        if produto['has_variations']:
+            conn = sqlite3.connect(db_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute(VARIACOES_SQL, (produto['id'],)).fetchall()
+            conn.close()
+    return len(produtos)
+
+
+def handler_com_pool(db_path):
+    """Mesmas consultas, usando o pool compartilhado."""
+    conn = get_connection(db_path, row_factory=sqlite3.Row)
+    produtos = conn.execute(PRODUTOS_SQL).fetchall()
+    conn.close()
+    for produto in produtos:
+        if produto['has_variations']:
+            conn = get_connection(db_path, row_factory=sqlite3.Row)
+            conn.execute(VARIACOES_SQL, (produto['id'],)).fetchall()
+            conn.close()
+    return len(produtos)
+
+
+def medir(handler, db_path, segundos, num_threads):
+    contagens = [0] * num_threads
+    fim = time.perf_counter() + segundos
+
+    def trabalhador(indice):
+        while time.perf_counter() < fim:
+            handler(db_path)
+            contagens[indice] += 1
+
+    threads = [threading.Thread(target=trabalhador, args=(i,)) for i in range(num_threads)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(contagens) / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--produtos", type=int, default=200)
+    parser.add_argument("--segundos", type=float, default=3.0)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        popular_banco(db_path, args.produtos)
+
+        antes = medir(handler_sem_pool, db_path, args.segundos, args.threads)
+        depois = medir(handler_com_pool, db_path, args.segundos, args.threads)
+        close_all_connections()
+
+    print(f"Produtos: {args.produtos} | Threads: {args.threads} | Duração: {args.segundos}s por modo")
+    print(f"Sem pool (sqlite3.connect por consulta): {antes:10.1f} req/s")
+    print(f"Com pool (database.db.get_connection):  {depois:10.1f} req/s")
+    print(f"Ganho: {depois / antes:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks de database/models.py e das consultas dos relatórios
+
+Mede cada função de database/models.py e as consultas das telas de
+relatórios (report_view, admin_dashboard_view, best_sellers_view,
+financial_report_view e my_sales_view) em bancos sintéticos de tamanhos 1x,
+10x e 100x, gerados por gerar_dados.py e guardados em --dados para as
+próximas rodadas. Cada rodada trabalha numa cópia, então as funções que
+escrevem não mudam o banco de referência.
+
+Para cada caso: uma chamada de aquecimento e depois chamadas até somar
+--rodadas e pelo menos --tempo segundos (como o pytest-benchmark). O
+resultado (mediana, mínimo, média, desvio, rodadas, em ms) vai para um JSON
+que serve de linha de base; "comparar" aponta os casos em que a mediana
+piorou mais que --limite por cento e sai com código 1 se houver algum.
+
+Uso:
+    python benchmarks/bench_modelos.py rodar [--escalas 1,10,100] [--filtro best_sellers]
+        [--saida benchmarks/baselines/atual.json]
+    python benchmarks/bench_modelos.py comparar base.json atual.json [--limite 10]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from itertools import count
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database.db as db
+from database import models, reports, tracing
+from database.db import get_connection, get_pool
+from gerar_dados import gerar
+
+# Tamanho 1x; as demais escalas multiplicam pedidos, produtos e mesas
+BASE = {"pedidos": 10_000, "produtos": 300, "mesas": 30}
+ANOS = 2
+SEMENTE = 42
+# O histórico termina na véspera de HOJE: "hoje" nos relatórios é REFERENCIA
+HOJE = date(2025, 7, 1)
+REFERENCIA = HOJE - timedelta(days=1)
+
+
+def caminho_dados(diretorio, escala):
+    return os.path.join(diretorio, f"modelos-{escala}x-s{SEMENTE}.db")
+
+
+def preparar_dados(diretorio, escala):
+    """Gera o banco da escala se ainda não existir e retorna o caminho"""
+    destino = caminho_dados(diretorio, escala)
+    if not os.path.exists(destino):
+        os.makedirs(diretorio, exist_ok=True)
+        parcial = destino + ".parcial"
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(parcial + sufixo):
+                os.remove(parcial + sufixo)
+        gerar(parcial, pedidos=BASE["pedidos"] * escala, anos=ANOS, produtos=BASE["produtos"] * escala,
+              mesas=BASE["mesas"] * escala, semente=SEMENTE, hoje=HOJE)
+        get_pool(parcial).clear()
+        os.replace(parcial, destino)
+    return destino
+
+
+def copiar(origem, destino):
+    src = sqlite3.connect(origem)
+    dest = sqlite3.connect(destino)
+    src.backup(dest)
+    src.close()
+    dest.close()
+
+
+def contar_linhas(db_path):
+    conn = sqlite3.connect(db_path)
+    tabelas = ("products", "product_variations", "orders", "order_items", "sales", "stock_entries", "expenses")
+    contagem = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tabelas}
+    conn.close()
+    return contagem
+
+
+def contexto():
+    """Ids e períodos usados pelos casos, lidos do banco atual"""
+    conn = get_connection()
+    try:
+        mais_vendido = conn.execute(
+            "SELECT product_id FROM order_items GROUP BY product_id ORDER BY COUNT(*) DESC LIMIT 1"
+        ).fetchone()[0]
+        produto_variacoes, variacao = conn.execute(
+            "SELECT product_id, id FROM product_variations WHERE is_active = 1 ORDER BY id LIMIT 1"
+        ).fetchone()
+        categoria = conn.execute("SELECT id FROM categories ORDER BY id LIMIT 1").fetchone()[0]
+        funcionario = conn.execute("SELECT id, username FROM users WHERE role = 'funcionario' ORDER BY id LIMIT 1").fetchone()
+        termo = conn.execute("SELECT name FROM products WHERE id = ?", (mais_vendido,)).fetchone()[0].split()[0]
+        produto = conn.execute("SELECT * FROM products WHERE id = ?", (mais_vendido,)).fetchone()
+        variacao_linha = conn.execute("SELECT * FROM product_variations WHERE id = ?", (variacao,)).fetchone()
+        pedidos_recentes = [row[0] for row in conn.execute("SELECT id FROM orders ORDER BY created_at DESC, id DESC LIMIT 10")]
+        pedidos_entregues = [row[0] for row in conn.execute("SELECT id FROM orders WHERE status = 'entregue' ORDER BY id LIMIT 50")]
+    finally:
+        conn.close()
+    hoje = REFERENCIA.isoformat()
+    return {
+        "produto": mais_vendido,
+        "produto_linha": produto,
+        "produto_variacoes": produto_variacoes,
+        "variacao": variacao,
+        "variacao_linha": variacao_linha,
+        "categoria": categoria,
+        "funcionario_id": funcionario[0],
+        "funcionario": funcionario[1],
+        "termo": termo,
+        "pedidos_recentes": pedidos_recentes,
+        "pedidos_entregues": pedidos_entregues,
+        "hoje": hoje,
+        "semana": (REFERENCIA - timedelta(days=7)).isoformat(),
+        "mes": REFERENCIA.replace(day=1).isoformat(),
+        "ano": (REFERENCIA - timedelta(days=365)).isoformat(),
+        "sempre": "1900-01-01",
+    }
+
+
+def consulta(sql, params=()):
+    """Executa uma consulta SQL que está escrita dentro de uma view (flet)"""
+    def executar():
+        conn = get_connection()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+    return executar
+
+
+def casos(ctx):
+    """(nome, função) de cada caso, na ordem em que rodam"""
+    sequencia = count()
+    p = ctx["produto_linha"]
+    v = ctx["variacao_linha"]
+
+    def criar_e_apagar_produto():
+        product_id = models.create_product("Bench", "Produto temporário", 100, 10, category_id=ctx["categoria"])
+        models.delete_product(product_id)
+
+    def criar_e_apagar_variacao():
+        models.create_product_variation(ctx["produto_variacoes"], "Bench", 100, 5, 40)
+        conn = get_connection()
+        try:
+            variation_id = conn.execute("SELECT MAX(id) FROM product_variations").fetchone()[0]
+        finally:
+            conn.close()
+        models.delete_product_variation(variation_id)
+
+    return [
+        # database/models.py: leitura
+        ("models.hash_password", lambda: models.hash_password("senha-de-teste")),
+        ("models.get_user_by_username", lambda: models.get_user_by_username(ctx["funcionario"])),
+        ("models.get_products", lambda: models.get_products()),
+        ("models.get_products(show_inactive)", lambda: models.get_products(show_inactive=True)),
+        ("models.get_product_by_id", lambda: models.get_product_by_id(ctx["produto"])),
+        ("models.get_product_variations", lambda: models.get_product_variations(ctx["produto_variacoes"])),
+        ("models.get_products_with_variations", lambda: models.get_products_with_variations()),
+        ("models.fts_match", lambda: models.fts_match("frango à zambeziana grande")),
+        ("models.search_products", lambda: models.search_products(ctx["termo"])),
+        ("models.search_products(categoria, estoque)",
+         lambda: models.search_products(ctx["termo"], ctx["categoria"], in_stock_only=True)),
+        ("models.get_menu_snapshot", lambda: models.get_menu_snapshot()),
+        ("models.get_menu_snapshot(categoria)", lambda: models.get_menu_snapshot(ctx["categoria"])),
+        ("models.get_menu_snapshot(busca)", lambda: models.get_menu_snapshot(search=ctx["termo"], in_stock_only=True)),
+        ("models.get_products_by_category_with_variations",
+         lambda: models.get_products_by_category_with_variations(ctx["categoria"])),
+        ("models.get_stock_entries", lambda: models.get_stock_entries()),
+        ("models.get_stock_entries(produto)", lambda: models.get_stock_entries(ctx["produto"])),
+        ("models.get_stock_entries(mes)", lambda: models.get_stock_entries(start_date=ctx["mes"], end_date=ctx["hoje"])),
+        ("models.list_order_cards", lambda: models.list_order_cards()),
+        ("models.list_order_cards(status)", lambda: models.list_order_cards(status="entregue")),
+        ("models.list_order_cards(busca)", lambda: models.list_order_cards(search="12")),
+        ("models.get_order_cards", lambda: models.get_order_cards(ctx["pedidos_recentes"])),
+        ("models.list_order_ids(status)", lambda: models.list_order_ids(status="cancelado")),
+        # database/models.py: escrita (na cópia do banco)
+        ("models.create_user", lambda: models.create_user(f"bench{next(sequencia)}", "senha", "Bench", "funcionario")),
+        ("models.create_product + delete_product", criar_e_apagar_produto),
+        ("models.update_product", lambda: models.update_product(p[0], p[1], p[2], p[3], p[8], p[4], p[5], p[6], p[7])),
+        ("models.set_product_active", lambda: models.set_product_active(ctx["produto"], True)),
+        ("models.create_product_variation + delete_product_variation", criar_e_apagar_variacao),
+        ("models.update_product_variation", lambda: models.update_product_variation(v[0], v[2], v[3], v[4], v[5])),
+        ("models.add_stock_entry", lambda: models.add_stock_entry(ctx["produto"], 1, 10.0, "Bench")),
+        ("models.register_missing_stock_entries", models.register_missing_stock_entries),
+        ("models.fix_invalid_image_urls", models.fix_invalid_image_urls),
+        ("models.fix_sales_missing_user_id", models.fix_sales_missing_user_id),
+        # Pedidos entregues são ignorados: mede os comandos sem mudar os dados
+        ("models.cancel_orders(entregues)", lambda: models.cancel_orders(ctx["pedidos_entregues"])),
+        # delete_all_products e delete_orders ficam de fora: apagariam os dados dos casos seguintes
+
+        # report_view
+        ("report_view.operadores", consulta("SELECT id, username, name, role FROM users ORDER BY name")),
+        ("report_view.list_sales(mes)", lambda: reports.list_sales(ctx["mes"], ctx["hoje"])),
+        ("report_view.list_sales(mes, dinheiro)", lambda: reports.list_sales(ctx["mes"], ctx["hoje"], "dinheiro")),
+        ("report_view.list_stock_entries(mes)", lambda: reports.list_stock_entries(ctx["mes"], ctx["hoje"])),
+        ("report_view.sales_summary(mes)", lambda: reports.sales_summary(ctx["mes"], ctx["hoje"])),
+        ("report_view.stock_entries_summary(mes)", lambda: reports.stock_entries_summary(ctx["mes"], ctx["hoje"])),
+        # admin_dashboard_view
+        ("admin_dashboard_view.vendas_hoje", lambda: reports.sales_summary(ctx["hoje"], ctx["hoje"])),
+        ("admin_dashboard_view.vendas_mes", lambda: reports.sales_summary(ctx["mes"])),
+        ("admin_dashboard_view.lucro_mes", lambda: reports.sales_profit(ctx["mes"])),
+        ("admin_dashboard_view.valor_estoque",
+         consulta("SELECT COALESCE(SUM(stock * cost_price), 0) FROM products WHERE is_active = 1")),
+        # best_sellers_view
+        ("best_sellers_view.hoje", lambda: reports.best_sellers(ctx["hoje"], ctx["hoje"])),
+        ("best_sellers_view.semana", lambda: reports.best_sellers(ctx["semana"], ctx["hoje"])),
+        ("best_sellers_view.mes", lambda: reports.best_sellers(ctx["mes"], ctx["hoje"])),
+        ("best_sellers_view.sempre", lambda: reports.best_sellers(ctx["sempre"], ctx["hoje"])),
+        # financial_report_view
+        ("financial_report_view.mes", lambda: reports.financial_sales(ctx["mes"], ctx["hoje"])),
+        ("financial_report_view.ano", lambda: reports.financial_sales(ctx["ano"], ctx["hoje"])),
+        ("financial_report_view.mes(funcionario)",
+         lambda: reports.financial_sales(ctx["mes"], ctx["hoje"], ctx["funcionario_id"])),
+        # my_sales_view
+        ("my_sales_view.mes", lambda: reports.list_sales(ctx["mes"], ctx["hoje"], user_id=ctx["funcionario_id"])),
+        ("my_sales_view.ano", lambda: reports.list_sales(ctx["ano"], ctx["hoje"], user_id=ctx["funcionario_id"])),
+    ]
+
+
+def medir(funcao, min_rodadas, tempo_min, max_rodadas=10_000):
+    funcao()  # aquecimento: cache de páginas e de statements
+    tempos = []
+    inicio = time.perf_counter()
+    while len(tempos) < max_rodadas and (len(tempos) < min_rodadas or time.perf_counter() - inicio < tempo_min):
+        t = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - t)
+    ms = [t * 1000 for t in tempos]
+    return {
+        "mediana_ms": round(statistics.median(ms), 4),
+        "min_ms": round(min(ms), 4),
+        "media_ms": round(statistics.fmean(ms), 4),
+        "desvio_ms": round(statistics.stdev(ms), 4) if len(ms) > 1 else 0.0,
+        "rodadas": len(ms),
+    }
+
+
+def versao_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def rodar(args):
+    # Sem log de consultas lentas: o EXPLAIN dele entraria no tempo medido
+    tracing.configure(threshold_ms=float("inf"))
+    escalas = [int(e) for e in args.escalas.split(",")]
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": versao_git(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "maquina": platform.platform(),
+        "escalas": {},
+    }
+    for escala in escalas:
+        print(f"Escala {escala}x: preparando dados...", file=sys.stderr, flush=True)
+        origem = preparar_dados(args.dados, escala)
+        with tempfile.TemporaryDirectory() as tmp:
+            copia = os.path.join(tmp, "bench.db")
+            copiar(origem, copia)
+            db.DB_PATH = copia
+            try:
+                ctx = contexto()
+                resultados = {}
+                for nome, funcao in casos(ctx):
+                    if args.filtro and args.filtro not in nome:
+                        continue
+                    resultados[nome] = medir(funcao, args.rodadas, args.tempo)
+                    print(f"  {nome:<62} {resultados[nome]['mediana_ms']:>10.3f} ms", file=sys.stderr, flush=True)
+            finally:
+                get_pool(copia).clear()
+        relatorio["escalas"][str(escala)] = {"linhas": contar_linhas(origem), "resultados": resultados}
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+        print(f"Resultados gravados em {args.saida}", file=sys.stderr)
+    else:
+        print(texto)
+
+
+def comparar(args):
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.atual, encoding="utf-8") as f:
+        atual = json.load(f)
+
+    regressoes = []
+    print(f"{'caso':<70} {'base ms':>10} {'atual ms':>10} {'dif.':>8}")
+    for escala, dados in atual["escalas"].items():
+        anteriores = base["escalas"].get(escala, {}).get("resultados", {})
+        for nome, resultado in dados["resultados"].items():
+            anterior = anteriores.get(nome)
+            rotulo = f"[{escala}x] {nome}"
+            if anterior is None:
+                print(f"{rotulo:<70} {'-':>10} {resultado['mediana_ms']:>10.3f} {'novo':>8}")
+                continue
+            antes, depois = anterior["mediana_ms"], resultado["mediana_ms"]
+            variacao = (depois - antes) / antes * 100 if antes else 0.0
+            # O piso em ms evita alarmes por ruído em casos de microssegundos
+            piorou = variacao > args.limite and depois - antes > args.piso_ms
+            marca = "  <-- REGRESSÃO" if piorou else ""
+            print(f"{rotulo:<70} {antes:>10.3f} {depois:>10.3f} {variacao:>+7.1f}%{marca}")
+            if piorou:
+                regressoes.append((rotulo, variacao))
+
+    if regressoes:
+        print(f"\n{len(regressoes)} caso(s) pioraram mais de {args.limite:g}%:")
+        for rotulo, variacao in regressoes:
+            print(f"  {rotulo}: {variacao:+.1f}%")
+        return 1
+    print(f"\nNenhuma regressão acima de {args.limite:g}%.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_rodar = sub.add_parser("rodar", help="mede os casos e grava o JSON")
+    p_rodar.add_argument("--escalas", default="1,10,100")
+    p_rodar.add_argument("--dados", default=os.path.join(tempfile.gettempdir(), "pdv-bench-dados"),
+                         help="pasta dos bancos sintéticos (reaproveitados entre rodadas)")
+    p_rodar.add_argument("--filtro", help="só os casos cujo nome contém este texto")
+    p_rodar.add_argument("--rodadas", type=int, default=5, help="mínimo de chamadas medidas por caso")
+    p_rodar.add_argument("--tempo", type=float, default=0.2, help="mínimo de segundos medidos por caso")
+    p_rodar.add_argument("--saida", help="arquivo JSON (padrão: stdout)")
+    p_rodar.set_defaults(func=rodar)
+
+    p_comparar = sub.add_parser("comparar", help="compara dois JSON e aponta regressões")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("atual")
+    p_comparar.add_argument("--limite", type=float, default=10.0, help="piora máxima aceita, em %%")
+    p_comparar.add_argument("--piso-ms", type=float, default=0.05, help="diferença mínima em ms para contar")
+    p_comparar.set_defaults(func=comparar)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args) or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Gerador de dados sintéticos para testes de escala do restaurant.db
+
+Cria (ou completa) um banco com volume realista e reprodutível pela semente:
+milhares de produtos (parte com variações), centenas de mesas, funcionários,
+e anos de histórico de pedidos, itens, vendas, entradas de estoque e
+despesas. O movimento segue o dia a dia de um restaurante: picos no almoço e
+no jantar, mais pedidos no fim de semana e crescimento ao longo dos anos.
+
+Como no app, pedidos de mesa ficam em orders como "entregue" (ou
+"cancelado") e pedidos do PDV são apagados depois da venda, deixando só os
+itens e a venda. Os gatilhos e índices das tabelas históricas são retirados
+durante a carga e recriados no fim, e as linhas entram com executemany em
+transações grandes.
+
+Uso:
+    python benchmarks/gerar_dados.py --db grande.db [--pedidos 1000000] [--anos 3]
+        [--produtos 3000] [--mesas 300] [--funcionarios 20] [--semente 42]
+"""
+
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.db import init_db, get_pool, hash_password
+from database.reports import fill_sales_daily
+
+# Tabelas que recebem milhões de linhas: sem gatilhos nem índices na carga
+TABELAS_HISTORICAS = ("orders", "order_items", "sales", "stock_entries", "expenses")
+LOTE = 100_000
+
+# Peso de cada hora de funcionamento (8h às 23h): almoço e jantar
+PESO_HORA = {
+    8: 2, 9: 3, 10: 4, 11: 8, 12: 18, 13: 20, 14: 11, 15: 5,
+    16: 4, 17: 6, 18: 10, 19: 17, 20: 19, 21: 13, 22: 6, 23: 2,
+}
+# Segunda a domingo
+PESO_DIA_SEMANA = (0.8, 0.8, 0.9, 1.0, 1.3, 1.5, 1.2)
+ITENS_POR_PEDIDO = ((1, 2, 3, 4, 5, 6), (25, 30, 20, 12, 8, 5))
+QUANTIDADE = ((1, 2, 3, 4), (70, 20, 7, 3))
+PAGAMENTOS = (("dinheiro", "mpesa", "emola", "cartao"), (45, 35, 12, 8))
+PARTE_PDV = 0.45
+PARTE_CANCELADOS = 0.03
+
+PRATOS = ["Frango", "Camarão", "Peixe", "Bife", "Matapa", "Xima", "Feijoada", "Lulas", "Caril",
+          "Hambúrguer", "Pizza", "Salada", "Sopa", "Espetada", "Bolo", "Pudim", "Sumo", "Café",
+          "Chá", "Cerveja", "Refresco", "Água", "Gelado", "Tosta", "Prego", "Chamuças", "Rissóis"]
+ESTILOS = ["Grelhado", "à Zambeziana", "com Coco", "Picante", "da Casa", "Especial", "Tradicional",
+           "com Batata", "no Forno", "Frito", "Gelado", "Natural", "Duplo", "Simples", "Mista"]
+VARIACOES = [("Pequena", 0.8), ("Média", 1.0), ("Grande", 1.3), ("Família", 2.0)]
+FORNECEDORES = ["Distribuidora Maputo", "Mercado Central", "Peixaria da Costa", "Bebidas do Sul", "Agro Matola"]
+CLIENTES = ["Ana", "João", "Maria", "Carlos", "Fátima", "Pedro", "Luísa", "Tomás", "Nélia", "Armando"]
+# Categoria, faixa do valor, vezes por mês
+DESPESAS = [
+    ("Aluguel", (40_000, 60_000), 1), ("Salários", (150_000, 250_000), 1),
+    ("Contas", (5_000, 15_000), 3), ("Compras", (2_000, 20_000), 12),
+    ("Manutenção", (1_000, 10_000), 2), ("Outros", (200, 5_000), 6),
+]
+
+
+def log(mensagem):
+    print(mensagem, file=sys.stderr, flush=True)
+
+
+def suspender_gatilhos_e_indices(conn):
+    """Apaga gatilhos e índices das tabelas históricas e retorna o SQL para recriá-los"""
+    marcas = ",".join("?" * len(TABELAS_HISTORICAS))
+    objetos = conn.execute(
+        f"SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') "
+        f"AND tbl_name IN ({marcas}) AND sql IS NOT NULL",
+        TABELAS_HISTORICAS
+    ).fetchall()
+    for tipo, nome, _ in objetos:
+        conn.execute(f"DROP {'INDEX' if tipo == 'index' else 'TRIGGER'} {nome}")
+    return [sql for _, _, sql in objetos]
+
+
+def dias_do_periodo(anos, hoje):
+    """Primeiro dia do histórico e quantos dias ele cobre (até ontem)"""
+    inicio = hoje - timedelta(days=int(anos * 365))
+    total = (hoje - inicio).days
+    return inicio, total
+
+
+def distribuir(total, pesos):
+    """Divide ``total`` em inteiros proporcionais aos pesos, somando exatamente ``total``"""
+    soma = sum(pesos)
+    partes, acumulado, anterior = [], 0.0, 0
+    for peso in pesos:
+        acumulado += peso * total / soma
+        atual = round(acumulado)
+        partes.append(atual - anterior)
+        anterior = atual
+    return partes
+
+
+class Gerador:
+    def __init__(self, conn, semente, hoje=None):
+        self.conn = conn
+        self.rnd = random.Random(semente)
+        self.hoje = hoje or date.today()
+        self.contagem = {}
+
+    def inserir(self, sql, linhas):
+        if linhas:
+            self.conn.executemany(sql, linhas)
+            tabela = sql.split()[2]
+            self.contagem[tabela] = self.contagem.get(tabela, 0) + len(linhas)
+
+    def proximo_id(self, tabela):
+        return self.conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {tabela}").fetchone()[0]
+
+    def cadastros(self, produtos, mesas, funcionarios):
+        rnd = self.rnd
+        categorias = [row[0] for row in self.conn.execute("SELECT id FROM categories")]
+        primeiro = self.proximo_id("products")
+        linhas_produtos, linhas_variacoes = [], []
+        for i in range(produtos):
+            preco = round(rnd.uniform(50, 1500), 0)
+            custo = round(preco * rnd.uniform(0.3, 0.6), 2)
+            variacoes = rnd.random() < 0.2
+            nome = f"{rnd.choice(PRATOS)} {rnd.choice(ESTILOS)} {i + 1}"
+            linhas_produtos.append((primeiro + i, nome, f"{nome} preparado na hora", preco, rnd.choice(categorias),
+                                    rnd.randint(0, 500), rnd.randint(5, 20), custo, int(variacoes)))
+            if variacoes:
+                for nome_variacao, fator in rnd.sample(VARIACOES, rnd.randint(2, 4)):
+                    linhas_variacoes.append((primeiro + i, nome_variacao, round(preco * fator, 0),
+                                             rnd.randint(0, 200), round(custo * fator, 2)))
+        self.inserir(
+            "INSERT INTO products (id, name, description, price, category_id, stock, min_stock, cost_price, has_variations) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas_produtos
+        )
+        self.inserir(
+            "INSERT INTO product_variations (product_id, variation_name, price, stock, cost_price) VALUES (?, ?, ?, ?, ?)",
+            linhas_variacoes
+        )
+
+        numero = self.conn.execute("SELECT COALESCE(MAX(number), 0) FROM tables").fetchone()[0]
+        self.inserir("INSERT INTO tables (number, capacity) VALUES (?, ?)",
+                     [(numero + n + 1, rnd.choice((2, 4, 4, 6, 8))) for n in range(mesas)])
+
+        existentes = {row[0] for row in self.conn.execute("SELECT username FROM users")}
+        senha = hash_password("carga123")
+        self.inserir(
+            "INSERT INTO users (username, password, name, role) VALUES (?, ?, ?, 'funcionario')",
+            [(f"func{n:03d}", senha, f"{rnd.choice(CLIENTES)} {n}") for n in range(1, funcionarios + 1)
+             if f"func{n:03d}" not in existentes]
+        )
+
+    def catalogo(self):
+        """Produtos com preço/variações e pesos de popularidade (cauda longa)"""
+        variacoes = {}
+        for product_id, nome, preco, custo in self.conn.execute(
+                "SELECT product_id, variation_name, price, cost_price FROM product_variations WHERE is_active = 1"):
+            variacoes.setdefault(product_id, []).append((nome, preco, custo or 0))
+        produtos = [(pid, preco, custo or 0, variacoes.get(pid)) for pid, preco, custo in
+                    self.conn.execute("SELECT id, price, cost_price FROM products WHERE is_active = 1")]
+        self.rnd.shuffle(produtos)
+        pesos = [1 / (rank + 1) ** 0.9 for rank in range(len(produtos))]
+        acumulados, soma = [], 0.0
+        for peso in pesos:
+            soma += peso
+            acumulados.append(soma)
+        return produtos, acumulados
+
+    def historico(self, pedidos, anos):
+        rnd = self.rnd
+        produtos, acumulados = self.catalogo()
+        mesas = [row[0] for row in self.conn.execute("SELECT id FROM tables")]
+        usuarios = [row[0] for row in self.conn.execute("SELECT id FROM users WHERE active = 1")]
+        horas = list(PESO_HORA)
+        horas_acumuladas = []
+        soma = 0
+        for hora in horas:
+            soma += PESO_HORA[hora]
+            horas_acumuladas.append(soma)
+
+        inicio, total_dias = dias_do_periodo(anos, self.hoje)
+        pesos_dias = []
+        for d in range(total_dias):
+            dia = inicio + timedelta(days=d)
+            crescimento = 0.6 + 0.4 * d / max(1, total_dias - 1)
+            pesos_dias.append(PESO_DIA_SEMANA[dia.weekday()] * crescimento * rnd.uniform(0.85, 1.15))
+        por_dia = distribuir(pedidos, pesos_dias)
+
+        order_id = self.proximo_id("orders")
+        pedidos_lote, itens_lote, vendas_lote = [], [], []
+        feitos = 0
+        for d, quantidade in enumerate(por_dia):
+            dia = (inicio + timedelta(days=d)).isoformat()
+            segundos = sorted(
+                h * 3600 + rnd.randrange(3600)
+                for h in rnd.choices(horas, cum_weights=horas_acumuladas, k=quantidade)
+            )
+            for s in segundos:
+                criado = f"{dia} {s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}"
+                total = 0.0
+                for _ in range(rnd.choices(*ITENS_POR_PEDIDO)[0]):
+                    product_id, preco, custo, variacoes = rnd.choices(produtos, cum_weights=acumulados)[0]
+                    notas = None
+                    if variacoes:
+                        nome_variacao, preco, custo = rnd.choice(variacoes)
+                        notas = f"Variação: {nome_variacao}"
+                    qtd = rnd.choices(*QUANTIDADE)[0]
+                    total += qtd * preco
+                    itens_lote.append((order_id, product_id, qtd, preco, custo, notas, criado))
+
+                sorte = rnd.random()
+                if sorte < PARTE_CANCELADOS:
+                    pedidos_lote.append((order_id, rnd.choice(mesas), None, "cancelado", total, criado, criado))
+                else:
+                    pago = min(s + rnd.randint(15 * 60, 90 * 60), 86399)
+                    pago_em = f"{dia}T{pago // 3600:02d}:{pago % 3600 // 60:02d}:{pago % 60:02d}.{rnd.randrange(10 ** 6):06d}"
+                    vendas_lote.append((order_id, rnd.choice(usuarios), rnd.choices(*PAGAMENTOS)[0], total, pago_em))
+                    if sorte >= PARTE_CANCELADOS + PARTE_PDV:
+                        # Pedido de mesa: continua em orders como entregue
+                        cliente = rnd.choice(CLIENTES) if rnd.random() < 0.3 else None
+                        pedidos_lote.append((order_id, rnd.choice(mesas), cliente, "entregue", total, criado,
+                                             pago_em.replace("T", " ")[:19]))
+                    # Pedido do PDV: apagado depois da venda, ficam itens e venda
+                order_id += 1
+                feitos += 1
+
+            if len(itens_lote) >= LOTE or d == total_dias - 1:
+                self.inserir(
+                    "INSERT INTO orders (id, table_id, customer_name, status, total_amount, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", pedidos_lote
+                )
+                self.inserir(
+                    "INSERT INTO order_items (order_id, product_id, quantity, unit_price, unit_cost, notes, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", itens_lote
+                )
+                self.inserir(
+                    "INSERT INTO sales (order_id, user_id, payment_method, total_amount, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)", vendas_lote
+                )
+                self.conn.commit()
+                pedidos_lote, itens_lote, vendas_lote = [], [], []
+                log(f"  {feitos:,} de {pedidos:,} pedidos (até {dia})")
+        # Como no app, ids de pedidos apagados pelo PDV não voltam a ser usados
+        self.conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'orders'", (order_id - 1,))
+        self.conn.commit()
+        return inicio, total_dias
+
+    def entradas_de_estoque(self, inicio, total_dias):
+        rnd = self.rnd
+        linhas = []
+        for product_id, custo in self.conn.execute("SELECT id, cost_price FROM products").fetchall():
+            intervalo = rnd.randint(7, 30)
+            d = rnd.randrange(intervalo)
+            while d < total_dias:
+                dia = inicio + timedelta(days=d)
+                qtd = rnd.randint(10, 200)
+                unitario = round(custo * rnd.uniform(0.9, 1.1), 2)
+                linhas.append((product_id, qtd, unitario, round(qtd * unitario, 2), rnd.choice(FORNECEDORES), None,
+                               f"{dia.isoformat()} {rnd.randint(7, 11):02d}:{rnd.randrange(60):02d}:{rnd.randrange(60):02d}"))
+                d += intervalo + rnd.randint(-3, 3)
+                if len(linhas) >= LOTE:
+                    self._inserir_entradas(linhas)
+                    linhas = []
+        self._inserir_entradas(linhas)
+
+    def _inserir_entradas(self, linhas):
+        self.inserir(
+            "INSERT INTO stock_entries (product_id, quantity, unit_cost, total_cost, supplier, notes, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", linhas
+        )
+        self.conn.commit()
+
+    def despesas(self, inicio, total_dias):
+        rnd = self.rnd
+        admin = self.conn.execute("SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1").fetchone()
+        admin = admin[0] if admin else None
+        meses = math.ceil(total_dias / 30)
+        linhas = []
+        for categoria, (minimo, maximo), vezes in DESPESAS:
+            for _ in range(meses * vezes):
+                dia = inicio + timedelta(days=rnd.randrange(total_dias))
+                linhas.append((dia.isoformat(), round(rnd.uniform(minimo, maximo), 2), categoria,
+                               f"{categoria} ({dia.strftime('%m/%Y')})", admin))
+        linhas.sort()
+        self.inserir("INSERT INTO expenses (created_at, amount, category, description, user_id) VALUES (?, ?, ?, ?, ?)",
+                     linhas)
+        self.conn.commit()
+
+
+def gerar(destino, pedidos=1_000_000, anos=3, produtos=3000, mesas=300, funcionarios=20, semente=42, hoje=None):
+    """Popula ``destino`` e retorna quantas linhas foram inseridas por tabela"""
+    init_db(destino)
+    get_pool(destino).clear()
+
+    conn = sqlite3.connect(destino)
+    # Carga em massa: sem WAL nem fsync; o banco volta para WAL no fim
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    gerador = Gerador(conn, semente, hoje)
+    try:
+        gerador.cadastros(produtos, mesas, funcionarios)
+        conn.commit()
+        recriar = suspender_gatilhos_e_indices(conn)
+        conn.commit()
+        try:
+            log(f"Gerando {pedidos:,} pedidos em {anos} ano(s)...")
+            inicio, total_dias = gerador.historico(pedidos, anos)
+            log("Entradas de estoque e despesas...")
+            gerador.entradas_de_estoque(inicio, total_dias)
+            gerador.despesas(inicio, total_dias)
+        finally:
+            log("Recriando índices e gatilhos...")
+            for sql in recriar:
+                conn.execute(sql)
+            conn.commit()
+        log("Resumo diário de vendas...")
+        fill_sales_daily(conn.cursor())
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+    return gerador.contagem
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", required=True, help="arquivo do banco (criado se não existir)")
+    parser.add_argument("--pedidos", type=int, default=1_000_000)
+    parser.add_argument("--anos", type=float, default=3)
+    parser.add_argument("--produtos", type=int, default=3000)
+    parser.add_argument("--mesas", type=int, default=300)
+    parser.add_argument("--funcionarios", type=int, default=20)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    contagem = gerar(args.db, args.pedidos, args.anos, args.produtos, args.mesas, args.funcionarios, args.semente)
+    duracao = time.perf_counter() - inicio
+    total = sum(contagem.values())
+    for tabela, linhas in sorted(contagem.items()):
+        print(f"{tabela:<20} {linhas:>12,}")
+    print(f"{'total':<20} {total:>12,}  em {duracao:.1f} s ({total / duracao:,.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    main()
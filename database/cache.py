@@ -0,0 +1,59 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from .db import get_connection
+
+# Cache em processo das respostas JSON públicas (cardápio, categorias, mesas).
+#
+# Cada entrada guarda o corpo já serializado junto com a versão do grupo de
+# dados em cache_versions (ver migração 0006). A versão vive no banco e é
+# incrementada por gatilhos, então cada worker do gunicorn mantém o seu cache
+# mas todos descartam a entrada assim que qualquer processo grava no catálogo.
+# Custo por requisição com o cache quente: uma leitura de chave primária.
+
+MAX_ENTRIES = 256
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_version(name):
+    """Versão atual do grupo de dados ('catalogo', 'mesas')"""
+    conn = get_connection()
+    row = conn.execute("SELECT version FROM cache_versions WHERE name = ?", (name,)).fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+
+def cached_json(name, key, build):
+    """Retorna (corpo JSON em bytes, etag) para ``key`` dentro do grupo ``name``.
+
+    ``build()`` só é chamado quando a versão do grupo mudou desde a última
+    serialização. A versão é lida antes de montar o corpo: se houver uma
+    escrita no meio, o corpo fica mais novo que a versão registrada e é
+    refeito na próxima requisição, nunca servido desatualizado.
+    """
+    version = get_version(name)
+    cache_key = (name, key)
+    with _lock:
+        entry = _entries.get(cache_key)
+        if entry and entry[0] == version:
+            _entries.move_to_end(cache_key)
+            return entry[1], entry[2]
+
+    body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # ETag forte derivado do conteúdo: igual em todos os workers para o mesmo corpo
+    etag = hashlib.sha1(body).hexdigest()
+    with _lock:
+        _entries[cache_key] = (version, body, etag)
+        _entries.move_to_end(cache_key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return body, etag
+
+
+def clear_cache():
+    with _lock:
+        _entries.clear()
@@ -1,210 +1,293 @@
 import sqlite3
 from pathlib import Path
 import hashlib
+import os
+import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from time import perf_counter
 
-DB_PATH = Path(__file__).parent / "restaurant.db"
+from . import tracing
 
+# PDV_DB_PATH aponta o processo para outro arquivo (ex.: banco de teste de carga)
+DB_PATH = Path(os.environ.get("PDV_DB_PATH") or Path(__file__).parent / "restaurant.db")
 
-def get_connection():
-    return sqlite3.connect(DB_PATH)
+# Quantas conexões ociosas cada processo mantém por arquivo de banco
+POOL_MAX_IDLE = int(os.environ.get("PDV_DB_POOL_SIZE", "8"))
+
+# Perfil de ajuste aplicado a toda conexão nova. Cada valor pode ser
+# sobrescrito por deployment com PDV_SQLITE_<NOME> (ex.: PDV_SQLITE_MMAP_SIZE=0);
+# um valor vazio desativa o PRAGMA. busy_timeout vem primeiro para que a troca
+# de journal_mode espere por locks em vez de falhar.
+DEFAULT_PRAGMAS = {
+    "busy_timeout": 5000,          # ms à espera de lock antes de "database is locked"
+    "journal_mode": "WAL",         # leitores não bloqueiam o escritor (e vice-versa)
+    "synchronous": "NORMAL",       # seguro com WAL; fsync só no checkpoint
+    "cache_size": -16000,          # KiB de cache de páginas por conexão (~16 MB)
+    "mmap_size": 134217728,        # 128 MB de leitura via mmap
+    "temp_store": "MEMORY",        # ORDER BY/GROUP BY temporários em memória
+}
+
+_PRAGMA_VALUE = re.compile(r"^-?\w+$")
+
+
+def load_pragmas(overrides=None):
+    """Perfil padrão + variáveis de ambiente + ``overrides`` explícitos."""
+    pragmas = dict(DEFAULT_PRAGMAS)
+    for name in DEFAULT_PRAGMAS:
+        value = os.environ.get(f"PDV_SQLITE_{name.upper()}")
+        if value is not None:
+            pragmas[name] = value
+    if overrides:
+        pragmas.update(overrides)
+    return pragmas
+
+
+PRAGMAS = load_pragmas()
+
+
+def configure_pragmas(**overrides):
+    """Ajusta o perfil do processo; vale para as conexões criadas a seguir."""
+    PRAGMAS.update(overrides)
+    close_all_connections()
+
+
+def apply_pragmas(conn, pragmas=None):
+    for name, value in (PRAGMAS if pragmas is None else pragmas).items():
+        if value is None or value == "":
+            continue
+        value = str(value)
+        if not _PRAGMA_VALUE.match(value):
+            raise ValueError(f"Valor inválido para PRAGMA {name}: {value!r}")
+        try:
+            conn.execute(f"PRAGMA {name} = {value}").fetchall()
+        except sqlite3.OperationalError:
+            # Trocar o journal_mode exige acesso exclusivo; se outro processo
+            # estiver usando o banco, a próxima conexão tenta de novo.
+            if name != "journal_mode":
+                raise
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor que mede cada comando e o entrega a tracing.record()"""
+
+    def execute(self, sql, parameters=()):
+        start = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            tracing.record(sql, parameters, perf_counter() - start, self.connection)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            tracing.record(sql, None, perf_counter() - start)
+
+
+class PooledConnection(sqlite3.Connection):
+    """Conexão SQLite que volta para o pool em vez de fechar.
+
+    Os chamadores continuam usando ``conn.close()`` como antes; a conexão
+    física só é fechada quando o pool está cheio ou é descartado.
+    """
+
+    _pool = None
+    _checked_out = False
+
+    # Connection.execute() do sqlite3 cria o cursor por dentro sem passar
+    # pelo execute() do cursor; os atalhos são refeitos aqui para que toda
+    # consulta seja medida
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        pool = self._pool
+        if pool is None:
+            super().close()
+        elif self._checked_out:
+            pool.release(self)
+
+    def _really_close(self):
+        self._pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """Pool de conexões por processo para um arquivo SQLite.
+
+    As conexões são criadas com ``check_same_thread=False`` para poderem ser
+    reaproveitadas pelas threads do Flask e do Flet, mas só uma thread usa
+    cada conexão de cada vez. Depois de um ``fork`` (gunicorn com
+    ``preload_app``) o filho descarta as conexões herdadas do pai.
+    """
+
+    def __init__(self, path, max_idle=POOL_MAX_IDLE, pragmas=None):
+        self.path = str(path)
+        self.max_idle = max_idle
+        self.pragmas = pragmas
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, factory=PooledConnection, check_same_thread=False)
+        try:
+            apply_pragmas(conn, self.pragmas)
+        except BaseException:
+            conn.close()
+            raise
+        conn._pool = self
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Conexões herdadas do processo pai não podem ser usadas
+                self._idle = []
+                self._pid = os.getpid()
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        conn._checked_out = True
+        return conn
+
+    def release(self, conn):
+        conn._checked_out = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            conn._really_close()
+            return
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn._really_close()
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn._really_close()
+
+    def _after_fork(self):
+        # Não fecha: os descritores ainda pertencem ao processo pai
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=None):
+    path = str(db_path or DB_PATH)
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+    return pool
+
+
+def close_all_connections():
+    """Fecha as conexões ociosas de todos os pools (ex.: antes de restaurar um backup)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.clear()
+
+
+def backup_database(dest_path, db_path=None):
+    """Cópia consistente do banco, incluindo o que ainda está no arquivo -wal."""
+    src = get_connection(db_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        src.backup(dest)
+    finally:
+        dest.close()
+        src.close()
+
+
+def restore_database(src_path, db_path=None):
+    """Sobrescreve o banco em uso com o conteúdo de um backup."""
+    src = sqlite3.connect(src_path)
+    dest = get_connection(db_path)
+    try:
+        src.backup(dest)
+    finally:
+        dest.close()
+        src.close()
+
+
+def remove_database(db_path=None):
+    """Apaga o arquivo do banco junto com os arquivos -wal/-shm do WAL."""
+    path = str(db_path or DB_PATH)
+    close_all_connections()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _reset_pools_after_fork():
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    for pool in _pools.values():
+        pool._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+def get_connection(db_path=None, row_factory=None):
+    """Retorna uma conexão do pool; ``conn.close()`` devolve-a ao pool."""
+    conn = get_pool(db_path).acquire()
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    return conn
+
+
+@contextmanager
+def db_connection(db_path=None, row_factory=None):
+    """Empresta uma conexão do pool: commit ao sair, rollback em caso de erro.
+
+    Exemplo::
+
+        with db_connection(row_factory=sqlite3.Row) as conn:
+            conn.execute("UPDATE tables SET status = 'livre' WHERE id = ?", (1,))
+    """
+    conn = get_connection(db_path, row_factory)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 
-def init_db():
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Tabela de usuários
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            name TEXT NOT NULL,
-            role TEXT NOT NULL CHECK(role IN ('admin', 'funcionario')),
-            active INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Tabela de categorias
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS categories (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            is_active INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Tabela de produtos
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            price REAL NOT NULL,
-            category_id INTEGER,
-            stock INTEGER DEFAULT 0,
-            min_stock INTEGER DEFAULT 0,
-            cost_price REAL DEFAULT 0.0,
-            image_url TEXT,
-            is_active INTEGER DEFAULT 1,
-            has_variations INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(category_id) REFERENCES categories(id)
-        )
-    ''')
-    
-    # Tabela de variações de produtos
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS product_variations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER NOT NULL,
-            variation_name TEXT NOT NULL,
-            price REAL NOT NULL,
-            stock INTEGER DEFAULT 0,
-            cost_price REAL DEFAULT 0.0,
-            is_active INTEGER DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE
-        )
-    ''')
-    
-    # Tabela de mesas
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tables (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            number INTEGER UNIQUE NOT NULL,
-            capacity INTEGER NOT NULL,
-            status TEXT NOT NULL DEFAULT 'livre' CHECK(status IN ('livre', 'ocupada', 'reservada', 'limpeza')),
-            current_order_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Tabela de pedidos
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            table_id INTEGER,
-            customer_name TEXT,
-            status TEXT NOT NULL DEFAULT 'pendente' CHECK(status IN ('pendente', 'preparando', 'pronto', 'entregue', 'cancelado')),
-            total_amount REAL DEFAULT 0.0,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(table_id) REFERENCES tables(id)
-        )
-    ''')
-    
-    # Tabela de itens do pedido
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS order_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            order_id INTEGER,
-            product_id INTEGER,
-            quantity INTEGER NOT NULL,
-            unit_price REAL NOT NULL,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(order_id) REFERENCES orders(id),
-            FOREIGN KEY(product_id) REFERENCES products(id)
-        )
-    ''')
-    
-    # Tabela de vendas (para histórico)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sales (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            order_id INTEGER,
-            user_id INTEGER,
-            payment_method TEXT NOT NULL,
-            total_amount REAL NOT NULL,
-            discount REAL DEFAULT 0.0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(order_id) REFERENCES orders(id),
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    ''')
-    
-    # Tabela de entradas de estoque (compras)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS stock_entries (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER NOT NULL,
-            quantity INTEGER NOT NULL,
-            unit_cost REAL NOT NULL,
-            total_cost REAL NOT NULL,
-            supplier TEXT,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(product_id) REFERENCES products(id)
-        )
-    ''')
-    
-    # Tabela de despesas
-    cursor.execute('''CREATE TABLE IF NOT EXISTS expenses (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    created_at TEXT NOT NULL,
-    amount REAL NOT NULL,
-    category TEXT NOT NULL,
-    description TEXT,
-    user_id INTEGER,
-    FOREIGN KEY(user_id) REFERENCES users(id)
-)''')
-    
-    # Configurações gerais
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS config (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            key TEXT UNIQUE NOT NULL,
-            value TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Inserir dados iniciais
-    insert_initial_data(cursor)
-    
-    conn.commit()
-    conn.close()
-
-
-def insert_initial_data(cursor):
-    # Verificar se já existem categorias antes de inserir
-    cursor.execute('SELECT COUNT(*) FROM categories')
-    if cursor.fetchone()[0] == 0:
-        # Inserir usuário admin padrão
-        admin_password = hash_password("842384")
-        cursor.execute('''
-            INSERT OR IGNORE INTO users (username, password, name, role, active)
-            VALUES (?, ?, ?, ?, ?)
-        ''', ("Alves37", admin_password, "Administrador", "admin", 1))
-        
-        # Inserir categorias padrão
-        default_categories = [
-            ("Entradas", "Pratos de entrada e aperitivos"),
-            ("Pratos Principais", "Pratos principais do cardápio"),
-            ("Sobremesas", "Sobremesas e doces"),
-            ("Bebidas", "Bebidas e refrigerantes"),
-            ("Café", "Cafés e expressos")
-        ]
-        
-        for name, description in default_categories:
-            cursor.execute('''
-                INSERT INTO categories (name, description, is_active)
-                VALUES (?, ?, ?)
-            ''', (name, description, 1))
-    else:
-        # Se já existem categorias, apenas garantir que o admin exista
-        admin_password = hash_password("842384")
-        cursor.execute('''
-            INSERT OR IGNORE INTO users (username, password, name, role, active)
-            VALUES (?, ?, ?, ?, ?)
-        ''', ("Alves37", admin_password, "Administrador", "admin", 1)) 
\ No newline at end of file
+def init_db(db_path=None):
+    """Leva o banco à versão mais recente do esquema.
+
+    Com o banco já atualizado isto custa só a leitura do PRAGMA user_version;
+    a DDL e os dados iniciais vivem em database/migrations/.
+    """
+    from database.migrations import migrate
+    return migrate(db_path)
@@ -0,0 +1,171 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from .db import get_connection
+from .orders import get_orders_by_ids
+
+# Barramento de mudanças de pedidos.
+#
+# Os eventos são gravados por gatilhos em order_events (migração 0007), na
+# mesma transação da escrita. Cada processo (worker do gunicorn, app Flet)
+# tem um ChangeBus com uma thread que acompanha a tabela e entrega os lotes
+# novos aos assinantes locais. A thread só lê order_events quando
+# PRAGMA data_version indica que outra conexão confirmou algo, então ficar
+# ocioso custa um pragma por intervalo. Quem grava no mesmo processo pode
+# chamar notify() para a entrega sair na hora, sem esperar o intervalo.
+
+POLL_INTERVAL = 0.25
+BATCH_SIZE = 500
+RETENTION = 5000
+PRUNE_INTERVAL = 600
+
+
+def latest_event_id(conn=None):
+    own = conn is None
+    conn = conn or get_connection()
+    row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM order_events").fetchone()
+    if own:
+        conn.close()
+    return row[0]
+
+
+def events_after(last_id, limit=BATCH_SIZE, conn=None):
+    """Eventos (id, order_id, kind, status) com id > last_id, em ordem"""
+    own = conn is None
+    conn = conn or get_connection()
+    rows = conn.execute(
+        "SELECT id, order_id, kind, status FROM order_events WHERE id > ? ORDER BY id LIMIT ?",
+        (last_id, limit)
+    ).fetchall()
+    if own:
+        conn.close()
+    return rows
+
+
+def prune_events(keep=RETENTION):
+    """Apaga eventos antigos, mantendo os ``keep`` mais recentes para replay"""
+    conn = get_connection()
+    conn.execute("DELETE FROM order_events WHERE id <= (SELECT MAX(id) FROM order_events) - ?", (keep,))
+    conn.commit()
+    conn.close()
+
+
+def format_sse(event_id, data):
+    """Serializa um evento no formato text/event-stream"""
+    return f"id: {event_id}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_messages(batch, render):
+    """Mensagens SSE de um lote, com o resumo atual de cada pedido.
+
+    ``render`` converte o resumo de get_orders_by_ids no JSON da tela. Os
+    pedidos do lote são buscados numa consulta só; se o pedido já não
+    existe o evento sai como 'removido'.
+    """
+    orders = get_orders_by_ids({event[1] for event in batch})
+    for event_id, order_id, kind, status in batch:
+        order = orders.get(order_id)
+        if order is None:
+            yield format_sse(event_id, {'tipo': 'removido', 'id': order_id})
+        else:
+            yield format_sse(event_id, {'tipo': kind, 'id': order_id, 'pedido': render(order)})
+
+
+class ChangeBus:
+    def __init__(self, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._last_id = 0
+
+    def notify(self):
+        """Acorda a thread de leitura logo após um commit neste processo"""
+        self._wake.set()
+
+    def subscribe(self):
+        q = queue.Queue()
+        with self._lock:
+            self._subscribers.add(q)
+            # A thread não sobrevive a um fork; cada worker inicia a sua
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._last_id = latest_event_id()
+                self._thread = threading.Thread(target=self._run, name="order-events", daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def listen(self, last_event_id=None, heartbeat=15.0, duration=None):
+        """Gera lotes de eventos novos para um assinante.
+
+        Com ``last_event_id`` (cabeçalho Last-Event-ID de uma reconexão) os
+        eventos perdidos são reenviados primeiro. Um lote vazio é gerado a
+        cada ``heartbeat`` segundos sem novidades, para manter a conexão viva;
+        depois de ``duration`` segundos o gerador termina e o cliente reconecta.
+        """
+        q = self.subscribe()
+        try:
+            if last_event_id is None:
+                last = latest_event_id()
+            else:
+                last = last_event_id
+                backlog = events_after(last, limit=RETENTION)
+                if backlog:
+                    last = backlog[-1][0]
+                    yield backlog
+            deadline = None if duration is None else time.monotonic() + duration
+            while deadline is None or time.monotonic() < deadline:
+                try:
+                    batch = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield []
+                    continue
+                # O replay e a thread podem entregar o mesmo evento
+                batch = [event for event in batch if event[0] > last]
+                if batch:
+                    last = batch[-1][0]
+                    yield batch
+        finally:
+            self.unsubscribe(q)
+
+    def _run(self):
+        conn = get_connection()
+        data_version = None
+        next_prune = time.monotonic() + PRUNE_INTERVAL
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers or self._pid != os.getpid():
+                        self._thread = None
+                        return
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if version != data_version:
+                    data_version = version
+                    while True:
+                        rows = events_after(self._last_id, conn=conn)
+                        if not rows:
+                            break
+                        self._last_id = rows[-1][0]
+                        with self._lock:
+                            subscribers = list(self._subscribers)
+                        for q in subscribers:
+                            q.put(rows)
+                if time.monotonic() >= next_prune:
+                    next_prune = time.monotonic() + PRUNE_INTERVAL
+                    prune_events()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        finally:
+            conn.close()
+
+
+order_bus = ChangeBus()
@@ -0,0 +1,113 @@
+import time
+
+from .db import get_connection
+
+# Chaves de idempotência para rotas que gravam (fazer pedido, pagar,
+# finalizar venda).
+#
+# O cliente manda um Idempotency-Key por operação e repete a mesma chave ao
+# reenviar depois de um timeout. A primeira requisição reserva a chave
+# (status NULL), executa e guarda a resposta; uma repetição encontra a
+# resposta pronta numa leitura da chave primária e a devolve sem refazer as
+# escritas. Só respostas de sucesso ficam guardadas: numa falha nada foi
+# gravado, a reserva é liberada e a repetição executa de novo.
+
+TTL = 24 * 3600
+STALE_AFTER = 60
+PURGE_INTERVAL = 3600
+MAX_KEY_LENGTH = 255
+
+NEW, DONE, BUSY = "new", "done", "busy"
+
+_next_purge = 0
+
+
+def lookup(scope, key, now=None):
+    """(status, corpo) guardados para a chave, ou None"""
+    now = int(now or time.time())
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT status, body FROM idempotency_keys WHERE scope = ? AND key = ? AND created_at > ?",
+        (scope, key, now - TTL)
+    ).fetchone()
+    conn.close()
+    if row and row[0] is not None:
+        return row[0], row[1]
+    return None
+
+
+def claim(scope, key, now=None):
+    """Reserva a chave. Retorna (NEW, None), (DONE, (status, corpo)) ou (BUSY, None).
+
+    BUSY indica que outra requisição com a mesma chave ainda está em curso;
+    uma reserva sem resposta há mais de STALE_AFTER segundos (processo que
+    caiu no meio) é assumida pela nova requisição.
+    """
+    now = int(now or time.time())
+    stored = lookup(scope, key, now)
+    if stored:
+        return DONE, stored
+    _maybe_purge(now)
+
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT created_at, status, body FROM idempotency_keys WHERE scope = ? AND key = ?",
+            (scope, key)
+        ).fetchone()
+        if row and row[0] > now - TTL:
+            created_at, status, body = row
+            if status is not None:
+                conn.rollback()
+                return DONE, (status, body)
+            if created_at > now - STALE_AFTER:
+                conn.rollback()
+                return BUSY, None
+        conn.execute(
+            "INSERT OR REPLACE INTO idempotency_keys (scope, key, created_at) VALUES (?, ?, ?)",
+            (scope, key, now)
+        )
+        conn.commit()
+        return NEW, None
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def complete(scope, key, status, body):
+    """Guarda a resposta de sucesso para as próximas repetições"""
+    conn = get_connection()
+    conn.execute(
+        "UPDATE idempotency_keys SET status = ?, body = ? WHERE scope = ? AND key = ?",
+        (status, body, scope, key)
+    )
+    conn.commit()
+    conn.close()
+
+
+def release(scope, key):
+    """Libera a reserva depois de uma falha, para que a repetição execute"""
+    conn = get_connection()
+    conn.execute("DELETE FROM idempotency_keys WHERE scope = ? AND key = ? AND status IS NULL", (scope, key))
+    conn.commit()
+    conn.close()
+
+
+def purge_expired(now=None):
+    """Apaga as chaves com mais de TTL segundos; retorna quantas saíram"""
+    now = int(now or time.time())
+    conn = get_connection()
+    deleted = conn.execute("DELETE FROM idempotency_keys WHERE created_at <= ?", (now - TTL,)).rowcount
+    conn.commit()
+    conn.close()
+    return deleted
+
+
+def _maybe_purge(now):
+    global _next_purge
+    if now >= _next_purge:
+        _next_purge = now + PURGE_INTERVAL
+        purge_expired(now)
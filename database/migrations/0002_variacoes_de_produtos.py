@@ -0,0 +1,8 @@
+"""Bancos antigos sem products.has_variations (antes feito por migrar_products_completo.py)."""
+
+from database.migrations import column_exists
+
+
+def upgrade(cursor):
+    if not column_exists(cursor, "products", "has_variations"):
+        cursor.execute("ALTER TABLE products ADD COLUMN has_variations INTEGER DEFAULT 0")
@@ -0,0 +1,8 @@
+"""Coluna categories.tipo, usada pela CategoryView (ambos, produto_final, insumo)."""
+
+from database.migrations import column_exists
+
+
+def upgrade(cursor):
+    if not column_exists(cursor, "categories", "tipo"):
+        cursor.execute("ALTER TABLE categories ADD COLUMN tipo TEXT DEFAULT 'ambos'")
@@ -0,0 +1,25 @@
+"""Índices casados com as consultas reais.
+
+Filtros de período por created_at (relatórios, dashboards), pedidos ativos por
+status/mesa e os joins pedido -> itens -> produto/variação.
+"""
+
+INDEXES = [
+    ("idx_orders_status_created", "orders(status, created_at)"),
+    ("idx_orders_table_status", "orders(table_id, status)"),
+    ("idx_orders_created", "orders(created_at)"),
+    ("idx_order_items_order", "order_items(order_id)"),
+    ("idx_order_items_product", "order_items(product_id)"),
+    ("idx_sales_created", "sales(created_at)"),
+    ("idx_sales_user_created", "sales(user_id, created_at)"),
+    ("idx_sales_order", "sales(order_id)"),
+    ("idx_product_variations_product", "product_variations(product_id, is_active)"),
+    ("idx_products_category", "products(category_id, is_active)"),
+    ("idx_stock_entries_created", "stock_entries(created_at)"),
+    ("idx_stock_entries_product", "stock_entries(product_id)"),
+]
+
+
+def upgrade(cursor):
+    for name, target in INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
@@ -0,0 +1,37 @@
+"""Usuário admin padrão e categorias iniciais."""
+
+from database.db import hash_password
+
+
+def upgrade(cursor):
+    # Verificar se já existem categorias antes de inserir
+    cursor.execute('SELECT COUNT(*) FROM categories')
+    if cursor.fetchone()[0] == 0:
+        # Inserir usuário admin padrão
+        admin_password = hash_password("842384")
+        cursor.execute('''
+            INSERT OR IGNORE INTO users (username, password, name, role, active)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ("Alves37", admin_password, "Administrador", "admin", 1))
+        
+        # Inserir categorias padrão
+        default_categories = [
+            ("Entradas", "Pratos de entrada e aperitivos"),
+            ("Pratos Principais", "Pratos principais do cardápio"),
+            ("Sobremesas", "Sobremesas e doces"),
+            ("Bebidas", "Bebidas e refrigerantes"),
+            ("Café", "Cafés e expressos")
+        ]
+        
+        for name, description in default_categories:
+            cursor.execute('''
+                INSERT INTO categories (name, description, is_active)
+                VALUES (?, ?, ?)
+            ''', (name, description, 1))
+    else:
+        # Se já existem categorias, apenas garantir que o admin exista
+        admin_password = hash_password("842384")
+        cursor.execute('''
+            INSERT OR IGNORE INTO users (username, password, name, role, active)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ("Alves37", admin_password, "Administrador", "admin", 1)) 
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""Contadores de versão para os caches das APIs públicas.
+
+``cache_versions`` guarda um contador por grupo de dados: "catalogo"
+(produtos, variações e categorias) e "mesas". Os gatilhos incrementam o
+contador em qualquer escrita que mude o que as APIs mostram, venha ela da
+interface Flet, de um worker web ou de um script. Assim todos os processos
+enxergam a mesma versão, sem depender de cada caminho de escrita lembrar de
+invalidar o cache.
+"""
+
+# (grupo, tabela, colunas cujo UPDATE muda a resposta; None = qualquer coluna)
+WATCHED = [
+    ("catalogo", "products", "name, description, price, image_url, stock, category_id, has_variations, is_active"),
+    ("catalogo", "product_variations", "product_id, variation_name, price, stock, is_active"),
+    ("catalogo", "categories", None),
+    ("mesas", "tables", "number, capacity, status"),
+]
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for group, table, columns in WATCHED:
+        cursor.execute("INSERT OR IGNORE INTO cache_versions (name) VALUES (?)", (group,))
+        bump = f"UPDATE cache_versions SET version = version + 1 WHERE name = '{group}';"
+        update_of = f"UPDATE OF {columns}" if columns else "UPDATE"
+        for event, suffix in (("INSERT", "ins"), ("DELETE", "del"), (update_of, "upd")):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{suffix}_versao
+                AFTER {event} ON {table}
+                BEGIN {bump} END
+            ''')
@@ -0,0 +1,34 @@
+"""Registro de eventos de pedidos (order_events) para o stream da equipe.
+
+Gatilhos gravam um evento por pedido criado, mudança de status, pagamento
+(venda registrada) e pedido removido. O evento entra na mesma transação da
+escrita, então só fica visível quando ela é confirmada, venha ela da API
+web, do PDV ou da tela de pedidos.
+"""
+
+TRIGGERS = [
+    ("trg_orders_evento_criado", "AFTER INSERT ON orders", "NEW.id, 'criado', NEW.status"),
+    ("trg_orders_evento_status", "AFTER UPDATE OF status ON orders WHEN OLD.status IS NOT NEW.status", "NEW.id, 'status', NEW.status"),
+    ("trg_orders_evento_removido", "AFTER DELETE ON orders", "OLD.id, 'removido', OLD.status"),
+    ("trg_sales_evento_pago", "AFTER INSERT ON sales WHEN NEW.order_id IS NOT NULL", "NEW.order_id, 'pago', NULL"),
+]
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            status TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for name, event, values in TRIGGERS:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name}
+            {event}
+            BEGIN
+                INSERT INTO order_events (order_id, kind, status) VALUES ({values});
+            END
+        ''')
@@ -0,0 +1,32 @@
+"""orders.updated_at mantido por gatilhos, com índice, e lápides de pedidos.
+
+Qualquer escrita em orders ou order_items marca o pedido com o instante
+atual (UTC, milissegundos). Pedidos apagados deixam uma lápide em
+order_tombstones. Com isso a API de pedidos responde "o que mudou desde o
+cursor" sem reler a lista inteira.
+"""
+
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_tombstones (
+            order_id INTEGER PRIMARY KEY,
+            deleted_at TIMESTAMP NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_tombstones_deleted ON order_tombstones(deleted_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_updated ON orders(updated_at)")
+
+    statements = {
+        "trg_orders_updated_ins": f"AFTER INSERT ON orders BEGIN UPDATE orders SET updated_at = {NOW} WHERE id = NEW.id; END",
+        # O WHEN evita que o próprio UPDATE do gatilho dispare outra vez
+        "trg_orders_updated_upd": f"AFTER UPDATE ON orders WHEN NEW.updated_at IS OLD.updated_at BEGIN UPDATE orders SET updated_at = {NOW} WHERE id = NEW.id; END",
+        "trg_orders_tombstone": f"AFTER DELETE ON orders BEGIN INSERT OR REPLACE INTO order_tombstones (order_id, deleted_at) VALUES (OLD.id, {NOW}); END",
+        "trg_order_items_updated_ins": f"AFTER INSERT ON order_items BEGIN UPDATE orders SET updated_at = {NOW} WHERE id = NEW.order_id; END",
+        "trg_order_items_updated_upd": f"AFTER UPDATE ON order_items BEGIN UPDATE orders SET updated_at = {NOW} WHERE id IN (OLD.order_id, NEW.order_id); END",
+        "trg_order_items_updated_del": f"AFTER DELETE ON order_items BEGIN UPDATE orders SET updated_at = {NOW} WHERE id = OLD.order_id; END",
+    }
+    for name, body in statements.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
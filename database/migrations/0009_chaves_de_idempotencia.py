@@ -0,0 +1,20 @@
+"""Tabela de chaves de idempotência (cabeçalho Idempotency-Key).
+
+Uma linha por (escopo, chave) com a resposta já serializada. Sem rowid, a
+busca de uma repetição é uma única leitura da chave primária; o índice em
+created_at serve à limpeza das chaves vencidas.
+"""
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            status INTEGER,
+            body BLOB,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys(created_at)")
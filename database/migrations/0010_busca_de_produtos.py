@@ -0,0 +1,57 @@
+"""Busca de produtos com FTS5 (products_fts).
+
+Uma linha por produto (rowid = products.id) com nome, descrição e os nomes
+das variações ativas. O tokenizador unicode61 com remove_diacritics ignora
+acentos e cedilha ("acai" encontra "açaí"), e os índices de prefixo deixam
+as buscas enquanto o usuário digita ("piz*") tão baratas quanto as de
+palavra inteira. Gatilhos mantêm a tabela em dia com products e
+product_variations.
+"""
+
+VARIATIONS = "(SELECT group_concat(variation_name, ' ') FROM product_variations WHERE product_id = {id} AND is_active = 1)"
+
+
+def _insert(alias):
+    return (
+        f"INSERT INTO products_fts (rowid, name, description, variations) "
+        f"VALUES ({alias}.id, {alias}.name, COALESCE({alias}.description, ''), "
+        f"COALESCE({VARIATIONS.format(id=alias + '.id')}, ''));"
+    )
+
+
+def _refresh_variations(product_id):
+    return (
+        f"UPDATE products_fts SET variations = COALESCE({VARIATIONS.format(id=product_id)}, '') "
+        f"WHERE rowid = {product_id};"
+    )
+
+
+TRIGGERS = {
+    "trg_products_fts_ins": ("AFTER INSERT ON products", _insert("NEW")),
+    "trg_products_fts_upd": (
+        "AFTER UPDATE OF id, name, description ON products",
+        "DELETE FROM products_fts WHERE rowid = OLD.id; " + _insert("NEW"),
+    ),
+    "trg_products_fts_del": ("AFTER DELETE ON products", "DELETE FROM products_fts WHERE rowid = OLD.id;"),
+    "trg_variations_fts_ins": ("AFTER INSERT ON product_variations", _refresh_variations("NEW.product_id")),
+    "trg_variations_fts_upd": (
+        "AFTER UPDATE OF product_id, variation_name, is_active ON product_variations",
+        _refresh_variations("OLD.product_id") + " " + _refresh_variations("NEW.product_id"),
+    ),
+    "trg_variations_fts_del": ("AFTER DELETE ON product_variations", _refresh_variations("OLD.product_id")),
+}
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, description, variations,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    ''')
+    for name, (event, body) in TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+    cursor.execute("DELETE FROM products_fts")
+    cursor.execute("INSERT INTO products_fts (rowid, name, description, variations) SELECT " +
+                   f"p.id, p.name, COALESCE(p.description, ''), COALESCE({VARIATIONS.format(id='p.id')}, '') FROM products p")
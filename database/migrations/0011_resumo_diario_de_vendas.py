@@ -0,0 +1,99 @@
+"""Resumo diário de vendas (sales_daily) mantido por gatilhos.
+
+Cada venda guarda o custo e o lucro dos seus itens no momento em que é
+registrada (sales.cost_amount e sales.profit_amount) e soma número de
+vendas, receita, custo e lucro na linha do dia, da forma de pagamento e do
+operador em sales_daily, na mesma transação do INSERT. Alterações e
+exclusões de vendas desfazem a contribuição antiga e aplicam a nova. Os
+cartões dos painéis leem uma linha por dia em vez de varrer sales e
+order_items. O histórico existente é preenchido no fim da migração, com o
+custo atual dos produtos; depois o resumo pode ser refeito com
+``python -m database.reports rebuild``.
+"""
+
+from database.migrations import column_exists
+
+# Dia da venda: created_at vem como 'AAAA-MM-DD HH:MM:SS' ou em isoformat()
+DAY = "substr({row}.created_at, 1, 10)"
+
+ITEMS = "FROM order_items oi JOIN products p ON p.id = oi.product_id WHERE oi.order_id = NEW.order_id"
+
+
+def _add(row, sign):
+    """Soma (sign = '+') ou desfaz (sign = '-') a contribuição da venda ``row`` (NEW/OLD)"""
+    return f'''
+        INSERT INTO sales_daily (day, payment_method, user_id, sales_count, revenue, cost, profit)
+        VALUES ({DAY.format(row=row)}, {row}.payment_method, COALESCE({row}.user_id, 0),
+                {sign}1, {sign}{row}.total_amount, {sign}COALESCE({row}.cost_amount, 0), {sign}COALESCE({row}.profit_amount, 0))
+        ON CONFLICT (day, payment_method, user_id) DO UPDATE SET
+            sales_count = sales_count + excluded.sales_count,
+            revenue = revenue + excluded.revenue,
+            cost = cost + excluded.cost,
+            profit = profit + excluded.profit;
+    '''
+
+
+def _drop_empty(row):
+    return f'''
+        DELETE FROM sales_daily
+        WHERE day = {DAY.format(row=row)} AND payment_method = {row}.payment_method
+          AND user_id = COALESCE({row}.user_id, 0) AND sales_count = 0;
+    '''
+
+
+def upgrade(cursor):
+    for column in ("cost_amount", "profit_amount"):
+        if not column_exists(cursor, "sales", column):
+            cursor.execute(f"ALTER TABLE sales ADD COLUMN {column} REAL")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sales_daily (
+            day TEXT NOT NULL,
+            payment_method TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            sales_count INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            profit REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, payment_method, user_id)
+        ) WITHOUT ROWID
+    ''')
+
+    statements = {
+        # O custo é fotografado só quando a venda chega sem ele; o UPDATE
+        # dispara trg_sales_daily_upd, que troca a contribuição sem custo pela
+        # contribuição com custo.
+        "trg_sales_daily_ins": f'''AFTER INSERT ON sales BEGIN
+            {_add("NEW", "+")}
+            UPDATE sales SET
+                cost_amount = (SELECT COALESCE(SUM(oi.quantity * COALESCE(p.cost_price, 0)), 0) {ITEMS}),
+                profit_amount = (SELECT COALESCE(SUM(oi.quantity * (oi.unit_price - COALESCE(p.cost_price, 0))), 0) {ITEMS})
+            WHERE id = NEW.id AND cost_amount IS NULL;
+        END''',
+        "trg_sales_daily_upd": f'''AFTER UPDATE OF created_at, payment_method, user_id, total_amount, cost_amount, profit_amount ON sales BEGIN
+            {_add("OLD", "-")}
+            {_add("NEW", "+")}
+            {_drop_empty("OLD")}
+        END''',
+        "trg_sales_daily_del": f'''AFTER DELETE ON sales BEGIN
+            {_add("OLD", "-")}
+            {_drop_empty("OLD")}
+        END''',
+    }
+    for name, body in statements.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+    history = ITEMS.replace("NEW.order_id", "sales.order_id")
+    cursor.execute(f'''
+        UPDATE sales SET
+            cost_amount = (SELECT COALESCE(SUM(oi.quantity * COALESCE(p.cost_price, 0)), 0) {history}),
+            profit_amount = (SELECT COALESCE(SUM(oi.quantity * (oi.unit_price - COALESCE(p.cost_price, 0))), 0) {history})
+        WHERE cost_amount IS NULL
+    ''')
+    cursor.execute("DELETE FROM sales_daily")
+    cursor.execute('''
+        INSERT INTO sales_daily (day, payment_method, user_id, sales_count, revenue, cost, profit)
+        SELECT substr(created_at, 1, 10), payment_method, COALESCE(user_id, 0), COUNT(*),
+               SUM(total_amount), SUM(cost_amount), SUM(profit_amount)
+        FROM sales
+        GROUP BY 1, 2, 3
+    ''')
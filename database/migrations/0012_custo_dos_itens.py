@@ -0,0 +1,60 @@
+"""Custo unitário dos itens (order_items.unit_cost) gravado na hora do pedido.
+
+Itens que chegam sem unit_cost recebem, por gatilho, o custo da variação
+(identificada por "Variação: ..." em notes) ou o do produto. O lucro dos
+relatórios passa a ser quantity * (unit_price - unit_cost), somado em SQL, e
+não muda quando o custo do produto é alterado depois. Itens antigos recebem
+o custo atual. O gatilho de sales_daily passa a usar esse custo, e o de
+updated_at dos pedidos deixa de disparar quando só o custo do item muda.
+"""
+
+from database.migrations import column_exists
+
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def _unit_cost(row):
+    return f'''COALESCE(
+        (SELECT v.cost_price FROM product_variations v
+         WHERE v.product_id = {row}.product_id AND 'Variação: ' || v.variation_name = {row}.notes
+         ORDER BY v.is_active DESC, v.id LIMIT 1),
+        (SELECT cost_price FROM products WHERE id = {row}.product_id),
+        0
+    )'''
+
+
+ITEMS = "FROM order_items oi WHERE oi.order_id = NEW.order_id"
+
+
+def upgrade(cursor):
+    if not column_exists(cursor, "order_items", "unit_cost"):
+        cursor.execute("ALTER TABLE order_items ADD COLUMN unit_cost REAL")
+
+    cursor.execute("DROP TRIGGER IF EXISTS trg_order_items_updated_upd")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_sales_daily_ins")
+    statements = {
+        "trg_order_items_updated_upd": f'''AFTER UPDATE OF order_id, product_id, quantity, unit_price, notes ON order_items BEGIN
+            UPDATE orders SET updated_at = {NOW} WHERE id IN (OLD.order_id, NEW.order_id);
+        END''',
+        "trg_order_items_unit_cost": f'''AFTER INSERT ON order_items WHEN NEW.unit_cost IS NULL BEGIN
+            UPDATE order_items SET unit_cost = {_unit_cost("NEW")} WHERE id = NEW.id;
+        END''',
+        "trg_sales_daily_ins": f'''AFTER INSERT ON sales BEGIN
+            INSERT INTO sales_daily (day, payment_method, user_id, sales_count, revenue, cost, profit)
+            VALUES (substr(NEW.created_at, 1, 10), NEW.payment_method, COALESCE(NEW.user_id, 0),
+                    1, NEW.total_amount, COALESCE(NEW.cost_amount, 0), COALESCE(NEW.profit_amount, 0))
+            ON CONFLICT (day, payment_method, user_id) DO UPDATE SET
+                sales_count = sales_count + excluded.sales_count,
+                revenue = revenue + excluded.revenue,
+                cost = cost + excluded.cost,
+                profit = profit + excluded.profit;
+            UPDATE sales SET
+                cost_amount = (SELECT COALESCE(SUM(oi.quantity * COALESCE(oi.unit_cost, 0)), 0) {ITEMS}),
+                profit_amount = (SELECT COALESCE(SUM(oi.quantity * (oi.unit_price - COALESCE(oi.unit_cost, 0))), 0) {ITEMS})
+            WHERE id = NEW.id AND cost_amount IS NULL;
+        END''',
+    }
+    for name, body in statements.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+    cursor.execute(f"UPDATE order_items SET unit_cost = {_unit_cost('order_items')} WHERE unit_cost IS NULL")
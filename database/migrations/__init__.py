@@ -0,0 +1,87 @@
+"""Migrações versionadas do esquema.
+
+Cada arquivo ``NNNN_descricao.py`` desta pasta define ``upgrade(cursor)`` e
+leva o banco à versão NNNN. A versão aplicada fica em ``PRAGMA user_version``,
+então um banco atualizado custa uma única leitura no arranque; os módulos das
+migrações só são importados quando há algo pendente.
+
+Uso pela linha de comando::
+
+    python -m database.migrations status
+    python -m database.migrations upgrade [--to N] [--db caminho/do/banco.db]
+"""
+
+import importlib
+import os
+import re
+
+from database.db import get_connection
+
+_MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+
+def _discover():
+    found = []
+    for filename in os.listdir(os.path.dirname(os.path.abspath(__file__))):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            found.append((int(match.group(1)), filename[:-3]))
+    found.sort()
+    versions = [version for version, _ in found]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Versões de migração duplicadas: {versions}")
+    return found
+
+
+MIGRATIONS = _discover()
+LATEST_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def column_exists(cursor, table, column):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending_migrations(version):
+    return [(v, name) for v, name in MIGRATIONS if v > version]
+
+
+def migrate(db_path=None, target=None, verbose=False):
+    """Aplica as migrações pendentes até ``target`` (padrão: a mais recente).
+
+    Cada migração roda numa transação própria (BEGIN IMMEDIATE) junto com a
+    atualização do user_version; se dois processos arrancarem ao mesmo tempo,
+    o segundo relê a versão dentro da transação e não repete o trabalho.
+    Retorna a lista de versões aplicadas.
+    """
+    target = LATEST_VERSION if target is None else target
+    conn = get_connection(db_path)
+    try:
+        if current_version(conn) >= target:
+            return []
+        applied = []
+        for version, name in MIGRATIONS:
+            if version > target:
+                break
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if current_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                module = importlib.import_module(f"{__name__}.{name}")
+                module.upgrade(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {version:d}")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            applied.append(version)
+            if verbose:
+                print(f"✅ Migração {name} aplicada")
+        return applied
+    finally:
+        conn.close()
@@ -0,0 +1,30 @@
+import argparse
+
+from database.db import DB_PATH, get_connection
+from database.migrations import LATEST_VERSION, MIGRATIONS, current_version, migrate, pending_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m database.migrations", description="Migrações do banco do PDV")
+    parser.add_argument("command", choices=["status", "upgrade"], nargs="?", default="status")
+    parser.add_argument("--db", default=None, help=f"Arquivo do banco (padrão: {DB_PATH})")
+    parser.add_argument("--to", type=int, default=None, help="Versão alvo (padrão: a mais recente)")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        applied = migrate(args.db, target=args.to, verbose=True)
+        if not applied:
+            print("Nada a aplicar.")
+
+    conn = get_connection(args.db)
+    version = current_version(conn)
+    conn.close()
+    print(f"Banco: {args.db or DB_PATH}")
+    print(f"Versão atual: {version} | Mais recente: {LATEST_VERSION}")
+    for v, name in MIGRATIONS:
+        status = "pendente" if (v, name) in pending_migrations(version) else "aplicada"
+        print(f"  {name:<40} {status}")
+
+
+if __name__ == "__main__":
+    main()
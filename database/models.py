@@ -1,5 +1,8 @@
-from .db import get_connection
+from .db import get_connection, db_connection
+from .orders import encode_cursor, decode_cursor
 import hashlib
+import json
+import re
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -7,90 +10,75 @@ def hash_password(password):
 # Usuários
 
 def create_user(username, password, name, role):
-    conn = get_connection()
-    cursor = conn.cursor()
-    hashed_password = hash_password(password)
-    cursor.execute(
-        "INSERT INTO users (username, password, name, role) VALUES (?, ?, ?, ?)",
-        (username, hashed_password, name, role)
-    )
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        hashed_password = hash_password(password)
+        cursor.execute(
+            "INSERT INTO users (username, password, name, role) VALUES (?, ?, ?, ?)",
+            (username, hashed_password, name, role)
+        )
 
 def get_user_by_username(username):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    conn.close()
-    return user
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
+        user = cursor.fetchone()
+        return user
 
 # Produtos
 
 def create_product(name, description, price, stock, min_stock=0, image_url=None, cost_price=0.0, is_active=1, category_id=None, has_variations=False):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO products (name, description, price, stock, min_stock, image_url, cost_price, is_active, category_id, has_variations) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        (name, description, price, stock, min_stock, image_url, cost_price, is_active, category_id, has_variations)
-    )
-    product_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return product_id
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO products (name, description, price, stock, min_stock, image_url, cost_price, is_active, category_id, has_variations) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (name, description, price, stock, min_stock, image_url, cost_price, is_active, category_id, has_variations)
+        )
+        product_id = cursor.lastrowid
+        return product_id
 
 def get_products(show_inactive=False):
-    conn = get_connection()
-    cursor = conn.cursor()
-    if show_inactive:
-        cursor.execute("SELECT * FROM products")
-    else:
-        cursor.execute("SELECT * FROM products WHERE is_active = 1")
-    products = cursor.fetchall()
-    conn.close()
-    return products
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        if show_inactive:
+            cursor.execute("SELECT * FROM products")
+        else:
+            cursor.execute("SELECT * FROM products WHERE is_active = 1")
+        products = cursor.fetchall()
+        return products
 
 def update_product(id, name, description, price, image_url=None, category_id=None, stock=0, min_stock=0, cost_price=0.0):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE products SET name = ?, description = ?, price = ?, image_url = ?, category_id = ?, stock = ?, min_stock = ?, cost_price = ? WHERE id = ?",
-        (name, description, price, image_url, category_id, stock, min_stock, cost_price, id)
-    )
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE products SET name = ?, description = ?, price = ?, image_url = ?, category_id = ?, stock = ?, min_stock = ?, cost_price = ? WHERE id = ?",
+            (name, description, price, image_url, category_id, stock, min_stock, cost_price, id)
+        )
 
 def set_product_active(id, active):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE products SET is_active = ? WHERE id = ?",
-        (1 if active else 0, id)
-    )
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE products SET is_active = ? WHERE id = ?",
+            (1 if active else 0, id)
+        )
 
 def delete_product(id):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM products WHERE id = ?", (id,))
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM products WHERE id = ?", (id,))
 
 def delete_all_products():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM products")
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM products")
 
 def get_product_by_id(product_id):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-    product = cursor.fetchone()
-    conn.close()
-    return product
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
+        product = cursor.fetchone()
+        return product
 
 # Outras funções podem ser adicionadas conforme necessidade para sales, sales_items, tables, config. 
 
@@ -98,170 +86,401 @@ def get_product_by_id(product_id):
 
 def create_product_variation(product_id, variation_name, price, stock=0, cost_price=0.0):
     """Cria uma variação para um produto"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO product_variations (product_id, variation_name, price, stock, cost_price) VALUES (?, ?, ?, ?, ?)",
-        (product_id, variation_name, price, stock, cost_price)
-    )
-    # Marcar produto como tendo variações
-    cursor.execute("UPDATE products SET has_variations = 1 WHERE id = ?", (product_id,))
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO product_variations (product_id, variation_name, price, stock, cost_price) VALUES (?, ?, ?, ?, ?)",
+            (product_id, variation_name, price, stock, cost_price)
+        )
+        # Marcar produto como tendo variações
+        cursor.execute("UPDATE products SET has_variations = 1 WHERE id = ?", (product_id,))
 
 def get_product_variations(product_id):
     """Retorna todas as variações de um produto"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM product_variations WHERE product_id = ? AND is_active = 1 ORDER BY variation_name", (product_id,))
-    variations = cursor.fetchall()
-    conn.close()
-    return variations
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM product_variations WHERE product_id = ? AND is_active = 1 ORDER BY variation_name", (product_id,))
+        variations = cursor.fetchall()
+        return variations
 
 def update_product_variation(variation_id, variation_name, price, stock, cost_price):
     """Atualiza uma variação de produto"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE product_variations SET variation_name = ?, price = ?, stock = ?, cost_price = ? WHERE id = ?",
-        (variation_name, price, stock, cost_price, variation_id)
-    )
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE product_variations SET variation_name = ?, price = ?, stock = ?, cost_price = ? WHERE id = ?",
+            (variation_name, price, stock, cost_price, variation_id)
+        )
 
 def delete_product_variation(variation_id):
     """Remove uma variação de produto"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM product_variations WHERE id = ?", (variation_id,))
-    conn.commit()
-    conn.close()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM product_variations WHERE id = ?", (variation_id,))
 
 def get_products_with_variations():
     """Retorna produtos que têm variações"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM products WHERE has_variations = 1 AND is_active = 1")
-    products = cursor.fetchall()
-    conn.close()
-    return products
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM products WHERE has_variations = 1 AND is_active = 1")
+        products = cursor.fetchall()
+        return products
+
+# Busca de produtos (FTS5, ver migração 0010)
+
+SEARCH_LIMIT = 50
+_SEARCH_TERM = re.compile(r"\w+")
+
+def fts_match(text):
+    """Expressão MATCH para o texto digitado: cada palavra vira um prefixo.
+
+    As palavras vão entre aspas, então operadores do FTS5 (AND, NEAR, "-")
+    digitados pelo usuário são tratados como texto. Retorna "" se não há
+    nenhuma palavra.
+    """
+    return " ".join(f'"{term}"*' for term in _SEARCH_TERM.findall(text or ""))
+
+def search_products_query(text, category_id=None, in_stock_only=False, include_inactive=False, limit=SEARCH_LIMIT):
+    params = [fts_match(text)]
+    clauses = ["products_fts MATCH ?"]
+    if not include_inactive:
+        clauses.append("p.is_active = 1")
+    if category_id:
+        clauses.append("p.category_id = ?")
+        params.append(category_id)
+    if in_stock_only:
+        clauses.append("p.stock > 0")
+    # Nome pesa mais que variações, que pesam mais que a descrição
+    query = f"""
+        SELECT p.*
+        FROM products_fts
+        JOIN products p ON p.id = products_fts.rowid
+        WHERE {" AND ".join(clauses)}
+        ORDER BY bm25(products_fts, 10.0, 1.0, 4.0), p.name
+        LIMIT ?
+    """
+    params.append(limit)
+    return query, params
+
+def search_products(text, category_id=None, in_stock_only=False, include_inactive=False, limit=SEARCH_LIMIT):
+    """Produtos cujo nome, descrição ou variação casam com ``text``, do mais relevante ao menos.
+
+    Ignora acentos e maiúsculas e aceita palavras incompletas ("acai"
+    encontra "Açaí", "piz" encontra "Pizza"). As linhas têm as mesmas
+    colunas de get_products.
+    """
+    if not fts_match(text):
+        return []
+    query, params = search_products_query(text, category_id, in_stock_only, include_inactive, limit)
+    with db_connection() as conn:
+        return conn.execute(query, params).fetchall()
+
+def menu_snapshot_query(category_id=None, product_ids=None, in_stock_only=False):
+    params = []
+    clauses = ["p.is_active = 1"]
+    if category_id:
+        clauses.append("p.category_id = ?")
+        params.append(category_id)
+    if product_ids is not None:
+        clauses.append(f"p.id IN ({', '.join('?' for _ in product_ids)})")
+        params.extend(product_ids)
+    if in_stock_only:
+        clauses.append("p.stock > 0")
+    where = " AND ".join(clauses)
+    variation_stock = " AND v.stock > 0" if in_stock_only else ""
+    # Primeiro as linhas dos produtos (kind 0), depois as das variações
+    # (kind 1), só com as colunas que a variação usa. Um JOIN comum repetiria
+    # as colunas do produto em cada variação, e converter essas células em
+    # objetos Python saía mais caro do que as antigas consultas N+1.
+    query = f"""
+        SELECT 0 AS kind, p.id, p.name AS name, p.description, p.price, p.image_url,
+               p.stock, p.category_id, c.name, p.has_variations, NULL
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+        WHERE {where}
+        UNION ALL
+        SELECT 1, v.product_id, v.variation_name, NULL, v.price, NULL,
+               v.stock, NULL, NULL, NULL, v.id
+        FROM products p
+        JOIN product_variations v ON v.product_id = p.id AND v.is_active = 1{variation_stock}
+        WHERE p.has_variations = 1 AND {where}
+        ORDER BY kind, name
+    """
+    return query, params * 2
+
+def get_menu_snapshot(category_id=None, search=None, in_stock_only=False):
+    """Cardápio com as variações de cada produto embutidas, numa única consulta.
+
+    Usado pela API web, pelo cardápio digital e pelo PDV. Com ``search`` os
+    produtos vêm de search_products, na ordem de relevância; sem ela, por
+    nome. ``in_stock_only`` esconde produtos e variações sem estoque, como o
+    cardápio do cliente sempre fez.
+    """
+    product_ids = None
+    if search:
+        product_ids = [row[0] for row in search_products(search, category_id, in_stock_only)]
+        if not product_ids:
+            return []
+    query, params = menu_snapshot_query(category_id, product_ids, in_stock_only)
+    snapshot = []
+    by_id = {}
+    with db_connection() as conn:
+        for row in conn.execute(query, params):
+            if row[0] == 0:
+                product = {
+                    'id': row[1],
+                    'name': row[2],
+                    'description': row[3],
+                    'price': row[4],
+                    'image_url': row[5],
+                    'stock': row[6],
+                    'category_id': row[7],
+                    'category_name': row[8],
+                    'has_variations': bool(row[9]),
+                    'variations': [],
+                }
+                snapshot.append(product)
+                by_id[row[1]] = product
+            else:
+                # Variações chegam ordenadas pelo nome, então cada lista já sai em ordem
+                by_id[row[1]]['variations'].append(
+                    {'id': row[10], 'name': row[2], 'price': row[4], 'stock': row[6]}
+                )
+    if product_ids:
+        rank = {product_id: i for i, product_id in enumerate(product_ids)}
+        snapshot.sort(key=lambda product: rank[product['id']])
+    return snapshot
 
 def get_products_by_category_with_variations(category_id=None):
     """Retorna produtos com suas variações por categoria"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    if category_id:
-        cursor.execute("""
-            SELECT p.*, c.name as category_name 
-            FROM products p 
-            LEFT JOIN categories c ON p.category_id = c.id 
-            WHERE p.category_id = ? AND p.is_active = 1 
-            ORDER BY p.name
-        """, (category_id,))
-    else:
-        cursor.execute("""
-            SELECT p.*, c.name as category_name 
-            FROM products p 
-            LEFT JOIN categories c ON p.category_id = c.id 
-            WHERE p.is_active = 1 
-            ORDER BY p.name
-        """)
-    
-    products = cursor.fetchall()
-    
-    # Para cada produto, buscar suas variações
-    for product in products:
-        if product['has_variations']:
-            cursor.execute("""
-                SELECT * FROM product_variations 
-                WHERE product_id = ? AND is_active = 1 
-                ORDER BY variation_name
-            """, (product['id'],))
-            product['variations'] = cursor.fetchall()
-        else:
-            product['variations'] = []
-    
-    conn.close()
-    return products
+    return get_menu_snapshot(category_id)
 
 def add_stock_entry(product_id, quantity, unit_cost, supplier=None, notes=None, update_product_stock=True):
-    conn = get_connection()
-    cursor = conn.cursor()
-    total_cost = quantity * unit_cost
-    cursor.execute(
-        "INSERT INTO stock_entries (product_id, quantity, unit_cost, total_cost, supplier, notes) VALUES (?, ?, ?, ?, ?, ?)",
-        (product_id, quantity, unit_cost, total_cost, supplier, notes)
-    )
-    if update_product_stock:
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        total_cost = quantity * unit_cost
         cursor.execute(
-            "UPDATE products SET stock = stock + ? WHERE id = ?",
-            (quantity, product_id)
+            "INSERT INTO stock_entries (product_id, quantity, unit_cost, total_cost, supplier, notes) VALUES (?, ?, ?, ?, ?, ?)",
+            (product_id, quantity, unit_cost, total_cost, supplier, notes)
         )
-    conn.commit()
-    conn.close()
+        if update_product_stock:
+            cursor.execute(
+                "UPDATE products SET stock = stock + ? WHERE id = ?",
+                (quantity, product_id)
+            )
 
 
 def get_stock_entries(product_id=None, start_date=None, end_date=None):
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = "SELECT id, product_id, quantity, unit_cost, total_cost, supplier, notes, created_at FROM stock_entries WHERE 1=1"
-    params = []
-    if product_id:
-        query += " AND product_id = ?"
-        params.append(product_id)
-    if start_date:
-        query += " AND date(created_at) >= ?"
-        params.append(start_date)
-    if end_date:
-        query += " AND date(created_at) <= ?"
-        params.append(end_date)
-    query += " ORDER BY created_at DESC"
-    cursor.execute(query, params)
-    entries = cursor.fetchall()
-    conn.close()
-    return entries 
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        query = "SELECT id, product_id, quantity, unit_cost, total_cost, supplier, notes, created_at FROM stock_entries WHERE 1=1"
+        params = []
+        if product_id:
+            query += " AND product_id = ?"
+            params.append(product_id)
+        # Limites semiabertos em created_at para usar idx_stock_entries_created
+        if start_date:
+            query += " AND created_at >= ?"
+            params.append(start_date)
+        if end_date:
+            query += " AND created_at < date(?, '+1 day')"
+            params.append(end_date)
+        query += " ORDER BY created_at DESC"
+        cursor.execute(query, params)
+        entries = cursor.fetchall()
+        return entries 
 
 def register_missing_stock_entries():
-    conn = get_connection()
-    cursor = conn.cursor()
-    # Buscar todos os produtos
-    cursor.execute("SELECT id, stock, cost_price FROM products")
-    products = cursor.fetchall()
-    for pid, stock, cost_price in products:
-        # Verificar se já existe entrada para o produto
-        cursor.execute("SELECT COUNT(*) FROM stock_entries WHERE product_id = ?", (pid,))
-        count = cursor.fetchone()[0]
-        if count == 0 and stock > 0:
-            cursor.execute(
-                "INSERT INTO stock_entries (product_id, quantity, unit_cost, total_cost, supplier, notes) VALUES (?, ?, ?, ?, ?, ?)",
-                (pid, stock, cost_price or 0, (stock * (cost_price or 0)), None, "Entrada retroativa para produto já cadastrado")
-            )
-    conn.commit()
-    conn.close() 
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # Buscar todos os produtos
+        cursor.execute("SELECT id, stock, cost_price FROM products")
+        products = cursor.fetchall()
+        for pid, stock, cost_price in products:
+            # Verificar se já existe entrada para o produto
+            cursor.execute("SELECT COUNT(*) FROM stock_entries WHERE product_id = ?", (pid,))
+            count = cursor.fetchone()[0]
+            if count == 0 and stock > 0:
+                cursor.execute(
+                    "INSERT INTO stock_entries (product_id, quantity, unit_cost, total_cost, supplier, notes) VALUES (?, ?, ?, ?, ?, ?)",
+                    (pid, stock, cost_price or 0, (stock * (cost_price or 0)), None, "Entrada retroativa para produto já cadastrado")
+                )
 
 def fix_invalid_image_urls():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, image_url FROM products")
-    for pid, image_url in cursor.fetchall():
-        if not isinstance(image_url, str) or not image_url.startswith("static/"):
-            cursor.execute("UPDATE products SET image_url = NULL WHERE id = ?", (pid,))
-    conn.commit()
-    conn.close() 
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, image_url FROM products")
+        for pid, image_url in cursor.fetchall():
+            if not isinstance(image_url, str) or not image_url.startswith("static/"):
+                cursor.execute("UPDATE products SET image_url = NULL WHERE id = ?", (pid,))
 
 def fix_sales_missing_user_id(default_user_id=None):
-    conn = get_connection()
-    cursor = conn.cursor()
-    # Se não passar um user_id, tenta pegar o admin
-    if default_user_id is None:
-        cursor.execute("SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1")
-        row = cursor.fetchone()
-        if row:
-            default_user_id = row[0]
-        else:
-            raise Exception('Nenhum usuário admin encontrado para atribuir às vendas antigas.')
-    # Atualiza todas as vendas sem user_id
-    cursor.execute("UPDATE sales SET user_id = ? WHERE user_id IS NULL", (default_user_id,))
-    conn.commit()
-    conn.close() 
\ No newline at end of file
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # Se não passar um user_id, tenta pegar o admin
+        if default_user_id is None:
+            cursor.execute("SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1")
+            row = cursor.fetchone()
+            if row:
+                default_user_id = row[0]
+            else:
+                raise Exception('Nenhum usuário admin encontrado para atribuir às vendas antigas.')
+        # Atualiza todas as vendas sem user_id
+        cursor.execute("UPDATE sales SET user_id = ? WHERE user_id IS NULL", (default_user_id,))
+# Pedidos (tela de pedidos do app)
+#
+# A grade da tela mostra uma página por vez, do pedido mais novo para o mais
+# antigo, paginada por chave em (created_at, id) como list_orders_page. O
+# filtro de status usa o índice (status, created_at); a busca por número do
+# pedido, mesa ou cliente é um LIKE sobre as linhas que o status já separou.
+
+ORDER_PAGE_SIZE = 10
+
+_ORDER_CARD_COLUMNS = """
+    SELECT o.id, t.number, o.customer_name, o.status, o.total_amount, o.created_at,
+           (SELECT GROUP_CONCAT(oi.quantity || 'x ' || p.name, ', ')
+            FROM order_items oi
+            JOIN products p ON oi.product_id = p.id
+            WHERE oi.order_id = o.id)
+    FROM orders o
+    LEFT JOIN tables t ON o.table_id = t.id
+"""
+
+def _like_escape(text):
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def order_filter_clauses(status=None, search=None):
+    clauses = []
+    params = []
+    if status:
+        clauses.append("o.status = ?")
+        params.append(status)
+    search = (search or "").strip().lower()
+    if search:
+        clauses.append(
+            "(CAST(o.id AS TEXT) LIKE ? ESCAPE '\\' OR CAST(t.number AS TEXT) LIKE ? ESCAPE '\\'"
+            " OR LOWER(o.customer_name) LIKE ? ESCAPE '\\')"
+        )
+        params.extend([_like_escape(search)] * 3)
+    return clauses, params
+
+def order_cards_query(status=None, search=None, cursor=None, limit=ORDER_PAGE_SIZE):
+    clauses, params = order_filter_clauses(status, search)
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        clauses.append("(o.created_at, o.id) < (?, ?)")
+        params.extend([created_at, order_id])
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    # Uma linha a mais para saber se existe próxima página
+    query = _ORDER_CARD_COLUMNS + where + " ORDER BY o.created_at DESC, o.id DESC LIMIT ?"
+    params.append(limit + 1)
+    return query, params
+
+def order_count_query(status=None, search=None):
+    clauses, params = order_filter_clauses(status, search)
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    # A mesa só entra no COUNT quando a busca precisa dela
+    join = " LEFT JOIN tables t ON o.table_id = t.id" if search and search.strip() else ""
+    return f"SELECT COUNT(*) FROM orders o{join}{where}", params
+
+def _order_card(row):
+    order_id, number, customer_name, status, total_amount, created_at, items = row
+    return {
+        "id": order_id,
+        "mesa": number if number is not None else "-",
+        "cliente": customer_name or "-",
+        "itens": items or "-",
+        "valor": total_amount or 0.0,
+        "status": status or "-",
+        "created_at": created_at,
+    }
+
+def list_order_cards(status=None, search=None, cursor=None, limit=ORDER_PAGE_SIZE):
+    """Uma página de pedidos para a grade da tela de pedidos.
+
+    Retorna (pedidos, cursor da próxima página ou None, total de pedidos que
+    passam pelo filtro). Cada pedido é um dict com id, mesa, cliente, itens
+    (ex.: "2x Pizza, 1x Suco"), valor, status e created_at.
+    """
+    query, params = order_cards_query(status, search, cursor, limit)
+    count_query, count_params = order_count_query(status, search)
+    with db_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+        total = conn.execute(count_query, count_params).fetchone()[0]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][5], rows[-1][0])
+    return [_order_card(row) for row in rows], next_cursor, total
+
+def get_order_cards(order_ids):
+    """Os pedidos de ``order_ids`` no formato de list_order_cards (os apagados não vêm)"""
+    query = _ORDER_CARD_COLUMNS + " WHERE o.id IN (SELECT value FROM json_each(?))"
+    with db_connection() as conn:
+        rows = conn.execute(query, (json.dumps(list(order_ids)),)).fetchall()
+    return [_order_card(row) for row in rows]
+
+def list_order_ids(status=None, search=None):
+    """Ids de todos os pedidos que passam pelo filtro da grade"""
+    clauses, params = order_filter_clauses(status, search)
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    with db_connection() as conn:
+        return [row[0] for row in conn.execute(
+            f"SELECT o.id FROM orders o LEFT JOIN tables t ON o.table_id = t.id{where}", params)]
+
+# Os comandos abaixo recebem a lista de ids como um único parâmetro JSON, então
+# o tamanho do lote não esbarra no limite de variáveis do SQLite. Itens de
+# variação ("Variação: ..." em notes) não sabem qual variação baixaram e não
+# devolvem estoque, como em orders.update_order_items.
+
+_SELECTED = "SELECT value FROM json_each(?)"
+
+def _return_stock(conn, selected, params):
+    conn.execute(f"""
+        UPDATE products
+        SET stock = stock + (
+            SELECT SUM(oi.quantity) FROM order_items oi
+            WHERE oi.product_id = products.id
+              AND oi.order_id IN ({selected})
+              AND (oi.notes IS NULL OR oi.notes NOT LIKE 'Variação:%')
+        )
+        WHERE id IN (
+            SELECT oi.product_id FROM order_items oi
+            WHERE oi.order_id IN ({selected})
+              AND (oi.notes IS NULL OR oi.notes NOT LIKE 'Variação:%')
+        )
+    """, params * 2)
+
+def _free_tables(conn, selected, params):
+    conn.execute(f"""
+        UPDATE tables SET status = 'livre'
+        WHERE id IN (SELECT table_id FROM orders WHERE id IN ({selected}) AND table_id IS NOT NULL)
+    """, params)
+
+def cancel_orders(order_ids):
+    """Cancela os pedidos em aberto de ``order_ids``: devolve o estoque e libera as mesas.
+
+    Pedidos já entregues ou cancelados são ignorados. Retorna quantos
+    pedidos foram cancelados.
+    """
+    ids = json.dumps([int(order_id) for order_id in order_ids])
+    with db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        selected = f"SELECT id FROM orders WHERE id IN ({_SELECTED}) AND status NOT IN ('entregue', 'cancelado')"
+        _return_stock(conn, selected, [ids])
+        _free_tables(conn, selected, [ids])
+        return conn.execute(f"UPDATE orders SET status = 'cancelado' WHERE id IN ({selected})", (ids,)).rowcount
+
+def delete_orders(order_ids):
+    """Apaga os pedidos de ``order_ids`` e os seus itens, liberando as mesas.
+
+    O estoque volta para os pedidos que não estavam cancelados (os
+    cancelados já devolveram). Retorna quantos pedidos foram apagados.
+    """
+    ids = json.dumps([int(order_id) for order_id in order_ids])
+    with db_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        _return_stock(conn, f"SELECT id FROM orders WHERE id IN ({_SELECTED}) AND status != 'cancelado'", [ids])
+        _free_tables(conn, _SELECTED, [ids])
+        conn.execute(f"DELETE FROM order_items WHERE order_id IN ({_SELECTED})", (ids,))
+        return conn.execute(f"DELETE FROM orders WHERE id IN ({_SELECTED})", (ids,)).rowcount
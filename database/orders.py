@@ -0,0 +1,513 @@
+import base64
+from datetime import datetime, timedelta
+
+from .db import get_connection
+
+# Consultas de pedidos para as telas da equipe.
+#
+# A listagem é paginada por chave (keyset) em (created_at, id), do mais novo
+# para o mais antigo: o cursor carrega o último par devolvido e a página
+# seguinte começa logo abaixo dele, sem OFFSET. O total de cada pedido vem
+# do mesmo comando, agregando os itens apenas dos pedidos da página.
+#
+# Para atualizações incrementais há também o cursor de sincronização, em
+# (updated_at, id): gatilhos (migração 0008) marcam updated_at a cada escrita
+# em orders ou order_items e deixam uma lápide em order_tombstones quando um
+# pedido é apagado. Como o SQLite serializa as escritas, um commit posterior
+# nunca recebe updated_at menor que o de um anterior; ainda assim o cursor
+# de uma resposta completa volta ao início do último instante (id 0), para
+# que um empate no mesmo milissegundo seja reenviado em vez de perdido.
+
+ACTIVE_STATUSES = ("pendente", "preparando", "pronto")
+RECENT_HOURS = 24
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+SYNC_LIMIT = 500
+
+
+class OrderError(ValueError):
+    """Pedido recusado; a mensagem pode ser mostrada ao cliente"""
+
+
+class OutOfStock(OrderError):
+    """Um item do pedido não tem estoque suficiente (ou não existe)"""
+
+    def __init__(self, product_id, variation_id, name, requested, available):
+        self.product_id = product_id
+        self.variation_id = variation_id
+        self.name = name
+        self.requested = requested
+        self.available = available
+        if available is None:
+            message = f"Produto {product_id} não encontrado"
+        else:
+            message = f"Estoque insuficiente para {name}: pedido {requested}, disponível {available}"
+        super().__init__(message)
+
+    def as_dict(self):
+        return {
+            'product_id': self.product_id,
+            'variation_id': self.variation_id,
+            'name': self.name,
+            'requested': self.requested,
+            'available': self.available,
+        }
+
+
+def encode_cursor(created_at, order_id):
+    raw = f"{created_at}|{order_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Retorna (created_at, id) do cursor ou levanta ValueError se for inválido"""
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").rsplit("|", 1)
+        return created_at, int(order_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor!r}") from e
+
+
+def clamp_limit(limit):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def orders_page_query(status=None, cursor=None, limit=DEFAULT_LIMIT, history=False, now=None):
+    params = []
+    clauses = []
+    if status:
+        clauses.append("o.status = ?")
+        params.append(status)
+    if cursor:
+        created_at, order_id = decode_cursor(cursor)
+        clauses.append("(o.created_at, o.id) < (?, ?)")
+        params.extend([created_at, order_id])
+
+    select = "SELECT o.id, o.status, o.created_at, o.table_id, o.notes FROM orders o"
+    if history:
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        page = select + where
+    else:
+        # Janela padrão: pedidos em andamento, de qualquer data, mais os das
+        # últimas RECENT_HOURS horas. Cada metade usa o seu índice
+        # (status, created_at) e (created_at); com um OR o SQLite percorria o
+        # histórico inteiro sempre que a página não enchia.
+        since = (now or datetime.now()) - timedelta(hours=RECENT_HOURS)
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        active = " WHERE " + " AND ".join([f"o.status IN ({placeholders})"] + clauses)
+        recent = " WHERE " + " AND ".join(["o.created_at >= ?"] + clauses)
+        page = select + active + " UNION " + select + recent
+        params = list(ACTIVE_STATUSES) + params + [since.strftime("%Y-%m-%d %H:%M:%S")] + params
+    # Busca uma linha a mais para saber se existe próxima página
+    query = f'''
+        WITH page AS (
+            {page}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+        )
+        SELECT page.id, page.status, page.created_at, page.notes,
+               t.number, t.capacity,
+               COALESCE(SUM(oi.quantity * oi.unit_price), 0) AS total
+        FROM page
+        LEFT JOIN tables t ON t.id = page.table_id
+        LEFT JOIN order_items oi ON oi.order_id = page.id
+        GROUP BY page.id
+        ORDER BY page.created_at DESC, page.id DESC
+    '''
+    params.append(limit + 1)
+    return query, params
+
+
+def list_orders_page(status=None, cursor=None, limit=DEFAULT_LIMIT, history=False):
+    """Uma página de pedidos com o total dos itens já somado.
+
+    Sem ``history`` só entram pedidos em andamento ou recentes. Retorna
+    (pedidos, próximo cursor ou None).
+    """
+    limit = clamp_limit(limit)
+    query, params = orders_page_query(status, cursor, limit, history)
+    conn = get_connection()
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][0])
+    return [_order_from_row(row) for row in rows], next_cursor
+
+
+def sync_cursor():
+    """Cursor de sincronização para o estado atual dos pedidos.
+
+    Deve ser lido antes da listagem completa: o que mudar entre as duas
+    leituras tem updated_at igual ou maior e volta no próximo delta.
+    """
+    conn = get_connection()
+    row = conn.execute('''
+        SELECT MAX(COALESCE((SELECT MAX(updated_at) FROM orders), ''),
+                   COALESCE((SELECT MAX(deleted_at) FROM order_tombstones), ''))
+    ''').fetchone()
+    conn.close()
+    return encode_cursor(row[0], 0)
+
+
+def changes_since_query(since, limit=SYNC_LIMIT):
+    updated_at, order_id = decode_cursor(since)
+    query = '''
+        WITH changed AS (
+            SELECT o.id, o.status, o.created_at, o.table_id, o.notes, o.updated_at
+            FROM orders o
+            WHERE (o.updated_at, o.id) > (?, ?)
+            ORDER BY o.updated_at, o.id
+            LIMIT ?
+        )
+        SELECT changed.id, changed.status, changed.created_at, changed.notes,
+               t.number, t.capacity,
+               COALESCE(SUM(oi.quantity * oi.unit_price), 0) AS total,
+               changed.updated_at
+        FROM changed
+        LEFT JOIN tables t ON t.id = changed.table_id
+        LEFT JOIN order_items oi ON oi.order_id = changed.id
+        GROUP BY changed.id
+        ORDER BY changed.updated_at, changed.id
+    '''
+    return query, [updated_at, order_id, limit + 1]
+
+
+def tombstones_since_query(since):
+    updated_at, _ = decode_cursor(since)
+    return "SELECT order_id, deleted_at FROM order_tombstones WHERE deleted_at >= ? ORDER BY deleted_at", [updated_at]
+
+
+def list_changes_since(since, limit=SYNC_LIMIT):
+    """Pedidos alterados e apagados depois do cursor ``since``.
+
+    Retorna (pedidos, ids removidos, próximo cursor, há mais). Os pedidos
+    vêm no formato de list_orders_page mais 'updated_at', em ordem de
+    alteração; com ``há mais`` o cliente repete a chamada com o novo cursor.
+    Reenvios são possíveis e o cliente deve tratá-los como substituição (o
+    mesmo id com o mesmo updated_at é o mesmo estado).
+    """
+    limit = max(1, int(limit))
+    query, params = changes_since_query(since, limit)
+    tomb_query, tomb_params = tombstones_since_query(since)
+    conn = get_connection()
+    rows = conn.execute(query, params).fetchall()
+    tombstones = conn.execute(tomb_query, tomb_params).fetchall()
+    conn.close()
+
+    since_at, _ = decode_cursor(since)
+    has_more = len(rows) > limit
+    if has_more:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][7], rows[-1][0])
+    else:
+        latest = max([since_at] + [row[7] for row in rows] + [row[1] for row in tombstones])
+        next_cursor = encode_cursor(latest, 0)
+    removed = [row[0] for row in tombstones]
+    return [dict(_order_from_row(row), updated_at=row[7]) for row in rows], removed, next_cursor, has_more
+
+
+# Criação de pedidos
+
+def _normalize_items(items):
+    normalized = []
+    for item in items:
+        try:
+            quantity = int(item.get('quantity', 1))
+            product_id = int(item['product_id'])
+        except (KeyError, TypeError, ValueError):
+            raise OrderError(f"Item inválido: {item!r}")
+        if quantity <= 0:
+            raise OrderError(f"Quantidade inválida para o produto {product_id}: {quantity}")
+        normalized.append({
+            'product_id': product_id,
+            'variation_id': item.get('variation_id') or None,
+            'variation_name': item.get('variation_name', ''),
+            'quantity': quantity,
+            'price': item.get('price'),
+        })
+    return normalized
+
+
+def _fill_prices(conn, items):
+    """Preço atual do banco para os itens que não trazem 'price'"""
+    missing = [item for item in items if item['price'] is None]
+    if not missing:
+        return
+    product_ids = list({item['product_id'] for item in missing if not item['variation_id']})
+    variation_ids = list({item['variation_id'] for item in missing if item['variation_id']})
+    prices = {}
+    if product_ids:
+        placeholders = ", ".join("?" for _ in product_ids)
+        for pid, price in conn.execute(f"SELECT id, price FROM products WHERE id IN ({placeholders})", product_ids):
+            prices[(pid, None)] = price
+    if variation_ids:
+        placeholders = ", ".join("?" for _ in variation_ids)
+        for vid, pid, price in conn.execute(
+                f"SELECT id, product_id, price FROM product_variations WHERE id IN ({placeholders})", variation_ids):
+            prices[(pid, vid)] = price
+    for item in missing:
+        price = prices.get((item['product_id'], item['variation_id']))
+        if price is None:
+            raise OutOfStock(item['product_id'], item['variation_id'], None, item['quantity'], None)
+        item['price'] = price
+
+
+def _fill_costs(conn, items):
+    """Custo atual (da variação, se houver) de cada item, gravado em order_items.unit_cost"""
+    product_ids = list({item['product_id'] for item in items if not item['variation_id']})
+    variation_ids = list({item['variation_id'] for item in items if item['variation_id']})
+    costs = {}
+    if product_ids:
+        placeholders = ", ".join("?" for _ in product_ids)
+        for pid, cost in conn.execute(f"SELECT id, cost_price FROM products WHERE id IN ({placeholders})", product_ids):
+            costs[(pid, None)] = cost
+    if variation_ids:
+        placeholders = ", ".join("?" for _ in variation_ids)
+        for vid, pid, cost in conn.execute(
+                f"SELECT id, product_id, cost_price FROM product_variations WHERE id IN ({placeholders})", variation_ids):
+            costs[(pid, vid)] = cost
+    for item in items:
+        item['cost'] = costs.get((item['product_id'], item['variation_id'])) or 0
+
+
+def _take_stock(conn, items):
+    """Baixa o estoque só se houver o suficiente; senão levanta OutOfStock.
+
+    Itens repetidos do mesmo produto (ou variação) são somados, para que o
+    teste ``stock >= ?`` valha para o pedido inteiro.
+    """
+    wanted = {}
+    for item in items:
+        key = (item['product_id'], item['variation_id'])
+        wanted[key] = wanted.get(key, 0) + item['quantity']
+    for (product_id, variation_id), quantity in wanted.items():
+        if variation_id:
+            updated = conn.execute(
+                "UPDATE product_variations SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                (quantity, variation_id, quantity)
+            ).rowcount
+        else:
+            updated = conn.execute(
+                "UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                (quantity, product_id, quantity)
+            ).rowcount
+        if updated:
+            continue
+        if variation_id:
+            row = conn.execute('''
+                SELECT p.name || ' - ' || v.variation_name, v.stock
+                FROM product_variations v
+                JOIN products p ON p.id = v.product_id
+                WHERE v.id = ?
+            ''', (variation_id,)).fetchone()
+        else:
+            row = conn.execute("SELECT name, stock FROM products WHERE id = ?", (product_id,)).fetchone()
+        name, available = row if row else (None, None)
+        raise OutOfStock(product_id, variation_id, name, quantity, available)
+
+
+def _insert_order(conn, table_id, items, status):
+    """Preços, baixa de estoque, pedido e itens; a transação é de quem chama"""
+    _fill_prices(conn, items)
+    _fill_costs(conn, items)
+    _take_stock(conn, items)
+
+    total = sum(item['price'] * item['quantity'] for item in items)
+    order_id = conn.execute(
+        "INSERT INTO orders (table_id, status, total_amount, created_at) VALUES (?, ?, ?, ?)",
+        (table_id, status, total, datetime.now().isoformat(sep=" "))
+    ).lastrowid
+    conn.executemany(
+        "INSERT INTO order_items (order_id, product_id, quantity, unit_price, unit_cost, notes) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (order_id, item['product_id'], item['quantity'], item['price'], item['cost'],
+             f"Variação: {item['variation_name']}" if item['variation_id'] else None)
+            for item in items
+        ]
+    )
+    if table_id:
+        conn.execute("UPDATE tables SET status = 'ocupada' WHERE id = ? AND status = 'livre'", (table_id,))
+    return order_id, total
+
+
+def place_order(table_id, items, check_capacity=True, status='pendente'):
+    """Cria o pedido, os itens e a baixa de estoque numa só transação.
+
+    A transação começa com BEGIN IMMEDIATE, então dois pedidos simultâneos
+    do último item são serializados e o segundo recebe OutOfStock em vez de
+    deixar o estoque negativo. Itens sem 'price' usam o preço do banco.
+    Com ``check_capacity`` a mesa precisa existir e ter lugar para mais um
+    pedido ativo. Retorna (id do pedido, total).
+    """
+    items = _normalize_items(items)
+    if not items:
+        raise OrderError("Nenhum item no pedido")
+
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if check_capacity:
+            placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+            table = conn.execute(f'''
+                SELECT t.capacity,
+                       (SELECT COUNT(*) FROM orders o
+                        WHERE o.table_id = t.id AND o.status IN ({placeholders}))
+                FROM tables t
+                WHERE t.id = ?
+            ''', list(ACTIVE_STATUSES) + [table_id]).fetchone()
+            if not table:
+                raise OrderError("Mesa não encontrada")
+            capacity, active_orders = table
+            if active_orders >= capacity:
+                raise OrderError(f"Mesa lotada! Capacidade: {capacity} pessoas. Pedidos ativos: {active_orders}")
+
+        order_id, total = _insert_order(conn, table_id, items, status)
+        conn.commit()
+        return order_id, total
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def sell_counter_order(items, user_id, payment_method):
+    """Venda de balcão do PDV: pedido, itens, estoque e venda numa só transação.
+
+    Como no fluxo antigo do PDV, o pedido é apagado depois da venda e só os
+    itens e a venda ficam (para o cálculo do lucro). Retorna (id do pedido,
+    total); com estoque insuficiente nada é gravado.
+    """
+    items = _normalize_items(items)
+    if not items:
+        raise OrderError("Nenhum item no pedido")
+
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        order_id, total = _insert_order(conn, None, items, 'pendente')
+        conn.execute(
+            "INSERT INTO sales (order_id, user_id, payment_method, total_amount, created_at) VALUES (?, ?, ?, ?, ?)",
+            (order_id, user_id, payment_method, total, datetime.now().isoformat())
+        )
+        conn.execute("DELETE FROM orders WHERE id = ?", (order_id,))
+        conn.commit()
+        return order_id, total
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def update_order_items(order_id, items):
+    """Grava de uma vez a edição dos itens de um pedido aberto.
+
+    ``items`` é a lista completa depois da edição; itens já gravados trazem
+    'item_id'. Linhas que sumiram são apagadas, quantidades alteradas são
+    atualizadas e itens novos inseridos. A diferença de quantidade mexe no
+    estoque do produto (baixa condicional, como em place_order, ou
+    devolução); linhas com variação não mexem, porque o PDV não sabe qual
+    variação foi baixada. Retorna o novo total.
+    """
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if not conn.execute("SELECT 1 FROM orders WHERE id = ?", (order_id,)).fetchone():
+            raise OrderError("Pedido não encontrado")
+        saved = {
+            row[0]: row[1:] for row in conn.execute(
+                "SELECT id, product_id, quantity, notes FROM order_items WHERE order_id = ?", (order_id,))
+        }
+
+        taken, returned = {}, {}
+        updates, inserts, kept = [], [], set()
+        for item in items:
+            item_id = item.get('item_id')
+            quantity = int(item['quantity'])
+            if quantity <= 0:
+                raise OrderError(f"Quantidade inválida para o produto {item['product_id']}: {quantity}")
+            if item_id in saved:
+                kept.add(item_id)
+                product_id, old_quantity, notes = saved[item_id]
+                if quantity == old_quantity:
+                    continue
+                updates.append((quantity, item_id))
+                delta = quantity - old_quantity
+            else:
+                product_id, notes = int(item['product_id']), item.get('notes')
+                inserts.append((order_id, product_id, quantity, item['price'], notes))
+                delta = quantity
+            if notes and notes.startswith("Variação:"):
+                continue
+            bucket = taken if delta > 0 else returned
+            bucket[product_id] = bucket.get(product_id, 0) + abs(delta)
+        removed = [item_id for item_id in saved if item_id not in kept]
+        for item_id in removed:
+            product_id, quantity, notes = saved[item_id]
+            if not (notes and notes.startswith("Variação:")):
+                returned[product_id] = returned.get(product_id, 0) + quantity
+
+        _take_stock(conn, [
+            {'product_id': product_id, 'variation_id': None, 'quantity': quantity}
+            for product_id, quantity in taken.items()
+        ])
+        conn.executemany("UPDATE products SET stock = stock + ? WHERE id = ?",
+                         [(quantity, product_id) for product_id, quantity in returned.items()])
+        conn.executemany("DELETE FROM order_items WHERE id = ?", [(item_id,) for item_id in removed])
+        conn.executemany("UPDATE order_items SET quantity = ? WHERE id = ?", updates)
+        conn.executemany(
+            "INSERT INTO order_items (order_id, product_id, quantity, unit_price, notes) VALUES (?, ?, ?, ?, ?)",
+            inserts
+        )
+        total = conn.execute(
+            "SELECT COALESCE(SUM(quantity * unit_price), 0) FROM order_items WHERE order_id = ?", (order_id,)
+        ).fetchone()[0]
+        conn.execute("UPDATE orders SET total_amount = ? WHERE id = ?", (total, order_id))
+        conn.commit()
+        return total
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def get_orders_by_ids(order_ids):
+    """Resumo dos pedidos indicados (mesmo formato de list_orders_page), por id"""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    placeholders = ", ".join("?" for _ in order_ids)
+    conn = get_connection()
+    rows = conn.execute(f'''
+        SELECT o.id, o.status, o.created_at, o.notes,
+               t.number, t.capacity,
+               COALESCE(SUM(oi.quantity * oi.unit_price), 0) AS total
+        FROM orders o
+        LEFT JOIN tables t ON t.id = o.table_id
+        LEFT JOIN order_items oi ON oi.order_id = o.id
+        WHERE o.id IN ({placeholders})
+        GROUP BY o.id
+    ''', order_ids).fetchall()
+    conn.close()
+    return {row[0]: _order_from_row(row) for row in rows}
+
+
+def _order_from_row(row):
+    return {
+        'id': row[0],
+        'status': row[1],
+        'created_at': row[2],
+        'notes': row[3],
+        'table_number': row[4],
+        'table_capacity': row[5],
+        'total': row[6],
+    }
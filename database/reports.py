@@ -0,0 +1,301 @@
+import argparse
+
+from .db import DB_PATH, get_connection
+from .orders import encode_cursor, decode_cursor
+
+# Consultas de relatório (vendas, lucro, mais vendidos, entradas de estoque).
+#
+# Filtros de período recebem datas inclusivas 'AAAA-MM-DD' (como nos campos das
+# telas) e comparam created_at com limites semiabertos [início, fim + 1 dia).
+# Assim o SQLite usa os índices em created_at; date(created_at) BETWEEN ? AND ?
+# obrigava a percorrer a tabela inteira. Cada *_query() devolve (sql, params)
+# para que os testes possam verificar o plano com EXPLAIN QUERY PLAN.
+#
+# Totais e lucro de vendas vêm de sales_daily, o resumo por dia, forma de
+# pagamento e operador que os gatilhos da migração 0011 mantêm a cada venda:
+# um mês custa ~30 linhas por combinação. Para refazê-lo a partir das vendas:
+#
+#     python -m database.reports rebuild [--db caminho/do/banco.db]
+
+
+def _date_range(column, start_date, end_date, params):
+    clauses = []
+    if start_date:
+        clauses.append(f"{column} >= ?")
+        params.append(str(start_date))
+    if end_date:
+        clauses.append(f"{column} < date(?, '+1 day')")
+        params.append(str(end_date))
+    return clauses
+
+
+def _where(clauses):
+    return (" WHERE " + " AND ".join(clauses)) if clauses else ""
+
+
+# Vendas
+
+def sales_list_query(start_date, end_date, payment_method=None, user_id=None, min_amount=None, max_amount=None):
+    params = []
+    clauses = _date_range("s.created_at", start_date, end_date, params)
+    if payment_method:
+        clauses.append("s.payment_method = ?")
+        params.append(payment_method)
+    if user_id:
+        clauses.append("s.user_id = ?")
+        params.append(user_id)
+    if min_amount is not None:
+        clauses.append("s.total_amount >= ?")
+        params.append(min_amount)
+    if max_amount is not None:
+        clauses.append("s.total_amount <= ?")
+        params.append(max_amount)
+    query = '''
+        SELECT s.id, s.created_at, s.total_amount, s.payment_method, u.name, u.username
+        FROM sales s
+        LEFT JOIN users u ON s.user_id = u.id
+    ''' + _where(clauses) + " ORDER BY s.created_at DESC"
+    return query, params
+
+
+def list_sales(start_date, end_date, payment_method=None, user_id=None, min_amount=None, max_amount=None):
+    """Lista as vendas do período com o nome do operador"""
+    query, params = sales_list_query(start_date, end_date, payment_method, user_id, min_amount, max_amount)
+    conn = get_connection()
+    sales = conn.execute(query, params).fetchall()
+    conn.close()
+    return sales
+
+
+def _day_range(start_date, end_date, params):
+    # sales_daily.day é 'AAAA-MM-DD': o intervalo de datas fica fechado
+    clauses = []
+    if start_date:
+        clauses.append("day >= ?")
+        params.append(str(start_date))
+    if end_date:
+        clauses.append("day <= ?")
+        params.append(str(end_date))
+    return clauses
+
+
+def sales_summary_query(start_date=None, end_date=None, user_id=None):
+    params = []
+    clauses = _day_range(start_date, end_date, params)
+    if user_id:
+        clauses.append("user_id = ?")
+        params.append(user_id)
+    query = "SELECT COALESCE(SUM(sales_count), 0), ROUND(COALESCE(SUM(revenue), 0), 2) FROM sales_daily" + _where(clauses)
+    return query, params
+
+
+def sales_summary(start_date=None, end_date=None, user_id=None):
+    """Retorna (número de vendas, total vendido) no período, pelo resumo diário"""
+    query, params = sales_summary_query(start_date, end_date, user_id)
+    conn = get_connection()
+    count, total = conn.execute(query, params).fetchone()
+    conn.close()
+    return count, total or 0
+
+
+def sales_profit_query(start_date, end_date=None):
+    params = []
+    clauses = _day_range(start_date, end_date, params)
+    return "SELECT ROUND(COALESCE(SUM(profit), 0), 2) FROM sales_daily" + _where(clauses), params
+
+
+def sales_profit(start_date, end_date=None):
+    """Lucro (preço de venda - custo na hora da venda) dos itens vendidos no período"""
+    query, params = sales_profit_query(start_date, end_date)
+    conn = get_connection()
+    profit = conn.execute(query, params).fetchone()[0]
+    conn.close()
+    return profit or 0
+
+
+def fill_sales_daily(cursor):
+    """Refaz sales_daily a partir de sales; retorna o número de linhas do resumo.
+
+    Vendas sem custo registrado (carregadas com os gatilhos desligados)
+    recebem o custo gravado nos seus itens. Roda na transação de quem chama.
+    """
+    items = "FROM order_items oi WHERE oi.order_id = sales.order_id"
+    cursor.execute(f'''
+        UPDATE sales SET
+            cost_amount = (SELECT COALESCE(SUM(oi.quantity * COALESCE(oi.unit_cost, 0)), 0) {items}),
+            profit_amount = (SELECT COALESCE(SUM(oi.quantity * (oi.unit_price - COALESCE(oi.unit_cost, 0))), 0) {items})
+        WHERE cost_amount IS NULL
+    ''')
+    cursor.execute("DELETE FROM sales_daily")
+    cursor.execute('''
+        INSERT INTO sales_daily (day, payment_method, user_id, sales_count, revenue, cost, profit)
+        SELECT substr(created_at, 1, 10), payment_method, COALESCE(user_id, 0), COUNT(*),
+               SUM(total_amount), SUM(COALESCE(cost_amount, 0)), SUM(COALESCE(profit_amount, 0))
+        FROM sales
+        GROUP BY 1, 2, 3
+    ''')
+    return cursor.execute("SELECT COUNT(*) FROM sales_daily").fetchone()[0]
+
+
+def rebuild_sales_daily(db_path=None):
+    """Reconstrói o resumo diário de vendas numa única transação"""
+    conn = get_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = fill_sales_daily(conn.cursor())
+        conn.commit()
+        return rows
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def financial_sales_query(start_date, end_date, user_id=None):
+    params = []
+    clauses = _date_range("sales.created_at", start_date, end_date, params)
+    if user_id:
+        clauses.append("sales.user_id = ?")
+        params.append(user_id)
+    # Agrupar por (created_at, id) deixa o SQLite percorrer idx_sales_created;
+    # só "GROUP BY sales.id" o levava a varrer sales pela chave primária.
+    query = '''
+        SELECT sales.id, sales.created_at, users.username, SUM(order_items.quantity * order_items.unit_price) as total
+        FROM sales
+        JOIN order_items ON sales.order_id = order_items.order_id
+        JOIN users ON sales.user_id = users.id
+    ''' + _where(clauses) + '''
+        GROUP BY sales.created_at, sales.id
+        ORDER BY sales.created_at DESC
+    '''
+    return query, params
+
+
+def financial_sales(start_date, end_date, user_id=None):
+    """Vendas do período com o total calculado pelos itens"""
+    query, params = financial_sales_query(start_date, end_date, user_id)
+    conn = get_connection()
+    sales = conn.execute(query, params).fetchall()
+    conn.close()
+    return sales
+
+
+# Produtos mais vendidos
+
+def best_sellers_query(start_date, end_date, limit=20):
+    params = []
+    clauses = _date_range("o.created_at", start_date, end_date, params)
+    # Agrega primeiro os itens do período (índices em orders.created_at e
+    # order_items.order_id) e só depois junta com os produtos ativos. O lucro
+    # usa o custo gravado em cada item (unit_cost), não o custo atual.
+    query = '''
+        SELECT
+            p.id,
+            p.name,
+            p.price,
+            p.cost_price,
+            p.stock,
+            c.name as category_name,
+            COALESCE(v.total_quantity, 0) as total_quantity,
+            COALESCE(v.total_revenue, 0) as total_revenue,
+            COALESCE(v.total_profit, 0) as total_profit
+        FROM products p
+        LEFT JOIN categories c ON p.category_id = c.id
+        LEFT JOIN (
+            SELECT oi.product_id,
+                   SUM(oi.quantity) as total_quantity,
+                   SUM(oi.quantity * oi.unit_price) as total_revenue,
+                   SUM(oi.quantity * (oi.unit_price - COALESCE(oi.unit_cost, 0))) as total_profit
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.id
+    ''' + _where(clauses) + '''
+            GROUP BY oi.product_id
+        ) v ON v.product_id = p.id
+        WHERE p.is_active = 1
+        ORDER BY total_quantity DESC, total_revenue DESC
+        LIMIT ?
+    '''
+    params.append(limit)
+    return query, params
+
+
+def best_sellers(start_date, end_date, limit=20):
+    """Produtos ativos ordenados pela quantidade vendida no período"""
+    query, params = best_sellers_query(start_date, end_date, limit)
+    conn = get_connection()
+    products = conn.execute(query, params).fetchall()
+    conn.close()
+    return products
+
+
+# Entradas de estoque
+
+STOCK_ENTRIES_PAGE_SIZE = 50
+
+
+def stock_entries_page_query(start_date, end_date, cursor=None, limit=STOCK_ENTRIES_PAGE_SIZE):
+    params = []
+    clauses = _date_range("e.created_at", start_date, end_date, params)
+    if cursor:
+        created_at, entry_id = decode_cursor(cursor)
+        clauses.append("(e.created_at, e.id) < (?, ?)")
+        params.extend([created_at, entry_id])
+    # idx_stock_entries_created já vem ordenado por (created_at, id); uma
+    # linha a mais diz se existe próxima página
+    query = '''
+        SELECT e.id, e.product_id, COALESCE(p.name, 'ID ' || e.product_id), e.quantity, e.unit_cost,
+               e.total_cost, e.supplier, e.notes, e.created_at
+        FROM stock_entries e
+        LEFT JOIN products p ON p.id = e.product_id
+    ''' + _where(clauses) + " ORDER BY e.created_at DESC, e.id DESC LIMIT ?"
+    params.append(limit + 1)
+    return query, params
+
+
+def list_stock_entries(start_date, end_date, cursor=None, limit=STOCK_ENTRIES_PAGE_SIZE):
+    """Uma página das entradas do período com o nome do produto.
+
+    Retorna (entradas, cursor da próxima página ou None); cada entrada é
+    (id, product_id, nome do produto, quantity, unit_cost, total_cost,
+    supplier, notes, created_at). Os totais vêm de stock_entries_summary().
+    """
+    query, params = stock_entries_page_query(start_date, end_date, cursor, limit)
+    conn = get_connection()
+    entries = conn.execute(query, params).fetchall()
+    conn.close()
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1][8], entries[-1][0])
+    return entries, next_cursor
+
+
+def stock_entries_summary_query(start_date, end_date):
+    params = []
+    clauses = _date_range("created_at", start_date, end_date, params)
+    return "SELECT COUNT(*), COALESCE(SUM(total_cost), 0) FROM stock_entries" + _where(clauses), params
+
+
+def stock_entries_summary(start_date, end_date):
+    """Retorna (número de entradas, custo total) no período"""
+    query, params = stock_entries_summary_query(start_date, end_date)
+    conn = get_connection()
+    count, total = conn.execute(query, params).fetchone()
+    conn.close()
+    return count, total or 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m database.reports", description="Manutenção dos relatórios do PDV")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--db", default=None, help=f"Arquivo do banco (padrão: {DB_PATH})")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        rows = rebuild_sales_daily(args.db)
+        print(f"Resumo diário de vendas reconstruído: {rows} linha(s) em {args.db or DB_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# Rastreamento das consultas SQL.
+#
+# As conexões do pool (db.PooledConnection) medem cada execute/executemany e
+# chamam record(). Entre begin() e end() a thread acumula quantas consultas
+# fez e quanto tempo passou no SQLite; o middleware de métricas das APIs usa
+# isso para medir cada requisição.
+#
+# Comandos mais lentos que SLOW_QUERY_MS vão para o log "pdv.sql" com os
+# parâmetros e o EXPLAIN QUERY PLAN, e entram no ranking dos TOP_N mais
+# lentos do processo (slow_queries()), mostrado em /api/admin/consultas-lentas
+# e na tela de configurações. O plano é obtido na mesma conexão, logo depois
+# do comando, e só para os lentos.
+
+SLOW_QUERY_MS = float(os.environ.get("PDV_SLOW_QUERY_MS", "100"))
+TOP_N = int(os.environ.get("PDV_SLOW_QUERY_TOP", "20"))
+MAX_PARAMS_REPR = 300
+
+logger = logging.getLogger("pdv.sql")
+
+_local = threading.local()
+_slow_lock = threading.Lock()
+_slow = {}
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+def begin():
+    """Passa a contar as consultas desta thread (ex.: início de uma requisição)"""
+    _local.stats = QueryStats()
+
+
+def end():
+    """Para de contar e retorna o QueryStats acumulado (ou None)"""
+    stats = getattr(_local, "stats", None)
+    _local.stats = None
+    return stats
+
+
+def configure(threshold_ms=None, top_n=None):
+    """Ajusta o limite de consulta lenta e o tamanho do ranking em tempo de execução"""
+    global SLOW_QUERY_MS, TOP_N
+    if threshold_ms is not None:
+        SLOW_QUERY_MS = float(threshold_ms)
+    if top_n is not None:
+        TOP_N = int(top_n)
+        with _slow_lock:
+            _trim()
+
+
+def record(sql, params, seconds, conn=None):
+    stats = getattr(_local, "stats", None)
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += seconds
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        _record_slow(sql, params, seconds, conn)
+
+
+def explain(conn, sql, params=None):
+    """Linhas do EXPLAIN QUERY PLAN de ``sql`` (ou a mensagem de erro)"""
+    try:
+        # Connection.execute da classe base: o EXPLAIN não passa pelo rastreamento
+        rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+    except (sqlite3.Error, ValueError) as e:
+        return [f"(sem plano: {e})"]
+    return [row[3] for row in rows]
+
+
+def _record_slow(sql, params, seconds, conn):
+    sql = " ".join(sql.split())
+    params_repr = repr(params)[:MAX_PARAMS_REPR] if params is not None else ""
+    plan = explain(conn, sql, params) if conn is not None and params is not None else []
+    ms = seconds * 1000
+    logger.warning("Consulta lenta (%.1f ms): %s | parâmetros: %s | plano: %s",
+                   ms, sql, params_repr, " / ".join(plan))
+    with _slow_lock:
+        entry = _slow.get(sql)
+        if entry is None:
+            entry = _slow[sql] = {"sql": sql, "count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        entry["count"] += 1
+        entry["total_ms"] += ms
+        entry["last_seen"] = time.time()
+        if ms >= entry["max_ms"]:
+            # Parâmetros e plano da pior execução
+            entry.update(max_ms=ms, params=params_repr, plan=plan)
+        _trim()
+
+
+def _trim():
+    if len(_slow) > TOP_N:
+        keep = sorted(_slow.values(), key=lambda e: e["max_ms"], reverse=True)[:TOP_N]
+        _slow.clear()
+        _slow.update((e["sql"], e) for e in keep)
+
+
+def slow_queries(limit=None):
+    """Ranking das consultas lentas deste processo, da pior para a melhor"""
+    with _slow_lock:
+        entries = [dict(e) for e in _slow.values()]
+    entries.sort(key=lambda e: e["max_ms"], reverse=True)
+    for entry in entries:
+        entry["avg_ms"] = entry["total_ms"] / entry["count"]
+    return entries[:limit] if limit else entries
+
+
+def reset_slow_queries():
+    with _slow_lock:
+        _slow.clear()
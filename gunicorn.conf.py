@@ -1,7 +1,10 @@
 # Configuração do Gunicorn para o Heroku
 bind = "0.0.0.0:$PORT"
 workers = 2
-worker_class = "sync"
+# Threads por worker: cada tela da equipe mantém uma conexão aberta em
+# /api/pedidos/stream, o que com workers "sync" prenderia o worker inteiro
+worker_class = "gthread"
+threads = 16
 worker_connections = 1000
 timeout = 30
 keepalive = 2
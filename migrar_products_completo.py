@@ -3,55 +3,24 @@
 Script para migrar produtos e adicionar variações
 """
 
-import sqlite3
 import os
+from database.db import get_connection
+from database.migrations import migrate
 from datetime import datetime
 
 def migrate_database():
     """Migra o banco de dados para suportar variações"""
-    conn = sqlite3.connect('database/restaurant.db')
-    cursor = conn.cursor()
-    
     print("🔄 Migrando banco de dados...")
-    
-    # Verificar se a coluna has_variations existe
-    try:
-        cursor.execute("SELECT has_variations FROM products LIMIT 1")
-        print("✅ Coluna has_variations já existe")
-    except:
-        print("➕ Adicionando coluna has_variations...")
-        cursor.execute("ALTER TABLE products ADD COLUMN has_variations INTEGER DEFAULT 0")
-    
-    # Verificar se a tabela product_variations existe
-    try:
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='product_variations'")
-        if cursor.fetchone():
-            print("✅ Tabela product_variations já existe")
-        else:
-            print("➕ Criando tabela product_variations...")
-            cursor.execute('''
-                CREATE TABLE product_variations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id INTEGER NOT NULL,
-                    variation_name TEXT NOT NULL,
-                    price REAL NOT NULL,
-                    stock INTEGER DEFAULT 0,
-                    cost_price REAL DEFAULT 0.0,
-                    is_active INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE
-                )
-            ''')
-    except Exception as e:
-        print(f"❌ Erro ao criar tabela: {e}")
-    
-    conn.commit()
-    conn.close()
+    # A coluna has_variations e a tabela product_variations agora fazem parte
+    # das migrações versionadas (python -m database.migrations upgrade)
+    applied = migrate(verbose=True)
+    if not applied:
+        print("✅ Banco já está na versão mais recente")
     print("✅ Migração concluída!")
 
 def add_sample_products_with_variations():
     """Adiciona produtos de exemplo com variações"""
-    conn = sqlite3.connect('database/restaurant.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     print("🍕 Adicionando produtos de exemplo com variações...")
@@ -170,7 +139,7 @@ def add_sample_products_with_variations():
 
 def show_sample_data():
     """Mostra os dados de exemplo criados"""
-    conn = sqlite3.connect('database/restaurant.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     print("\n📊 Dados de exemplo criados:")
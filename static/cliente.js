@@ -399,7 +399,8 @@ document.getElementById('orderForm').addEventListener('submit', async function(e
         const response = await fetch(API_CONFIG.getUrl(API_CONFIG.FAZER_PEDIDO), {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Idempotency-Key': idempotencyKey('pedido')
             },
             body: JSON.stringify({
                 mesa_id: mesaId,
@@ -408,6 +409,7 @@ document.getElementById('orderForm').addEventListener('submit', async function(e
         });
         
         const result = await response.json();
+        delete idempotencyKeys['pedido'];
         
         if (result.success) {
             showNotification(`Pedido #${result.order_id} criado com sucesso!<br>Total: ${result.total}`, 'success');
@@ -427,6 +429,19 @@ document.getElementById('orderForm').addEventListener('submit', async function(e
     }
 });
 
+// Uma chave por operação, reaproveitada quando o envio é repetido depois de
+// uma falha de rede: o servidor devolve a resposta guardada em vez de gravar
+// de novo
+const idempotencyKeys = {};
+function idempotencyKey(operation) {
+    if (!idempotencyKeys[operation]) {
+        idempotencyKeys[operation] = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+    return idempotencyKeys[operation];
+}
+
 // Busca em tempo real
 // Buscar produtos com debounce para evitar muitas requisições
 let searchTimeout;
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+import database.db as db
+from database.db import init_db, get_connection, get_pool
+from database.cache import cached_json, clear_cache, get_version
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    db_path = tmp_path / "cache.db"
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    init_db()
+    clear_cache()
+    yield db_path
+    clear_cache()
+    get_pool(db_path).clear()
+
+
+def executar(sql, params=()):
+    conn = get_connection()
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def test_gatilhos_incrementam_versoes(banco):
+    catalogo, mesas = get_version("catalogo"), get_version("mesas")
+    executar("INSERT INTO products (id, name, price, stock) VALUES (1, 'Pizza', 300, 5)")
+    executar("INSERT INTO product_variations (product_id, variation_name, price) VALUES (1, 'Grande', 400)")
+    executar("UPDATE categories SET name = 'Lanches' WHERE id = 1")
+    assert get_version("catalogo") == catalogo + 3
+
+    # Colunas que as APIs não mostram não invalidam o cache
+    executar("UPDATE products SET cost_price = 120 WHERE id = 1")
+    assert get_version("catalogo") == catalogo + 3
+    executar("UPDATE products SET stock = stock - 1 WHERE id = 1")
+    assert get_version("catalogo") == catalogo + 4
+
+    assert get_version("mesas") == mesas
+    executar("INSERT INTO tables (number, capacity) VALUES (1, 4)")
+    executar("UPDATE tables SET status = 'ocupada' WHERE number = 1")
+    assert get_version("mesas") == mesas + 2
+
+
+def test_corpo_reaproveitado_ate_a_proxima_escrita(banco):
+    chamadas = []
+
+    def montar():
+        chamadas.append(1)
+        conn = get_connection()
+        nomes = [row[0] for row in conn.execute("SELECT name FROM products ORDER BY name")]
+        conn.close()
+        return nomes
+
+    executar("INSERT INTO products (name, price, stock) VALUES ('Pizza', 300, 5)")
+    corpo, etag = cached_json("catalogo", "produtos", montar)
+    assert cached_json("catalogo", "produtos", montar) == (corpo, etag)
+    assert len(chamadas) == 1
+
+    executar("INSERT INTO products (name, price, stock) VALUES ('Água', 30, 5)")
+    novo_corpo, novo_etag = cached_json("catalogo", "produtos", montar)
+    assert len(chamadas) == 2
+    assert novo_corpo == '["Pizza","Água"]'.encode("utf-8")
+    assert novo_etag != etag
+
+
+def test_escrita_de_outro_processo_invalida_o_cache(banco):
+    executar("INSERT INTO tables (number, capacity) VALUES (1, 4)")
+
+    def montar():
+        conn = get_connection()
+        status = [row[0] for row in conn.execute("SELECT status FROM tables")]
+        conn.close()
+        return status
+
+    corpo, _ = cached_json("mesas", "mesas", montar)
+
+    pid = os.fork()
+    if pid == 0:
+        executar("UPDATE tables SET status = 'ocupada'")
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    novo_corpo, _ = cached_json("mesas", "mesas", montar)
+    assert corpo == b'["livre"]'
+    assert novo_corpo == b'["ocupada"]'
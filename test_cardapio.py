@@ -0,0 +1,94 @@
+import pytest
+
+import database.db as db
+from database.db import init_db, get_connection, get_pool
+from database.models import get_menu_snapshot, search_products
+
+
+@pytest.fixture
+def cardapio(tmp_path, monkeypatch):
+    db_path = tmp_path / "cardapio.db"
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    init_db()
+    conn = get_connection()
+    conn.executemany(
+        "INSERT INTO products (id, name, price, stock, category_id, has_variations, is_active) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [
+            (1, "Pizza", 300, 10, 1, 1, 1),
+            (2, "Coca-Cola", 50, 0, 2, 0, 1),
+            (3, "Bolo 100%", 80, 5, 3, 0, 1),
+            (4, "Pizza antiga", 250, 5, 1, 0, 0),
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO product_variations (product_id, variation_name, price, stock, is_active) VALUES (?, ?, ?, ?, ?)",
+        [
+            (1, "Pequena", 250, 5, 1),
+            (1, "Grande", 400, 0, 1),
+            (1, "Família", 500, 3, 0),
+        ]
+    )
+    conn.commit()
+    conn.close()
+    yield
+    get_pool(db_path).clear()
+
+
+def test_snapshot_embute_variacoes(cardapio):
+    snapshot = get_menu_snapshot()
+    assert [p["name"] for p in snapshot] == ["Bolo 100%", "Coca-Cola", "Pizza"]
+    pizza = snapshot[-1]
+    assert pizza["has_variations"] is True
+    assert [v["name"] for v in pizza["variations"]] == ["Grande", "Pequena"]
+    assert snapshot[0]["variations"] == []
+
+
+def test_snapshot_so_com_estoque(cardapio):
+    snapshot = get_menu_snapshot(in_stock_only=True)
+    assert [p["name"] for p in snapshot] == ["Bolo 100%", "Pizza"]
+    assert [v["name"] for v in snapshot[1]["variations"]] == ["Pequena"]
+
+
+def test_snapshot_filtra_categoria_e_busca(cardapio):
+    assert [p["id"] for p in get_menu_snapshot(category_id=1)] == [1]
+    assert [p["id"] for p in get_menu_snapshot(search="pizz")] == [1]
+    # Curingas do LIKE digitados pelo usuário são tratados como texto
+    assert [p["id"] for p in get_menu_snapshot(search="100%")] == [3]
+    assert get_menu_snapshot(search="_") == []
+
+
+def test_busca_ignora_acentos_e_aceita_prefixo(cardapio):
+    conn = get_connection()
+    conn.execute("INSERT INTO products (id, name, description, price, stock) VALUES (10, 'Açaí na tigela', 'Com granola', 150, 5)")
+    conn.execute("INSERT INTO products (id, name, description, price, stock) VALUES (11, 'Batido', 'Sabor açaí', 90, 5)")
+    conn.commit()
+    conn.close()
+
+    # O nome pesa mais que a descrição
+    assert [p[0] for p in search_products("acai")] == [10, 11]
+    assert [p[0] for p in search_products("AÇA")] == [10, 11]
+    assert [p[0] for p in search_products("tig acai")] == [10]
+    assert [p[0] for p in search_products("acai", limit=1)] == [10]
+    # Operadores do FTS5 digitados são texto
+    assert search_products('acai" OR "pizza') == []
+    assert search_products("   ") == []
+
+
+def test_indice_de_busca_acompanha_escritas(cardapio):
+    conn = get_connection()
+    conn.execute("UPDATE products SET name = 'Pão de queijo' WHERE id = 3")
+    conn.commit()
+    conn.close()
+    assert [p[0] for p in search_products("pao")] == [3]
+    assert search_products("bolo") == []
+
+    # Nomes de variação também encontram o produto
+    assert [p["id"] for p in get_menu_snapshot(search="pequ")] == [1]
+    conn = get_connection()
+    conn.execute("UPDATE product_variations SET is_active = 0 WHERE variation_name = 'Pequena'")
+    conn.commit()
+    conn.execute("DELETE FROM products WHERE id = 3")
+    conn.commit()
+    conn.close()
+    assert get_menu_snapshot(search="pequ") == []
+    assert search_products("pao", include_inactive=True) == []
@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+
+from database import tracing
+from database.db import init_db, get_connection, get_pool
+
+
+@pytest.fixture
+def banco(tmp_path):
+    db_path = tmp_path / "lentas.db"
+    init_db(db_path)
+    limite, top = tracing.SLOW_QUERY_MS, tracing.TOP_N
+    tracing.reset_slow_queries()
+    yield db_path
+    tracing.configure(threshold_ms=limite, top_n=top)
+    tracing.reset_slow_queries()
+    get_pool(db_path).clear()
+
+
+def test_consulta_lenta_registra_parametros_e_plano(banco, caplog):
+    tracing.configure(threshold_ms=0)
+    conn = get_connection(banco)
+    with caplog.at_level(logging.WARNING, logger="pdv.sql"):
+        conn.execute("SELECT id FROM orders WHERE   status = ?  ORDER BY created_at", ("pronto",)).fetchall()
+        conn.execute("SELECT id FROM orders WHERE   status = ?  ORDER BY created_at", ("pendente",)).fetchall()
+    conn.close()
+
+    entrada = next(e for e in tracing.slow_queries() if "FROM orders" in e["sql"])
+    assert entrada["sql"] == "SELECT id FROM orders WHERE status = ? ORDER BY created_at"
+    assert entrada["count"] == 2
+    assert entrada["params"] in ("('pronto',)", "('pendente',)")
+    assert any("idx_orders_status" in linha for linha in entrada["plan"])
+    assert "Consulta lenta" in caplog.text and "pendente" in caplog.text
+
+
+def test_ranking_guarda_so_as_piores(banco):
+    tracing.configure(threshold_ms=0, top_n=2)
+    for ms, sql in [(5, "SELECT 5"), (50, "SELECT 50"), (20, "SELECT 20"), (1, "SELECT 1")]:
+        tracing.record(sql, (), ms / 1000)
+    assert [e["sql"] for e in tracing.slow_queries()] == ["SELECT 50", "SELECT 20"]
+
+
+def test_consultas_rapidas_nao_entram(banco):
+    tracing.configure(threshold_ms=10_000)
+    conn = get_connection(banco)
+    conn.execute("SELECT COUNT(*) FROM products").fetchone()
+    conn.close()
+    assert tracing.slow_queries() == []
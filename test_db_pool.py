@@ -0,0 +1,104 @@
+import os
+import sqlite3
+
+import pytest
+
+from database.db import get_connection, db_connection, get_pool, init_db, load_pragmas, apply_pragmas
+
+
+def test_conexao_reaproveitada(tmp_path):
+    db_path = tmp_path / "pool.db"
+    init_db(db_path)
+
+    conn = get_connection(db_path)
+    primeira = id(conn)
+    conn.close()
+    # Fechar duas vezes não pode devolver a mesma conexão duas vezes ao pool
+    conn.close()
+
+    a = get_connection(db_path)
+    b = get_connection(db_path)
+    assert id(a) == primeira
+    assert a is not b
+    a.close()
+    b.close()
+    get_pool(db_path).clear()
+
+
+def test_row_factory_e_transacao_resetados(tmp_path):
+    db_path = tmp_path / "pool.db"
+    init_db(db_path)
+
+    conn = get_connection(db_path, row_factory=sqlite3.Row)
+    conn.execute("INSERT INTO tables (number, capacity) VALUES (1, 4)")
+    assert conn.in_transaction
+    conn.close()
+
+    conn = get_connection(db_path)
+    assert conn.row_factory is None
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM tables").fetchone() == (0,)
+    conn.close()
+    get_pool(db_path).clear()
+
+
+def test_context_manager_commit_e_rollback(tmp_path):
+    db_path = tmp_path / "pool.db"
+    init_db(db_path)
+
+    with db_connection(db_path) as conn:
+        conn.execute("INSERT INTO tables (number, capacity) VALUES (1, 4)")
+
+    try:
+        with db_connection(db_path) as conn:
+            conn.execute("INSERT INTO tables (number, capacity) VALUES (2, 4)")
+            raise RuntimeError("falha simulada")
+    except RuntimeError:
+        pass
+
+    with db_connection(db_path) as conn:
+        assert conn.execute("SELECT number FROM tables").fetchall() == [(1,)]
+    get_pool(db_path).clear()
+
+
+def test_pool_descarta_conexoes_apos_fork(tmp_path):
+    db_path = tmp_path / "pool.db"
+    init_db(db_path)
+    pai = get_connection(db_path)
+    pai.close()
+
+    pid = os.fork()
+    if pid == 0:
+        filho = get_connection(db_path)
+        os._exit(0 if filho is not pai else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    get_pool(db_path).clear()
+
+
+def test_perfil_de_pragmas_aplicado(tmp_path):
+    db_path = tmp_path / "pragmas.db"
+    init_db(db_path)
+
+    conn = get_connection(db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+    conn.close()
+    get_pool(db_path).clear()
+
+
+def test_pragmas_sobrescritos_por_ambiente(monkeypatch):
+    monkeypatch.setenv("PDV_SQLITE_CACHE_SIZE", "-64000")
+    monkeypatch.setenv("PDV_SQLITE_MMAP_SIZE", "")
+    pragmas = load_pragmas({"synchronous": "FULL"})
+    assert pragmas["cache_size"] == "-64000"
+    assert pragmas["synchronous"] == "FULL"
+
+    conn = sqlite3.connect(":memory:")
+    apply_pragmas(conn, pragmas)
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -64000
+    with pytest.raises(ValueError):
+        apply_pragmas(conn, {"cache_size": "1; DROP TABLE users"})
+    conn.close()
@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.db_worker import ViewWorker
+
+
+class PaginaFalsa:
+    def __init__(self):
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+
+class Indicador:
+    visible = False
+
+
+def test_resultado_de_pedido_substituido_e_descartado():
+    liberar = threading.Event()
+    aplicados = []
+    indicador = Indicador()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        worker = ViewWorker(PaginaFalsa(), indicator=indicador, executor=executor)
+
+        def lenta():
+            liberar.wait(5)
+            return "antigo"
+
+        antigo = worker.submit("produtos", lenta, aplicados.append)
+        novo = worker.submit("produtos", lambda: "novo", aplicados.append)
+        novo.result(5)
+        assert indicador.visible
+        liberar.set()
+        antigo.result(5)
+
+    assert aplicados == ["novo"]
+    assert not indicador.visible
+
+
+def test_erro_da_consulta_vai_para_on_error():
+    erros = []
+    pagina = PaginaFalsa()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker = ViewWorker(pagina, executor=executor)
+        worker.submit("mesas", lambda: 1 / 0, lambda r: None, on_error=erros.append).exception(5)
+
+    assert len(erros) == 1 and isinstance(erros[0], ZeroDivisionError)
+    assert pagina.updates >= 2
+
+
+def test_chaves_diferentes_nao_se_descartam():
+    aplicados = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        worker = ViewWorker(PaginaFalsa(), executor=executor)
+        worker.submit("vendas", lambda: "vendas", aplicados.append)
+        worker.submit("resumo", lambda: "resumo", aplicados.append)
+
+    assert sorted(aplicados) == ["resumo", "vendas"]
@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+import database.db as db
+from database.db import init_db, get_connection, get_pool
+from database.events import ChangeBus, events_after, sse_messages
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    db_path = tmp_path / "eventos.db"
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    init_db()
+    yield db_path
+    get_pool(db_path).clear()
+
+
+def executar(sql, params=()):
+    conn = get_connection()
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def test_gatilhos_registram_eventos(banco):
+    executar("INSERT INTO orders (id, status) VALUES (1, 'pendente')")
+    executar("UPDATE orders SET status = 'pendente' WHERE id = 1")  # sem mudança, sem evento
+    executar("UPDATE orders SET status = 'pronto' WHERE id = 1")
+    executar("INSERT INTO sales (order_id, user_id, payment_method, total_amount) VALUES (1, 1, 'dinheiro', 10)")
+    executar("DELETE FROM orders WHERE id = 1")
+    eventos = [(order_id, kind, status) for _, order_id, kind, status in events_after(0)]
+    assert eventos == [
+        (1, "criado", "pendente"),
+        (1, "status", "pronto"),
+        (1, "pago", None),
+        (1, "removido", "pronto"),
+    ]
+
+
+def test_evento_de_outro_processo_chega_ao_assinante(banco):
+    bus = ChangeBus(poll_interval=0.05)
+    lotes = bus.listen(heartbeat=0.2, duration=5)
+    assert next(lotes) == []  # assinante registrado, nada novo ainda
+
+    pid = os.fork()
+    if pid == 0:
+        executar("INSERT INTO orders (id, status) VALUES (7, 'pendente')")
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    lote = next(batch for batch in lotes if batch)
+    assert [(order_id, kind) for _, order_id, kind, _ in lote] == [(7, "criado")]
+    lotes.close()
+
+
+def test_reconexao_reenvia_eventos_perdidos(banco):
+    executar("INSERT INTO orders (id, status) VALUES (1, 'pendente')")
+    primeiro = events_after(0)[0][0]
+    executar("UPDATE orders SET status = 'preparando' WHERE id = 1")
+    executar("UPDATE orders SET status = 'pronto' WHERE id = 1")
+
+    lotes = ChangeBus(poll_interval=0.05).listen(last_event_id=primeiro, heartbeat=0.2, duration=5)
+    assert [status for _, _, _, status in next(lotes)] == ["preparando", "pronto"]
+    lotes.close()
+
+
+def test_mensagens_sse_trazem_o_pedido_atual(banco):
+    executar("INSERT INTO orders (id, status) VALUES (1, 'pendente')")
+    executar("INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (1, 1, 2, 50)")
+    executar("INSERT INTO orders (id, status) VALUES (2, 'pendente')")
+    executar("DELETE FROM orders WHERE id = 2")
+
+    mensagens = list(sse_messages(events_after(0), lambda pedido: {'total': pedido['total']}))
+    dados = [json.loads(m.split("data: ", 1)[1]) for m in mensagens]
+    assert dados[0] == {'tipo': 'criado', 'id': 1, 'pedido': {'total': 100}}
+    assert [d['tipo'] for d in dados[1:]] == ['removido', 'removido']
+    assert mensagens[0].startswith("id: ")
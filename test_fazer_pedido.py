@@ -0,0 +1,168 @@
+import multiprocessing
+
+import pytest
+
+import database.db as db
+from database.db import init_db, get_connection, get_pool
+from database.orders import place_order, sell_counter_order, update_order_items, OrderError, OutOfStock
+
+CONCORRENTES = 50
+ESTOQUE = 10
+
+
+@pytest.fixture
+def loja(tmp_path, monkeypatch):
+    db_path = tmp_path / "loja.db"
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    init_db()
+    conn = get_connection()
+    conn.execute("INSERT INTO tables (id, number, capacity) VALUES (1, 1, 2)")
+    conn.execute("INSERT INTO products (id, name, price, stock) VALUES (100, 'Pizza', 500, ?)", (ESTOQUE,))
+    conn.execute("INSERT INTO products (id, name, price, stock) VALUES (101, 'Refresco', 50, 100)")
+    conn.execute("INSERT INTO products (id, name, price, stock, has_variations) VALUES (102, 'Sumo', 80, 0, 1)")
+    conn.execute("INSERT INTO product_variations (id, product_id, variation_name, price, stock) VALUES (7, 102, 'Grande', 120, 1)")
+    conn.commit()
+    conn.close()
+    yield db_path
+    get_pool(db_path).clear()
+
+
+def estoque(product_id):
+    conn = get_connection()
+    valor = conn.execute("SELECT stock FROM products WHERE id = ?", (product_id,)).fetchone()[0]
+    conn.close()
+    return valor
+
+
+def contar(tabela):
+    conn = get_connection()
+    valor = conn.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+    conn.close()
+    return valor
+
+
+def test_pedido_baixa_estoque_e_ocupa_mesa(loja):
+    order_id, total = place_order(1, [
+        {'product_id': 100, 'quantity': 2},
+        {'product_id': 101, 'quantity': 3, 'price': 40},
+        {'product_id': 102, 'variation_id': 7, 'variation_name': 'Grande', 'quantity': 1},
+    ])
+    assert total == 2 * 500 + 3 * 40 + 120
+    assert estoque(100) == ESTOQUE - 2
+    assert estoque(101) == 97
+    conn = get_connection()
+    assert conn.execute("SELECT stock FROM product_variations WHERE id = 7").fetchone()[0] == 0
+    assert conn.execute("SELECT status FROM tables WHERE id = 1").fetchone()[0] == "ocupada"
+    assert conn.execute("SELECT total_amount FROM orders WHERE id = ?", (order_id,)).fetchone()[0] == total
+    conn.close()
+
+
+def test_falta_de_estoque_aponta_o_item_e_nao_grava_nada(loja):
+    with pytest.raises(OutOfStock) as erro:
+        place_order(1, [
+            {'product_id': 101, 'quantity': 1},
+            # Linhas repetidas somam: 6 + 5 > 10
+            {'product_id': 100, 'quantity': 6},
+            {'product_id': 100, 'quantity': 5},
+        ])
+    assert erro.value.as_dict() == {
+        'product_id': 100, 'variation_id': None, 'name': 'Pizza', 'requested': 11, 'available': ESTOQUE,
+    }
+    assert "Pizza" in str(erro.value)
+    assert estoque(101) == 100
+    assert contar("orders") == 0 and contar("order_items") == 0
+
+
+def test_variacao_e_produto_inexistente(loja):
+    place_order(1, [{'product_id': 102, 'variation_id': 7, 'quantity': 1}])
+    with pytest.raises(OutOfStock) as erro:
+        place_order(None, [{'product_id': 102, 'variation_id': 7, 'quantity': 1}], check_capacity=False)
+    assert erro.value.name == "Sumo - Grande" and erro.value.available == 0
+    with pytest.raises(OutOfStock) as erro:
+        place_order(None, [{'product_id': 999, 'quantity': 1}], check_capacity=False)
+    assert erro.value.available is None
+
+
+def test_mesa_inexistente_ou_lotada(loja):
+    with pytest.raises(OrderError, match="Mesa não encontrada"):
+        place_order(42, [{'product_id': 101, 'quantity': 1}])
+    place_order(1, [{'product_id': 101, 'quantity': 1}])
+    place_order(1, [{'product_id': 101, 'quantity': 1}])
+    with pytest.raises(OrderError, match="Mesa lotada"):
+        place_order(1, [{'product_id': 101, 'quantity': 1}])
+
+
+def _pedir(db_path, largada, resultados):
+    db.DB_PATH = db_path
+    largada.wait()
+    try:
+        place_order(None, [{'product_id': 100, 'quantity': 1}], check_capacity=False)
+        resultados.put("ok")
+    except OutOfStock:
+        resultados.put("sem estoque")
+    except Exception as e:
+        resultados.put(f"erro: {e}")
+    finally:
+        get_pool(db_path).clear()
+
+
+def test_sem_venda_a_mais_com_pedidos_concorrentes(loja):
+    contexto = multiprocessing.get_context("fork")
+    largada = contexto.Event()
+    resultados = contexto.Queue()
+    processos = [contexto.Process(target=_pedir, args=(loja, largada, resultados)) for _ in range(CONCORRENTES)]
+    for processo in processos:
+        processo.start()
+    largada.set()
+    respostas = [resultados.get(timeout=60) for _ in processos]
+    for processo in processos:
+        processo.join()
+
+    assert respostas.count("ok") == ESTOQUE
+    assert respostas.count("sem estoque") == CONCORRENTES - ESTOQUE
+    assert estoque(100) == 0
+    conn = get_connection()
+    vendidos = conn.execute("SELECT SUM(quantity) FROM order_items WHERE product_id = 100").fetchone()[0]
+    conn.close()
+    assert vendidos == ESTOQUE
+
+
+def test_venda_de_balcao_grava_tudo_de_uma_vez(loja):
+    order_id, total = sell_counter_order([
+        {'product_id': 100, 'quantity': 2, 'price': 500},
+        {'product_id': 101, 'quantity': 1, 'price': 50},
+    ], user_id=1, payment_method='mpesa')
+    assert total == 1050
+    assert estoque(100) == ESTOQUE - 2
+    conn = get_connection()
+    assert conn.execute("SELECT order_id, payment_method, total_amount FROM sales").fetchall() == [(order_id, 'mpesa', 1050)]
+    # Como no PDV: o pedido sai de orders, os itens ficam para o lucro
+    assert conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM order_items WHERE order_id = ?", (order_id,)).fetchone()[0] == 2
+    conn.close()
+
+    with pytest.raises(OutOfStock):
+        sell_counter_order([{'product_id': 100, 'quantity': ESTOQUE, 'price': 500}], 1, 'dinheiro')
+    assert contar("sales") == 1
+    assert estoque(100) == ESTOQUE - 2
+
+
+def test_edicao_de_pedido_aberto_ajusta_so_a_diferenca(loja):
+    order_id, _ = place_order(1, [{'product_id': 100, 'quantity': 2}, {'product_id': 101, 'quantity': 5}])
+    conn = get_connection()
+    linhas = dict(conn.execute("SELECT product_id, id FROM order_items WHERE order_id = ?", (order_id,)).fetchall())
+    conn.close()
+
+    total = update_order_items(order_id, [
+        {'item_id': linhas[100], 'product_id': 100, 'quantity': 5, 'price': 500},
+        {'product_id': 101, 'quantity': 1, 'price': 50},
+    ])
+    assert total == 5 * 500 + 50
+    assert estoque(100) == ESTOQUE - 5
+    # A linha antiga do Refresco (5) voltou ao estoque e a nova (1) saiu dele
+    assert estoque(101) == 99
+
+    with pytest.raises(OutOfStock):
+        update_order_items(order_id, [{'item_id': linhas[100], 'product_id': 100, 'quantity': ESTOQUE + 1, 'price': 500}])
+    assert estoque(100) == ESTOQUE - 5
+    assert estoque(101) == 99
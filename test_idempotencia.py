@@ -0,0 +1,75 @@
+import pytest
+
+import database.db as db
+from database import idempotency
+from database.db import init_db, get_connection, get_pool
+
+AGORA = 1_700_000_000
+ESCOPO = "POST /api/fazer_pedido"
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    db_path = tmp_path / "idempotencia.db"
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    init_db()
+    yield db_path
+    get_pool(db_path).clear()
+
+
+def test_repeticao_recebe_a_resposta_guardada(banco):
+    assert idempotency.claim(ESCOPO, "abc", now=AGORA) == (idempotency.NEW, None)
+    # Enquanto a primeira não responde, a repetição não executa de novo
+    assert idempotency.claim(ESCOPO, "abc", now=AGORA + 1) == (idempotency.BUSY, None)
+
+    idempotency.complete(ESCOPO, "abc", 200, b'{"success": true, "order_id": 7}')
+    estado, (status, corpo) = idempotency.claim(ESCOPO, "abc", now=AGORA + 2)
+    assert estado == idempotency.DONE
+    assert (status, bytes(corpo)) == (200, b'{"success": true, "order_id": 7}')
+    # A mesma chave noutra rota é outra operação
+    assert idempotency.claim("POST /api/pedido/7/pagar", "abc", now=AGORA + 2)[0] == idempotency.NEW
+
+
+def test_falha_libera_a_chave(banco):
+    idempotency.claim(ESCOPO, "abc", now=AGORA)
+    idempotency.release(ESCOPO, "abc")
+    assert idempotency.claim(ESCOPO, "abc", now=AGORA + 1)[0] == idempotency.NEW
+
+
+def test_reserva_abandonada_e_assumida(banco):
+    idempotency.claim(ESCOPO, "abc", now=AGORA)
+    estado, _ = idempotency.claim(ESCOPO, "abc", now=AGORA + idempotency.STALE_AFTER + 1)
+    assert estado == idempotency.NEW
+
+
+def test_chaves_vencidas_sao_apagadas(banco, monkeypatch):
+    monkeypatch.setattr(idempotency, "_next_purge", float("inf"))
+    idempotency.claim(ESCOPO, "velha", now=AGORA)
+    idempotency.complete(ESCOPO, "velha", 200, b"{}")
+    idempotency.claim(ESCOPO, "nova", now=AGORA + idempotency.TTL)
+
+    depois = AGORA + idempotency.TTL + 1
+    assert idempotency.lookup(ESCOPO, "velha", now=depois) is None
+    assert idempotency.purge_expired(now=depois) == 1
+    conn = get_connection()
+    assert conn.execute("SELECT key FROM idempotency_keys").fetchall() == [("nova",)]
+    conn.close()
+
+
+def test_reserva_limpa_as_vencidas_de_tempos_em_tempos(banco, monkeypatch):
+    monkeypatch.setattr(idempotency, "_next_purge", 0)
+    idempotency.claim(ESCOPO, "velha", now=AGORA)
+    idempotency.claim(ESCOPO, "nova", now=AGORA + idempotency.TTL + idempotency.PURGE_INTERVAL)
+    conn = get_connection()
+    assert conn.execute("SELECT key FROM idempotency_keys").fetchall() == [("nova",)]
+    conn.close()
+
+
+def test_repeticao_usa_a_chave_primaria(banco):
+    conn = get_connection()
+    plano = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT status, body FROM idempotency_keys WHERE scope = ? AND key = ? AND created_at > ?",
+        (ESCOPO, "abc", 0)
+    ).fetchall()
+    conn.close()
+    assert any("PRIMARY KEY" in linha[3] for linha in plano)
@@ -0,0 +1,67 @@
+import os
+
+from database import tracing
+from database.db import init_db, get_connection, get_pool
+from utils.metrics import RequestMetrics, Registry, merge, render
+
+ROTA = (("method", "GET"), ("route", "/api/pedido/<int:order_id>"))
+
+
+def test_consultas_da_requisicao_sao_contadas(tmp_path):
+    db_path = tmp_path / "metricas.db"
+    init_db(db_path)
+    conn = get_connection(db_path)
+    tracing.begin()
+    conn.execute("SELECT 1").fetchall()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM products")
+    cursor.executemany("INSERT INTO tables (number, capacity) VALUES (?, 4)", [(1,), (2,)])
+    stats = tracing.end()
+    conn.execute("SELECT 2")
+    conn.rollback()
+    conn.close()
+    get_pool(db_path).clear()
+
+    assert stats.count == 3
+    assert stats.seconds > 0
+    assert tracing.end() is None
+
+
+def test_histograma_no_formato_do_prometheus():
+    registry = Registry()
+    registry.observe("pdv_http_request_duration_seconds", ROTA, 0.003)
+    registry.observe("pdv_http_request_duration_seconds", ROTA, 0.2)
+    registry.observe("pdv_http_request_duration_seconds", ROTA, 30)
+    registry.inc("pdv_http_requests_total", ROTA + (("status", "200"),), 3)
+    texto = render(merge([registry.snapshot()]))
+
+    assert "# TYPE pdv_http_request_duration_seconds histogram" in texto
+    rotulos = 'method="GET",route="/api/pedido/<int:order_id>"'
+    assert f'pdv_http_request_duration_seconds_bucket{{{rotulos},le="0.005"}} 1' in texto
+    assert f'pdv_http_request_duration_seconds_bucket{{{rotulos},le="0.25"}} 2' in texto
+    assert f'pdv_http_request_duration_seconds_bucket{{{rotulos},le="10.0"}} 2' in texto
+    assert f'pdv_http_request_duration_seconds_bucket{{{rotulos},le="+Inf"}} 3' in texto
+    assert f'pdv_http_request_duration_seconds_count{{{rotulos}}} 3' in texto
+    assert f'pdv_http_requests_total{{{rotulos},status="200"}} 3' in texto
+
+
+def test_metricas_de_todos_os_workers_sao_somadas(tmp_path):
+    metricas = RequestMetrics(str(tmp_path))
+    stats = tracing.QueryStats()
+    stats.count, stats.seconds = 4, 0.002
+    metricas.observe_request("GET", "/api/mesas", 200, 0.01, 120, stats)
+
+    pid = os.fork()
+    if pid == 0:
+        # Worker filho: começa do zero e grava o próprio arquivo
+        metricas.observe_request("GET", "/api/mesas", 500, 0.02, 40, None, failed=True)
+        metricas.maybe_dump(force=True)
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    texto = metricas.collect()
+    assert 'pdv_http_requests_total{method="GET",route="/api/mesas",status="200"} 1' in texto
+    assert 'pdv_http_requests_total{method="GET",route="/api/mesas",status="500"} 1' in texto
+    assert 'pdv_http_request_errors_total{method="GET",route="/api/mesas"} 1' in texto
+    assert 'pdv_http_response_bytes_sum{method="GET",route="/api/mesas"} 160' in texto
+    assert 'pdv_sql_queries_per_request_bucket{method="GET",route="/api/mesas",le="5"} 1' in texto
@@ -0,0 +1,59 @@
+import sqlite3
+
+from database.db import get_connection, get_pool, init_db
+from database.migrations import LATEST_VERSION, current_version, migrate
+
+
+def test_banco_novo_chega_a_versao_mais_recente(tmp_path):
+    db_path = tmp_path / "novo.db"
+    applied = init_db(db_path)
+    assert applied == list(range(1, LATEST_VERSION + 1))
+
+    conn = get_connection(db_path)
+    assert current_version(conn) == LATEST_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM users WHERE username = 'Alves37'").fetchone()[0] == 1
+    conn.close()
+    get_pool(db_path).clear()
+
+
+def test_banco_atualizado_nao_reaplica_nada(tmp_path):
+    db_path = tmp_path / "novo.db"
+    init_db(db_path)
+    conn = get_connection(db_path)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    conn.close()
+
+    # O pool devolve a mesma conexão: o caminho rápido é uma única leitura
+    assert init_db(db_path) == []
+    assert statements == ["PRAGMA user_version"]
+    conn = get_connection(db_path)
+    conn.set_trace_callback(None)
+    conn.close()
+    get_pool(db_path).clear()
+
+
+def test_banco_legado_recebe_colunas_novas(tmp_path):
+    db_path = tmp_path / "legado.db"
+    legado = sqlite3.connect(db_path)
+    legado.execute("CREATE TABLE categories (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, description TEXT, is_active INTEGER DEFAULT 1, created_at TIMESTAMP)")
+    legado.execute("CREATE TABLE products (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, description TEXT, price REAL NOT NULL, category_id INTEGER, stock INTEGER DEFAULT 0, min_stock INTEGER DEFAULT 0, cost_price REAL DEFAULT 0.0, image_url TEXT, is_active INTEGER DEFAULT 1, created_at TIMESTAMP)")
+    legado.execute("INSERT INTO categories (name) VALUES ('Pizzas')")
+    legado.commit()
+    legado.close()
+
+    migrate(db_path, target=3)
+    conn = get_connection(db_path)
+    assert current_version(conn) == 3
+    colunas = [row[1] for row in conn.execute("PRAGMA table_info(products)")]
+    assert "has_variations" in colunas
+    assert conn.execute("SELECT tipo FROM categories").fetchone() == ("ambos",)
+    conn.close()
+
+    migrate(db_path)
+    conn = get_connection(db_path)
+    assert current_version(conn) == LATEST_VERSION
+    # Categorias existentes não são duplicadas pelos dados iniciais
+    assert conn.execute("SELECT COUNT(*) FROM categories").fetchone()[0] == 1
+    conn.close()
+    get_pool(db_path).clear()
@@ -0,0 +1,173 @@
+from datetime import datetime
+
+import pytest
+
+import database.db as db
+from database.db import init_db, get_connection, get_pool
+from database.orders import list_orders_page, orders_page_query, list_changes_since, sync_cursor, encode_cursor
+from database.models import list_order_cards, list_order_ids, cancel_orders, delete_orders
+
+
+@pytest.fixture
+def pedidos(tmp_path, monkeypatch):
+    db_path = tmp_path / "pedidos.db"
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    init_db()
+    conn = get_connection()
+    conn.execute("INSERT INTO tables (id, number, capacity) VALUES (1, 7, 4)")
+    # Dois pedidos com o mesmo created_at testam o desempate pelo id
+    conn.executemany(
+        "INSERT INTO orders (id, table_id, status, created_at) VALUES (?, ?, ?, ?)",
+        [
+            (1, None, "entregue", "2020-01-01 12:00:00"),
+            (2, 1, "pendente", "2020-01-02 12:00:00"),
+            (3, None, "entregue", "2020-01-03 12:00:00"),
+            (4, 1, "pronto", "2020-01-03 12:00:00"),
+            (5, None, "cancelado", "2020-01-04 12:00:00"),
+        ]
+    )
+    conn.executemany(
+        "INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, 1, ?, ?)",
+        [(1, 2, 10), (1, 1, 5), (2, 3, 100), (4, 1, 40)]
+    )
+    conn.commit()
+    conn.close()
+    yield
+    get_pool(db_path).clear()
+
+
+def test_paginas_percorrem_o_historico_sem_repetir(pedidos):
+    vistos = []
+    cursor = None
+    while True:
+        pagina, cursor = list_orders_page(cursor=cursor, limit=2, history=True)
+        vistos.extend(p["id"] for p in pagina)
+        if cursor is None:
+            break
+    assert vistos == [5, 4, 3, 2, 1]
+
+
+def test_totais_somados_na_mesma_consulta(pedidos):
+    pagina, _ = list_orders_page(history=True)
+    totais = {p["id"]: p["total"] for p in pagina}
+    assert totais == {1: 25, 2: 300, 3: 0, 4: 40, 5: 0}
+    assert next(p for p in pagina if p["id"] == 2)["table_number"] == 7
+
+
+def test_janela_padrao_so_traz_pedidos_ativos_e_recentes(pedidos):
+    conn = get_connection()
+    conn.execute("INSERT INTO orders (id, status, created_at) VALUES (6, 'entregue', ?)",
+                 (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+    conn.commit()
+    conn.close()
+
+    pagina, cursor = list_orders_page()
+    assert [p["id"] for p in pagina] == [6, 4, 2]
+    assert cursor is None
+    pagina, _ = list_orders_page(status="entregue")
+    assert [p["id"] for p in pagina] == [6]
+
+
+def test_cursor_invalido(pedidos):
+    with pytest.raises(ValueError):
+        orders_page_query(cursor="não-é-base64!")
+
+
+def test_delta_traz_alterados_e_removidos(pedidos):
+    cursor = sync_cursor()
+    alterados, removidos, cursor, mais = list_changes_since(cursor)
+    # O cursor volta ao início do último instante: reenvio, nunca perda
+    assert not mais and removidos == []
+
+    conn = get_connection()
+    conn.execute("UPDATE orders SET status = 'preparando' WHERE id = 2")
+    conn.execute("UPDATE order_items SET quantity = 2 WHERE order_id = 4")
+    conn.execute("DELETE FROM orders WHERE id = 5")
+    conn.execute("INSERT INTO orders (id, status) VALUES (6, 'pendente')")
+    conn.commit()
+    conn.close()
+
+    alterados, removidos, cursor, mais = list_changes_since(cursor)
+    por_id = {p["id"]: p for p in alterados}
+    assert {2, 4, 6} <= set(por_id)
+    assert por_id[2]["status"] == "preparando"
+    assert por_id[2]["updated_at"] > "2020-01-02 12:00:00"
+    assert por_id[4]["total"] == 80
+    assert removidos == [5]
+    assert not mais
+
+    # Sem novas escritas só pode voltar o que está no último instante
+    seguintes, _, _, _ = list_changes_since(cursor)
+    assert {p["id"] for p in seguintes} <= {2, 4, 6}
+
+
+def test_delta_paginado_percorre_tudo(pedidos):
+    conn = get_connection()
+    # Um único comando marca todos os pedidos com o mesmo instante
+    conn.execute("UPDATE orders SET status = status || ''")
+    conn.commit()
+    conn.close()
+
+    vistos = []
+    cursor = encode_cursor("", 0)
+    mais = True
+    while mais:
+        alterados, _, cursor, mais = list_changes_since(cursor, limit=2)
+        vistos.extend(p["id"] for p in alterados)
+    assert vistos == [1, 2, 3, 4, 5]
+
+
+def test_delta_rejeita_cursor_invalido(pedidos):
+    with pytest.raises(ValueError):
+        list_changes_since("%%%")
+
+
+def test_grade_de_pedidos_filtra_e_pagina_no_banco(pedidos):
+    conn = get_connection()
+    conn.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Pizza', 10, 0)")
+    conn.execute("UPDATE orders SET customer_name = 'Ana_Maria' WHERE id = 2")
+    conn.commit()
+    conn.close()
+
+    vistos, cursor = [], None
+    while True:
+        pagina, cursor, total = list_order_cards(cursor=cursor, limit=2)
+        vistos.extend(p["id"] for p in pagina)
+        assert total == 5
+        if cursor is None:
+            break
+    assert vistos == [5, 4, 3, 2, 1]
+
+    pagina, cursor, total = list_order_cards(status="entregue")
+    assert [p["id"] for p in pagina] == [3, 1] and cursor is None and total == 2
+    assert pagina[1]["itens"] == "2x Pizza, 1x Pizza"
+
+    # Busca por mesa, cliente e número; curingas do LIKE valem como texto
+    assert [p["id"] for p in list_order_cards(search="7")[0]] == [4, 2]
+    assert [p["id"] for p in list_order_cards(search="ana_m")[0]] == [2]
+    assert list_order_cards(search="ana%")[0] == []
+    assert list_order_ids(status="pronto", search="7") == [4]
+
+
+def test_cancelar_e_excluir_em_lote(pedidos):
+    conn = get_connection()
+    conn.execute("INSERT INTO products (id, name, price, stock) VALUES (1, 'Pizza', 10, 0)")
+    conn.execute("UPDATE tables SET status = 'ocupada' WHERE id = 1")
+    conn.commit()
+    conn.close()
+
+    # 1 e 3 já foram entregues: só os itens do 2 e do 4 voltam ao estoque
+    assert cancel_orders([1, 2, 3, 4]) == 2
+    conn = get_connection()
+    assert conn.execute("SELECT stock FROM products WHERE id = 1").fetchone()[0] == 4
+    assert conn.execute("SELECT status FROM tables WHERE id = 1").fetchone()[0] == "livre"
+    conn.close()
+    assert list_order_ids(status="cancelado") == [2, 4, 5]
+
+    # Cancelados não devolvem de novo; o entregue 1 devolve os seus 3
+    assert delete_orders([1, 2, 4, 5]) == 4
+    conn = get_connection()
+    assert conn.execute("SELECT stock FROM products WHERE id = 1").fetchone()[0] == 7
+    assert conn.execute("SELECT COUNT(*) FROM order_items").fetchone()[0] == 0
+    conn.close()
+    assert list_order_ids() == [3]
@@ -0,0 +1,121 @@
+import sqlite3
+
+import pytest
+
+import database.db as db
+from database import reports, orders, models
+from database.db import init_db, get_connection, get_pool
+
+# Tabelas que crescem com o movimento; nenhuma consulta de relatório pode
+# voltar a varrê-las por inteiro.
+TABELAS_GRANDES = {"sales", "orders", "order_items", "stock_entries"}
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    db_path = tmp_path / "planos.db"
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    init_db()
+    yield db_path
+    get_pool(db_path).clear()
+
+
+def varreduras(sql, params):
+    conn = get_connection()
+    plano = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    aliases = {}
+    for palavra_tabela, alias in _aliases(sql):
+        aliases[alias] = palavra_tabela
+    conn.close()
+    encontradas = []
+    for _, _, _, detalhe in plano:
+        if detalhe.startswith("SCAN "):
+            alvo = detalhe.split()[1]
+            encontradas.append(aliases.get(alvo, alvo))
+    return encontradas
+
+
+def _aliases(sql):
+    tokens = sql.replace(",", " ").replace("(", " ").replace(")", " ").split()
+    for i, token in enumerate(tokens[:-1]):
+        if token.upper() in ("FROM", "JOIN") and i + 2 < len(tokens):
+            tabela, seguinte = tokens[i + 1], tokens[i + 2]
+            yield tabela, tabela
+            if seguinte.upper() not in ("ON", "WHERE", "JOIN", "LEFT", "GROUP", "ORDER"):
+                yield tabela, seguinte
+
+
+CONSULTAS = [
+    ("vendas do período", lambda: reports.sales_list_query("2024-05-01", "2024-05-31")),
+    ("vendas por método", lambda: reports.sales_list_query("2024-05-01", "2024-05-31", payment_method="mpesa")),
+    ("vendas do operador", lambda: reports.sales_list_query("2024-05-01", "2024-05-31", user_id=2)),
+    ("vendas de hoje", lambda: reports.sales_summary_query("2024-05-10", "2024-05-10")),
+    ("vendas do mês", lambda: reports.sales_summary_query("2024-05-01")),
+    ("vendas do mês por operador", lambda: reports.sales_summary_query("2024-05-01", user_id=2)),
+    ("lucro do mês", lambda: reports.sales_profit_query("2024-05-01")),
+    ("relatório financeiro", lambda: reports.financial_sales_query("2024-05-01", "2024-05-31")),
+    ("mais vendidos", lambda: reports.best_sellers_query("2024-05-01", "2024-05-31")),
+    ("resumo de entradas", lambda: reports.stock_entries_summary_query("2024-05-01", "2024-05-31")),
+    ("pedidos da equipe", lambda: orders.orders_page_query()),
+    ("pedidos por status", lambda: orders.orders_page_query(status="pronto")),
+    ("histórico de pedidos", lambda: orders.orders_page_query(history=True, cursor=orders.encode_cursor("2024-05-10 12:00:00", 90))),
+    ("pedidos alterados", lambda: orders.changes_since_query(orders.encode_cursor("2024-05-10 12:00:00.000", 0))),
+    ("grade de pedidos por status", lambda: models.order_cards_query(status="pronto", cursor=orders.encode_cursor("2024-05-10 12:00:00", 90))),
+    ("contagem da grade por status", lambda: models.order_count_query(status="pronto")),
+    ("entradas de estoque por página",
+     lambda: reports.stock_entries_page_query("2024-05-01", "2024-05-31", orders.encode_cursor("2024-05-10 12:00:00", 90))),
+]
+
+
+@pytest.mark.parametrize("nome,montar", CONSULTAS, ids=[c[0] for c in CONSULTAS])
+def test_relatorios_nao_varrem_tabelas_grandes(banco, nome, montar):
+    sql, params = montar()
+    assert not TABELAS_GRANDES & set(varreduras(sql, params))
+
+
+def test_entradas_de_estoque_usam_indice(banco):
+    conn = get_connection()
+    plano = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM stock_entries WHERE 1=1 AND created_at >= ? AND created_at < date(?, '+1 day') ORDER BY created_at DESC",
+        ("2024-05-01", "2024-05-31")
+    ).fetchall()
+    conn.close()
+    assert any("idx_stock_entries_created" in linha[3] for linha in plano)
+
+
+def test_intervalo_semiaberto_inclui_o_ultimo_dia(banco):
+    conn = get_connection()
+    conn.executemany(
+        "INSERT INTO sales (order_id, user_id, payment_method, total_amount, created_at) VALUES (1, 1, 'dinheiro', ?, ?)",
+        [
+            (10, "2024-04-30 23:59:59"),
+            (20, "2024-05-01 00:00:00"),           # CURRENT_TIMESTAMP
+            (30, "2024-05-15T12:30:00.123456"),    # datetime.isoformat()
+            (40, "2024-05-31 23:59:59.999999"),    # datetime adaptado pelo sqlite3
+            (50, "2024-06-01 00:00:00"),
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+    assert reports.sales_summary("2024-05-01", "2024-05-31") == (3, 90)
+    assert reports.sales_summary("2024-05-31", "2024-05-31") == (1, 40)
+    assert reports.sales_summary("2024-05-01") == (4, 140)
+
+
+def test_entradas_de_estoque_em_paginas_com_nome_do_produto(banco):
+    conn = get_connection()
+    conn.execute("INSERT INTO products (id, name, price) VALUES (1, 'Farinha', 10)")
+    conn.executemany(
+        "INSERT INTO stock_entries (product_id, quantity, unit_cost, total_cost, created_at) VALUES (?, 1, ?, ?, ?)",
+        [(1, 10, 10, "2024-05-02 08:00:00"), (2, 20, 20, "2024-05-03 08:00:00"),
+         (1, 30, 30, "2024-05-03 08:00:00"), (1, 40, 40, "2024-06-01 08:00:00")]
+    )
+    conn.commit()
+    conn.close()
+
+    pagina, cursor = reports.list_stock_entries("2024-05-01", "2024-05-31", limit=2)
+    assert [(e[2], e[5]) for e in pagina] == [("Farinha", 30), ("ID 2", 20)]
+    pagina, cursor = reports.list_stock_entries("2024-05-01", "2024-05-31", cursor, limit=2)
+    assert [(e[2], e[5]) for e in pagina] == [("Farinha", 10)] and cursor is None
+    assert reports.stock_entries_summary("2024-05-01", "2024-05-31") == (3, 60)
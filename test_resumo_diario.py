@@ -0,0 +1,119 @@
+import pytest
+
+import database.db as db
+from database import reports
+from database.db import init_db, get_connection, get_pool
+from database.orders import place_order
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    db_path = tmp_path / "resumo.db"
+    monkeypatch.setattr(db, "DB_PATH", db_path)
+    init_db()
+    yield db_path
+    get_pool(db_path).clear()
+
+
+def executar(sql, params=()):
+    conn = get_connection()
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def resumo():
+    conn = get_connection()
+    linhas = conn.execute(
+        "SELECT day, payment_method, user_id, sales_count, revenue, cost, profit FROM sales_daily ORDER BY 1, 2, 3"
+    ).fetchall()
+    conn.close()
+    return linhas
+
+
+def vender(order_id, user_id, metodo, total, quando, itens):
+    """Pedido com itens (produto, quantidade, preço) e a venda dele"""
+    executar("INSERT INTO orders (id, status, total_amount) VALUES (?, 'entregue', ?)", (order_id, total))
+    for produto, quantidade, preco in itens:
+        executar("INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (?, ?, ?, ?)",
+                 (order_id, produto, quantidade, preco))
+    executar("INSERT INTO sales (order_id, user_id, payment_method, total_amount, created_at) VALUES (?, ?, ?, ?, ?)",
+             (order_id, user_id, metodo, total, quando))
+
+
+@pytest.fixture
+def produtos(banco):
+    executar("INSERT INTO products (id, name, price, cost_price, stock) VALUES (901, 'Pizza', 300, 120, 50)")
+    executar("INSERT INTO products (id, name, price, cost_price, stock) VALUES (902, 'Refresco', 50, 20, 50)")
+
+
+def test_venda_soma_no_dia_metodo_e_operador(produtos):
+    vender(1, 2, "dinheiro", 350, "2024-05-10 12:00:00", [(901, 1, 300), (902, 1, 50)])
+    vender(2, 2, "dinheiro", 100, "2024-05-10T19:30:00.123456", [(902, 2, 50)])
+    vender(3, None, "mpesa", 300, "2024-05-11 09:00:00", [(901, 1, 300)])
+
+    assert resumo() == [
+        ("2024-05-10", "dinheiro", 2, 2, 450, 180, 270),
+        ("2024-05-11", "mpesa", 0, 1, 300, 120, 180),
+    ]
+    assert reports.sales_summary("2024-05-10", "2024-05-10") == (2, 450)
+    assert reports.sales_summary("2024-05-10", user_id=2) == (2, 450)
+    assert reports.sales_profit("2024-05-01", "2024-05-31") == 450
+
+
+def test_lucro_usa_o_custo_da_hora_da_venda(produtos):
+    vender(1, 2, "dinheiro", 300, "2024-05-10 12:00:00", [(901, 1, 300)])
+    executar("UPDATE products SET cost_price = 250 WHERE id = 901")
+    vender(2, 2, "dinheiro", 300, "2024-05-10 13:00:00", [(901, 1, 300)])
+
+    assert reports.sales_profit("2024-05-10", "2024-05-10") == 180 + 50
+
+
+def test_alterar_e_apagar_venda_atualizam_o_resumo(produtos):
+    vender(1, 2, "dinheiro", 300, "2024-05-10 12:00:00", [(901, 1, 300)])
+    vender(2, 2, "dinheiro", 50, "2024-05-10 13:00:00", [(902, 1, 50)])
+
+    executar("UPDATE sales SET payment_method = 'mpesa', user_id = 3 WHERE order_id = 2")
+    assert resumo() == [
+        ("2024-05-10", "dinheiro", 2, 1, 300, 120, 180),
+        ("2024-05-10", "mpesa", 3, 1, 50, 20, 30),
+    ]
+
+    executar("DELETE FROM sales WHERE order_id = 2")
+    assert resumo() == [("2024-05-10", "dinheiro", 2, 1, 300, 120, 180)]
+
+
+def test_reconstrucao_bate_com_os_gatilhos(produtos):
+    vender(1, 2, "dinheiro", 350, "2024-05-10 12:00:00", [(901, 1, 300), (902, 1, 50)])
+    vender(2, 3, "mpesa", 100, "2024-05-12 12:00:00", [(902, 2, 50)])
+    executar("UPDATE sales SET total_amount = 90 WHERE order_id = 2")
+    incremental = resumo()
+
+    # Vendas antigas, sem custo registrado, recebem o custo atual na reconstrução
+    executar("UPDATE sales SET cost_amount = NULL, profit_amount = NULL WHERE order_id = 1")
+    executar("DELETE FROM sales_daily")
+    assert reports.rebuild_sales_daily() == 2
+    assert resumo() == incremental
+
+
+def test_itens_gravam_o_custo_da_variacao_ou_do_produto(produtos):
+    executar("INSERT INTO product_variations (id, product_id, variation_name, price, cost_price, stock) VALUES (7, 902, 'Grande', 80, 35, 5)")
+    executar("INSERT INTO orders (id, status) VALUES (1, 'pendente')")
+    executar("INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (1, 901, 1, 300)")
+    executar("INSERT INTO order_items (order_id, product_id, quantity, unit_price, notes) VALUES (1, 902, 1, 80, 'Variação: Grande')")
+    place_order(None, [{'product_id': 902, 'variation_id': 7, 'variation_name': 'Grande', 'quantity': 1, 'price': 80}],
+                check_capacity=False)
+
+    conn = get_connection()
+    custos = [row[0] for row in conn.execute("SELECT unit_cost FROM order_items ORDER BY id")]
+    conn.close()
+    assert custos == [120, 35, 35]
+
+
+def test_mais_vendidos_usa_o_custo_do_item(produtos):
+    executar("INSERT INTO orders (id, status, created_at) VALUES (1, 'entregue', '2024-05-10 12:00:00')")
+    executar("INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (1, 901, 2, 300)")
+    executar("UPDATE products SET cost_price = 250 WHERE id = 901")
+
+    pizza = next(p for p in reports.best_sellers("2024-05-01", "2024-05-31") if p[0] == 901)
+    assert (pizza[6], pizza[7], pizza[8]) == (2, 600, 360)
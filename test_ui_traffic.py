@@ -0,0 +1,44 @@
+from utils import ui_traffic
+
+
+class Conexao:
+    def __init__(self):
+        self.enviados = []
+
+    def send_commands(self, session_id, commands):
+        self.enviados.append((session_id, commands))
+        return "ok"
+
+
+class Pagina:
+    def __init__(self, conexao, session_id):
+        self._Page__conn = conexao
+        self._session_id = session_id
+
+
+def test_bytes_somados_por_interacao_e_so_da_sessao(monkeypatch):
+    monkeypatch.setattr(ui_traffic, "ENABLED", True)
+    conexao = Conexao()
+    pagina = Pagina(conexao, "s1")
+    medidor = ui_traffic.attach(pagina)
+    assert ui_traffic.attach(pagina) is medidor
+
+    medidor.interaction("categoria")
+    assert conexao.send_commands("s1", [{"name": "set", "attrs": {"visible": "false"}}]) == "ok"
+    conexao.send_commands("s2", [{"name": "add", "attrs": {"text": "x" * 500}}])
+    medidor.interaction("adicionar")
+    conexao.send_commands("s1", [{"name": "set"}, {"name": "set"}])
+
+    resumo = medidor.summary()
+    assert resumo["categoria"]["lotes"] == 1 and resumo["categoria"]["comandos"] == 1
+    assert 0 < resumo["categoria"]["bytes"] < 100
+    assert resumo["adicionar"]["comandos"] == 2
+    assert len(conexao.enviados) == 3
+
+
+def test_desligado_nao_mexe_na_conexao(monkeypatch):
+    monkeypatch.setattr(ui_traffic, "ENABLED", False)
+    conexao = Conexao()
+    original = conexao.send_commands
+    assert ui_traffic.attach(Pagina(conexao, "s1")) is None
+    assert conexao.send_commands == original
@@ -0,0 +1,104 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Consultas das telas Flet fora da thread da interface.
+#
+# Cada tela cria um ViewWorker e passa a carregar os dados com
+# submit(chave, consulta, aplicar): a consulta roda num pool pequeno de
+# threads compartilhado pelo processo e, quando termina, aplicar(resultado)
+# preenche os controles e a página é atualizada. Pedidos com a mesma chave se
+# substituem: se o usuário troca o filtro duas vezes seguidas, só o resultado
+# do último pedido é aplicado e os anteriores são descartados ao chegar.
+#
+# Enquanto houver consulta pendente o indicador (ex.: ft.ProgressBar) fica
+# visível. As conexões do pool do banco aceitam uso fora da thread que as
+# abriu, então as consultas podem chamar get_connection() normalmente.
+
+MAX_WORKERS = 4
+
+logger = logging.getLogger("pdv.views")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de threads compartilhado pelas telas (criado no primeiro uso)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="pdv-view")
+        return _executor
+
+
+class ViewWorker:
+    def __init__(self, page, indicator=None, executor=None):
+        self.page = page
+        self.indicator = indicator
+        self._executor = executor
+        self._lock = threading.Lock()
+        # Aplicações e page.update() de uma tela não se intercalam
+        self._apply_lock = threading.RLock()
+        self._generation = {}
+        self._pending = 0
+
+    def submit(self, key, query, apply, on_error=None):
+        """Roda query() em segundo plano e entrega o resultado a apply().
+
+        Um novo submit com a mesma ``key`` torna obsoletos os anteriores.
+        Retorna o Future da consulta.
+        """
+        with self._lock:
+            generation = self._generation.get(key, 0) + 1
+            self._generation[key] = generation
+            self._pending += 1
+            first = self._pending == 1
+        if first:
+            self._set_loading(True)
+        executor = self._executor or get_executor()
+        future = executor.submit(query)
+        future.add_done_callback(lambda f: self._done(key, generation, f, apply, on_error))
+        return future
+
+    def is_current(self, key, generation):
+        with self._lock:
+            return self._generation.get(key) == generation
+
+    def _done(self, key, generation, future, apply, on_error):
+        with self._lock:
+            self._pending -= 1
+            idle = self._pending == 0
+            current = self._generation.get(key) == generation
+        with self._apply_lock:
+            try:
+                if current:
+                    error = future.exception()
+                    if error is None:
+                        apply(future.result())
+                    elif on_error is not None:
+                        on_error(error)
+                    else:
+                        logger.error("Erro ao carregar %s", key, exc_info=error)
+            except Exception:
+                logger.exception("Erro ao aplicar o resultado de %s", key)
+            if idle:
+                self._set_indicator(False)
+            if current or idle:
+                self._update()
+
+    def _set_loading(self, visible):
+        with self._apply_lock:
+            self._set_indicator(visible)
+            self._update()
+
+    def _set_indicator(self, visible):
+        if self.indicator is not None:
+            self.indicator.visible = visible
+
+    def _update(self):
+        try:
+            self.page.update()
+        except Exception:
+            # A tela pode ter sido fechada enquanto a consulta rodava
+            logger.debug("page.update() falhou após consulta", exc_info=True)
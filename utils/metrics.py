@@ -0,0 +1,228 @@
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from database import tracing
+
+# Métricas por rota das APIs Flask, exportadas em /metrics no formato texto do
+# Prometheus.
+#
+# Cada requisição custa algumas somas sob um lock; nada é formatado até
+# alguém pedir /metrics. Com o gunicorn cada worker tem o seu registro e o
+# grava em METRICS_DIR a cada DUMP_INTERVAL segundos; /metrics soma o
+# registro vivo do worker que atendeu com os arquivos dos demais. Arquivos de
+# workers já encerrados continuam sendo somados, para que os contadores não
+# voltem para trás quando o gunicorn recicla um worker.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+DUMP_INTERVAL = 5.0
+
+# Com preload_app o módulo é importado no master, então todos os workers
+# compartilham a pasta derivada do pid dele
+METRICS_DIR = os.environ.get("PDV_METRICS_DIR") or os.path.join(tempfile.gettempdir(), f"pdv-metrics-{os.getpid()}")
+
+METRICS = {
+    "pdv_http_requests_total": ("counter", "Requisições atendidas", None),
+    "pdv_http_request_errors_total": ("counter", "Requisições com exceção ou status 5xx", None),
+    "pdv_http_request_duration_seconds": ("histogram", "Latência por rota", DURATION_BUCKETS),
+    "pdv_http_response_bytes": ("summary", "Tamanho do corpo da resposta", None),
+    "pdv_sql_queries_per_request": ("histogram", "Consultas SQL por requisição", QUERY_BUCKETS),
+    "pdv_sql_seconds_per_request": ("histogram", "Tempo no SQLite por requisição", DURATION_BUCKETS),
+}
+
+
+class Registry:
+    """Contadores e histogramas indexados por (métrica, rótulos)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2] or ()
+        key = (name, labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Contagem por balde (não cumulativa), soma, total; um
+                # summary é só soma e total
+                series = self._values[key] = [0] * len(buckets) + [0.0, 0]
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[name, list(labels), list(value) if isinstance(value, list) else value]
+                    for (name, labels), value in self._values.items()]
+
+
+def merge(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot:
+            if name not in METRICS:
+                continue
+            key = (name, tuple(tuple(pair) for pair in labels))
+            current = merged.get(key)
+            if current is None:
+                merged[key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                merged[key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[key] = current + value
+    return merged
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render(merged):
+    """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in merged.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in series:
+            if kind == "counter":
+                lines.append(f"{name}{_label_text(labels)} {value}")
+            elif kind == "summary":
+                lines.append(f"{name}_sum{_label_text(labels)} {value[-2]}")
+                lines.append(f"{name}_count{_label_text(labels)} {value[-1]}")
+            else:
+                cumulative = 0
+                for bound, count in zip(buckets, value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_label_text(labels, [('le', '+Inf')])} {value[-1]}")
+                lines.append(f"{name}_sum{_label_text(labels)} {value[-2]}")
+                lines.append(f"{name}_count{_label_text(labels)} {value[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """Registro do processo mais a troca de arquivos entre workers"""
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = directory
+        self.registry = Registry()
+        self._next_dump = 0.0
+        self._pid = None
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # Depois do fork o worker começa com o registro zerado
+            if self._pid is not None:
+                self.registry = Registry()
+            self._pid = os.getpid()
+            self._next_dump = 0.0
+            atexit.register(self.maybe_dump, force=True)
+
+    def observe_request(self, method, route, status, seconds, size, sql_stats, failed=False):
+        self._check_pid()
+        labels = (("method", method), ("route", route))
+        self.registry.inc("pdv_http_requests_total", labels + (("status", str(status)),))
+        if failed or status >= 500:
+            self.registry.inc("pdv_http_request_errors_total", labels)
+        self.registry.observe("pdv_http_request_duration_seconds", labels, seconds)
+        if size is not None:
+            self.registry.observe("pdv_http_response_bytes", labels, size)
+        if sql_stats is not None:
+            self.registry.observe("pdv_sql_queries_per_request", labels, sql_stats.count)
+            self.registry.observe("pdv_sql_seconds_per_request", labels, sql_stats.seconds)
+        self.maybe_dump()
+
+    def _path(self):
+        return os.path.join(self.directory, f"{os.getpid()}.json")
+
+    def maybe_dump(self, force=False):
+        self._check_pid()
+        now = time.monotonic()
+        if not force and now < self._next_dump:
+            return
+        self._next_dump = now + DUMP_INTERVAL
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = self._path() + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.registry.snapshot(), f)
+            os.replace(tmp, self._path())
+        except OSError:
+            pass
+
+    def collect(self):
+        self._check_pid()
+        own = self._path()
+        snapshots = [self.registry.snapshot()]
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            if path == own:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return render(merge(snapshots))
+
+
+def init_metrics(app, metrics=None):
+    """Instala o middleware de métricas e a rota /metrics num app Flask"""
+    from flask import g, request
+
+    metrics = metrics or RequestMetrics()
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+        tracing.begin()
+
+    def _finish(status, size, failed=False):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return
+        sql_stats = tracing.end()
+        rule = request.url_rule.rule if request.url_rule else "<sem rota>"
+        metrics.observe_request(request.method, rule, status, time.perf_counter() - start, size, sql_stats, failed)
+
+    @app.after_request
+    def _metrics_finish(response):
+        # Respostas em stream (SSE) não têm tamanho conhecido: None
+        _finish(response.status_code, response.calculate_content_length())
+        return response
+
+    @app.teardown_request
+    def _metrics_teardown(exc):
+        # Só chega aqui com a marca ainda presente se a view levantou exceção
+        if exc is not None:
+            _finish(500, None, failed=True)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        # Com PDV_METRICS_TOKEN definido, só quem manda o token lê as métricas
+        token = os.environ.get("PDV_METRICS_TOKEN")
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return app.response_class("Não autorizado\n", status=401, mimetype='text/plain')
+        return app.response_class(metrics.collect(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    return metrics
@@ -0,0 +1,91 @@
+import json
+import logging
+import os
+import threading
+
+# Bytes enviados ao cliente Flet por interação.
+#
+# Cada page.update() vira um lote de comandos que a conexão da página manda
+# ao cliente (send_commands). Com PDV_UI_TRAFFIC=1 as telas instalam um
+# TrafficMeter nessa conexão: cada lote é serializado de novo só para medir
+# o tamanho e somado na interação corrente ("categoria", "adicionar",
+# "venda"...), que a tela marca com interaction() quando o usuário age.
+# Cada lote vai para o log "pdv.ui"; summary() traz os totais.
+
+ENABLED = os.environ.get("PDV_UI_TRAFFIC") == "1"
+
+logger = logging.getLogger("pdv.ui")
+
+try:
+    from flet_core.protocol import CommandEncoder
+except ImportError:
+    CommandEncoder = None
+
+
+def _encode(value):
+    return getattr(value, "__dict__", str(value))
+
+
+def command_size(commands):
+    """Tamanho em bytes dos comandos, como vão pela conexão (JSON)"""
+    if CommandEncoder is not None:
+        text = json.dumps(commands, cls=CommandEncoder, separators=(",", ":"))
+    else:
+        text = json.dumps(commands, default=_encode, separators=(",", ":"))
+    return len(text.encode("utf-8"))
+
+
+class TrafficMeter:
+    def __init__(self):
+        self.current = "inicio"
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def interaction(self, name):
+        """O que for enviado daqui em diante conta para ``name``"""
+        self.current = name
+
+    def record(self, commands):
+        size = command_size(commands)
+        name = self.current
+        with self._lock:
+            totals = self._totals.setdefault(name, {"lotes": 0, "comandos": 0, "bytes": 0})
+            totals["lotes"] += 1
+            totals["comandos"] += len(commands)
+            totals["bytes"] += size
+        logger.info("UI %s: %d bytes em %d comandos", name, size, len(commands))
+        return size
+
+    def summary(self):
+        with self._lock:
+            return {name: dict(totals) for name, totals in self._totals.items()}
+
+
+def attach(page):
+    """Mede os comandos que ``page`` envia; retorna o TrafficMeter (ou None se desligado).
+
+    Chamadas repetidas para a mesma página devolvem o mesmo medidor, então
+    as telas podem chamar attach() toda vez que são montadas.
+    """
+    if not ENABLED:
+        return None
+    meter = getattr(page, "_pdv_traffic_meter", None)
+    if meter is not None:
+        return meter
+    conn = getattr(page, "_Page__conn", None) or getattr(page, "_conn", None)
+    if conn is None or not hasattr(conn, "send_commands"):
+        logger.warning("Conexão da página não encontrada; tráfego da interface não será medido")
+        return None
+    meter = TrafficMeter()
+    original = conn.send_commands
+    session_id = getattr(page, "_session_id", None)
+
+    def send_commands(sid, commands):
+        # Uma conexão web atende várias sessões; só as desta página contam
+        if sid == session_id:
+            meter.record(commands)
+        return original(sid, commands)
+
+    conn.send_commands = send_commands
+    page._pdv_traffic_meter = meter
+    return meter
@@ -1,6 +1,7 @@
 import flet as ft
 from datetime import datetime, timedelta
-import sqlite3
+from database.db import get_connection
+from database.reports import sales_summary, sales_profit
 from views.financial_report_view import FinancialReportView
 
 def format_metical(value):
@@ -9,54 +10,22 @@ def format_metical(value):
 
 def get_today_sales():
     """Retorna o total de vendas do dia"""
-    conn = sqlite3.connect('database/restaurant.db')
-    cursor = conn.cursor()
     today = datetime.now().date().isoformat()
-    cursor.execute('''
-        SELECT COALESCE(SUM(total_amount), 0)
-        FROM sales
-        WHERE date(created_at) = ?
-    ''', (today,))
-    total = cursor.fetchone()[0] or 0
-    conn.close()
-    return total
+    return sales_summary(today, today)[1]
 
 def get_month_sales():
     """Retorna o total de vendas do mês"""
-    conn = sqlite3.connect('database/restaurant.db')
-    cursor = conn.cursor()
     first_day = datetime.now().replace(day=1).date().isoformat()
-    cursor.execute('''
-        SELECT COALESCE(SUM(total_amount), 0)
-        FROM sales
-        WHERE date(created_at) >= ?
-    ''', (first_day,))
-    total = cursor.fetchone()[0] or 0
-    conn.close()
-    return total
+    return sales_summary(first_day)[1]
 
 def get_total_profit():
     """Calcula o lucro total (vendas - custo dos produtos) incluindo vendas de balcão"""
-    conn = sqlite3.connect('database/restaurant.db')
-    cursor = conn.cursor()
     first_day = datetime.now().replace(day=1).date().isoformat()
-    cursor.execute('''
-        SELECT oi.product_id, oi.quantity, oi.unit_price, p.cost_price
-        FROM sales s
-        JOIN order_items oi ON s.order_id = oi.order_id
-        JOIN products p ON oi.product_id = p.id
-        WHERE date(s.created_at) >= ?
-    ''', (first_day,))
-    total_profit = 0
-    for product_id, quantity, sale_price, cost_price in cursor.fetchall():
-        profit = (sale_price - (cost_price or 0)) * quantity
-        total_profit += profit
-    conn.close()
-    return total_profit
+    return sales_profit(first_day)
 
 def get_stock_value():
     """Calcula o valor total em estoque com base no custo"""
-    conn = sqlite3.connect('database/restaurant.db')
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT COALESCE(SUM(stock * cost_price), 0)
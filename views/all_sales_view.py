@@ -1,5 +1,6 @@
 import flet as ft
-import sqlite3
+from database.db import get_connection
+from database.reports import list_sales
 from datetime import datetime
 
 def format_metical(value):
@@ -30,7 +31,7 @@ def AllSalesView(page: ft.Page, user, on_back=None):
     mensagem_vazia = ft.Text("", size=16, color=ft.colors.GREY)
 
     def carregar_operadores():
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT id, username, name, role FROM users ORDER BY name')
         ops = cursor.fetchall()
@@ -47,24 +48,12 @@ def AllSalesView(page: ft.Page, user, on_back=None):
     def carregar_vendas():
         vendas_list.controls.clear()
         mensagem_vazia.value = ""
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        query = '''
-            SELECT s.id, s.created_at, s.total_amount, s.payment_method, u.name, u.username
-            FROM sales s
-            LEFT JOIN users u ON s.user_id = u.id
-            WHERE date(s.created_at) BETWEEN ? AND ?
-        '''
-        params = [data_inicio.value, data_fim.value]
-        if metodo_pagamento.value:
-            query += " AND s.payment_method = ?"
-            params.append(metodo_pagamento.value)
-        if operador.value:
-            query += " AND s.user_id = ?"
-            params.append(operador.value)
-        query += " ORDER BY s.created_at DESC"
-        cursor.execute(query, params)
-        vendas = cursor.fetchall()
+        vendas = list_sales(
+            data_inicio.value,
+            data_fim.value,
+            payment_method=metodo_pagamento.value or None,
+            user_id=operador.value or None,
+        )
         total = 0
         num_vendas = len(vendas)
         for vid, created_at, total_amount, payment_method, user_name, user_username in vendas:
@@ -1,6 +1,6 @@
 import flet as ft
 from datetime import datetime, timedelta
-import sqlite3
+from database.reports import best_sellers
 
 def format_metical(value):
     """Formata um valor para o formato de Metical"""
@@ -8,9 +8,6 @@ def format_metical(value):
 
 def get_best_sellers(period="month"):
     """Retorna os produtos mais vendidos baseado no período"""
-    conn = sqlite3.connect('database/restaurant.db')
-    cursor = conn.cursor()
-    
     if period == "today":
         start_date = datetime.now().date().isoformat()
         end_date = start_date
@@ -24,32 +21,7 @@ def get_best_sellers(period="month"):
         start_date = "1900-01-01"
         end_date = datetime.now().date().isoformat()
     
-    cursor.execute('''
-        SELECT 
-            p.id,
-            p.name,
-            p.price,
-            p.cost_price,
-            p.stock,
-            c.name as category_name,
-            COALESCE(SUM(oi.quantity), 0) as total_quantity,
-            COALESCE(SUM(oi.quantity * oi.unit_price), 0) as total_revenue,
-            COALESCE(SUM(oi.quantity * (oi.unit_price - COALESCE(p.cost_price, 0))), 0) as total_profit
-        FROM products p
-        LEFT JOIN categories c ON p.category_id = c.id
-        LEFT JOIN order_items oi ON p.id = oi.product_id
-        LEFT JOIN orders o ON oi.order_id = o.id
-        WHERE p.is_active = 1
-        AND (o.created_at IS NULL OR (date(o.created_at) BETWEEN ? AND ?))
-        GROUP BY p.id, p.name, p.price, p.cost_price, p.stock, c.name
-        ORDER BY total_quantity DESC, total_revenue DESC
-        LIMIT 20
-    ''', (start_date, end_date))
-    
-    products = cursor.fetchall()
-    conn.close()
-    
-    return products
+    return best_sellers(start_date, end_date)
 
 def BestSellersView(page: ft.Page, user, on_navigate, on_logout=None):
     print('[DEBUG] Entrou em BestSellersView')
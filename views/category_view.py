@@ -1,5 +1,5 @@
 import flet as ft
-import sqlite3
+from database.db import get_connection
 from datetime import datetime
 
 
@@ -60,7 +60,7 @@ def CategoryView(page: ft.Page, on_back=None):
 
     def load_categories():
         categories_grid.controls.clear()
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT id, name, description, is_active, created_at 
@@ -145,7 +145,7 @@ def CategoryView(page: ft.Page, on_back=None):
             if not name_field.value.strip():
                 page.show_snack_bar(ft.SnackBar(content=ft.Text("Nome da categoria é obrigatório")))
                 return
-            conn = sqlite3.connect('database/restaurant.db')
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO categories (name, description, tipo, is_active, created_at)
@@ -178,7 +178,7 @@ def CategoryView(page: ft.Page, on_back=None):
     def edit_category(category):
         cat_id, name, description, is_active, created_at = category
         # Buscar tipo da categoria
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT tipo FROM categories WHERE id = ?', (cat_id,))
         tipo_row = cursor.fetchone()
@@ -211,7 +211,7 @@ def CategoryView(page: ft.Page, on_back=None):
             if not name_field.value.strip():
                 page.show_snack_bar(ft.SnackBar(content=ft.Text("Nome da categoria é obrigatório")))
                 return
-            conn = sqlite3.connect('database/restaurant.db')
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute('''
                 UPDATE categories 
@@ -245,7 +245,7 @@ def CategoryView(page: ft.Page, on_back=None):
     def delete_category(category):
         cat_id, name, description, is_active, created_at = category
         def confirm_delete(e):
-            conn = sqlite3.connect('database/restaurant.db')
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute('DELETE FROM categories WHERE id = ?', (cat_id,))
             conn.commit()
@@ -267,7 +267,7 @@ def CategoryView(page: ft.Page, on_back=None):
 
     def toggle_category(category):
         cat_id, name, description, is_active, created_at = category
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             UPDATE categories 
@@ -1,5 +1,6 @@
 import flet as ft
-import sqlite3
+from database.db import get_connection
+from database.models import get_menu_snapshot
 from datetime import datetime
 
 
@@ -19,9 +20,9 @@ def ClientMenuView(page: ft.Page, on_back=None):
     search_container = ft.Container()
     
     def load_categories():
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT id, name FROM categories WHERE active = 1 ORDER BY name')
+        cursor.execute('SELECT id, name FROM categories WHERE is_active = 1 ORDER BY name')
         categories = cursor.fetchall()
         conn.close()
         
@@ -62,33 +63,13 @@ def ClientMenuView(page: ft.Page, on_back=None):
         load_products()
     
     def load_products():
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        
-        if selected_category:
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock 
-                FROM products 
-                WHERE category_id = ? AND active = 1 AND stock > 0
-                ORDER BY name
-            ''', (selected_category,))
-        else:
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock 
-                FROM products 
-                WHERE active = 1 AND stock > 0
-                ORDER BY name
-            ''')
-        
-        products = cursor.fetchall()
-        conn.close()
-        
-        # Filtrar por busca se necessário
-        if search_query:
-            products = [p for p in products if search_query.lower() in p[1].lower()]
+        products = get_menu_snapshot(selected_category, search_query, in_stock_only=True)
         
         product_cards = []
-        for prod_id, name, description, price, image_url, stock in products:
+        for product in products:
+            name, description, price, image_url, stock = (
+                product['name'], product['description'], product['price'], product['image_url'], product['stock']
+            )
             card = ft.Card(
                 content=ft.Container(
                     content=ft.Column([
@@ -1,6 +1,6 @@
 import flet as ft
-import sqlite3
-import shutil
+from database.db import get_connection, backup_database, restore_database, remove_database
+from database import tracing
 import os
 
 SETTINGS_FIELDS = [
@@ -16,17 +16,12 @@ CURRENCY_OPTIONS = [
     ("ZAR", "Rand (ZAR)"),
 ]
 
-DB_PATH = os.path.join("database", "restaurant.db")
 BACKUP_DIR = os.path.join(os.getcwd(), "backups")
 
 
 def get_settings():
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS settings (
-        key TEXT PRIMARY KEY,
-        value TEXT
-    )''')
     settings = {}
     for key, _ in SETTINGS_FIELDS:
         cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
@@ -40,7 +35,7 @@ def get_settings():
     return settings
 
 def save_settings(new_settings):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     for key, value in new_settings.items():
         cursor.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
@@ -87,7 +82,7 @@ def ConfigView(page: ft.Page, user, on_back=None):
             if not os.path.exists(BACKUP_DIR):
                 os.makedirs(BACKUP_DIR)
             backup_path = os.path.join(BACKUP_DIR, f"{name}.db")
-            shutil.copy(DB_PATH, backup_path)
+            backup_database(backup_path)
             backup_msg.value = f"Backup criado: {backup_path}"
             dialog.open = False
             page.snack_bar = ft.SnackBar(ft.Text("Backup realizado com sucesso!"), bgcolor=ft.colors.BLUE)
@@ -121,7 +116,7 @@ def ConfigView(page: ft.Page, user, on_back=None):
                 page.update()
                 return
             try:
-                shutil.copy(os.path.join(BACKUP_DIR, selected["file"]), DB_PATH)
+                restore_database(os.path.join(BACKUP_DIR, selected["file"]))
                 backup_msg.value = "Banco restaurado com sucesso! Reinicie o sistema."
                 dialog.open = False
                 page.snack_bar = ft.SnackBar(ft.Text("Banco restaurado! Reinicie o sistema."), bgcolor=ft.colors.GREEN)
@@ -157,7 +152,7 @@ def ConfigView(page: ft.Page, user, on_back=None):
     def on_reset(e):
         def confirm_reset(ev):
             try:
-                os.remove(DB_PATH)
+                remove_database()
                 reset_msg.value = "Banco de dados resetado! O sistema será reiniciado."
                 page.snack_bar = ft.SnackBar(ft.Text("Banco resetado! O sistema será reiniciado."), bgcolor=ft.colors.RED)
                 page.snack_bar.open = True
@@ -180,6 +175,60 @@ def ConfigView(page: ft.Page, user, on_back=None):
         dialog.open = True
         page.update()
 
+    # Consultas lentas (ranking do próprio aplicativo, ver database/tracing.py)
+    threshold_field = ft.TextField(
+        label="Limite (ms)",
+        value=f"{tracing.SLOW_QUERY_MS:g}",
+        width=120,
+        keyboard_type=ft.KeyboardType.NUMBER,
+    )
+    slow_list = ft.ListView(height=320, spacing=4)
+
+    def show_slow_query(entry):
+        dialog = ft.AlertDialog(
+            title=ft.Text(f"{entry['max_ms']:.1f} ms (média {entry['avg_ms']:.1f} ms, {entry['count']}x)"),
+            content=ft.Column([
+                ft.Text("SQL", weight=ft.FontWeight.BOLD),
+                ft.Text(entry["sql"], selectable=True, size=12),
+                ft.Text("Parâmetros da pior execução", weight=ft.FontWeight.BOLD),
+                ft.Text(entry.get("params") or "-", selectable=True, size=12),
+                ft.Text("EXPLAIN QUERY PLAN", weight=ft.FontWeight.BOLD),
+                *(ft.Text(line, selectable=True, size=12, font_family="monospace") for line in entry.get("plan") or ["-"]),
+            ], scroll=ft.ScrollMode.AUTO, width=600, height=400, spacing=8),
+            actions=[ft.TextButton("Fechar", on_click=lambda e: (setattr(dialog, 'open', False), page.update()))]
+        )
+        page.dialog = dialog
+        dialog.open = True
+        page.update()
+
+    def refresh_slow_queries(e=None):
+        entries = tracing.slow_queries()
+        slow_list.controls = [
+            ft.ListTile(
+                leading=ft.Text(f"{entry['max_ms']:.0f} ms", weight=ft.FontWeight.BOLD, color=ft.colors.RED_700),
+                title=ft.Text(entry["sql"], max_lines=2, overflow=ft.TextOverflow.ELLIPSIS, size=12),
+                subtitle=ft.Text(f"{entry['count']}x, média {entry['avg_ms']:.1f} ms", size=11),
+                on_click=lambda e, entry=entry: show_slow_query(entry),
+            ) for entry in entries
+        ] or [ft.Text("Nenhuma consulta acima do limite até agora.", color=ft.colors.GREY_600)]
+        if e is not None:
+            page.update()
+
+    def on_threshold_change(e):
+        try:
+            tracing.configure(threshold_ms=float(threshold_field.value))
+        except (TypeError, ValueError):
+            threshold_field.value = f"{tracing.SLOW_QUERY_MS:g}"
+            page.update()
+
+    def on_clear_slow(e):
+        tracing.reset_slow_queries()
+        refresh_slow_queries(e)
+
+    threshold_field.on_submit = on_threshold_change
+    threshold_field.on_blur = on_threshold_change
+    refresh_slow_queries()
+
     header = ft.Container(
         content=ft.Row([
             ft.IconButton(
@@ -246,6 +295,22 @@ def ConfigView(page: ft.Page, user, on_back=None):
                 bgcolor=ft.colors.WHITE,
                 border_radius=12,
                 shadow=ft.BoxShadow(blur_radius=8, color=ft.colors.with_opacity(ft.colors.BLACK, 0.06)),
+            ),
+            ft.Container(
+                content=ft.Column([
+                    ft.Text("Consultas Lentas", size=18, weight=ft.FontWeight.BOLD, color=ft.colors.BLUE_900),
+                    ft.Row([
+                        threshold_field,
+                        ft.ElevatedButton("Atualizar", icon=ft.icons.REFRESH, on_click=refresh_slow_queries),
+                        ft.TextButton("Limpar", icon=ft.icons.CLEAR_ALL, on_click=on_clear_slow),
+                    ], spacing=12),
+                    slow_list,
+                ], spacing=12),
+                col={"sm": 12, "xl": 10},
+                padding=ft.padding.all(24),
+                bgcolor=ft.colors.WHITE,
+                border_radius=12,
+                shadow=ft.BoxShadow(blur_radius=8, color=ft.colors.with_opacity(ft.colors.BLACK, 0.06)),
             )
         ], spacing=32, run_spacing=32, alignment=ft.MainAxisAlignment.CENTER),
     ], expand=True, scroll=ft.ScrollMode.AUTO) 
\ No newline at end of file
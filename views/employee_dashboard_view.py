@@ -1,45 +1,23 @@
 import flet as ft
-import sqlite3
+from database.db import get_connection
+from database.reports import sales_summary
 from datetime import datetime
 
 def get_today_sales(user_id=None):
-    conn = sqlite3.connect('database/restaurant.db')
-    cursor = conn.cursor()
     today = datetime.now().date().isoformat()
-    if user_id:
-        cursor.execute('''SELECT COALESCE(SUM(total_amount), 0) FROM sales WHERE date(created_at) = ? AND user_id = ?''', (today, user_id))
-    else:
-        cursor.execute('''SELECT COALESCE(SUM(total_amount), 0) FROM sales WHERE date(created_at) = ?''', (today,))
-    total = cursor.fetchone()[0] or 0
-    conn.close()
-    return total
+    return sales_summary(today, today, user_id)[1]
 
 def get_month_sales(user_id=None):
-    conn = sqlite3.connect('database/restaurant.db')
-    cursor = conn.cursor()
     first_day = datetime.now().replace(day=1).date().isoformat()
-    if user_id:
-        cursor.execute('''SELECT COALESCE(SUM(total_amount), 0) FROM sales WHERE date(created_at) >= ? AND user_id = ?''', (first_day, user_id))
-    else:
-        cursor.execute('''SELECT COALESCE(SUM(total_amount), 0) FROM sales WHERE date(created_at) >= ?''', (first_day,))
-    total = cursor.fetchone()[0] or 0
-    conn.close()
-    return total
+    return sales_summary(first_day, user_id=user_id)[1]
 
 def get_ticket_medio(user_id=None):
-    conn = sqlite3.connect('database/restaurant.db')
-    cursor = conn.cursor()
     first_day = datetime.now().replace(day=1).date().isoformat()
-    if user_id:
-        cursor.execute('''SELECT COUNT(*), COALESCE(SUM(total_amount),0) FROM sales WHERE date(created_at) >= ? AND user_id = ?''', (first_day, user_id))
-    else:
-        cursor.execute('''SELECT COUNT(*), COALESCE(SUM(total_amount),0) FROM sales WHERE date(created_at) >= ?''', (first_day,))
-    num, total = cursor.fetchone()
-    conn.close()
+    num, total = sales_summary(first_day, user_id=user_id)
     return (total / num) if num else 0
 
 def get_low_stock_count():
-    conn = sqlite3.connect('database/restaurant.db')
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('''SELECT COUNT(*) FROM products WHERE stock <= min_stock AND is_active = 1''')
     count = cursor.fetchone()[0] or 0
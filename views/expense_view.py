@@ -1,16 +1,13 @@
 import flet as ft
-import sqlite3
+from database.db import get_connection
 import datetime
-import os
-
-DB_PATH = os.path.join("database", "restaurant.db")
 
 CATEGORIES = [
     "Aluguel", "Salários", "Compras", "Contas", "Manutenção", "Outros"
 ]
 
 def get_expenses():
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT e.id, e.created_at, e.amount, e.category, e.description, u.username
@@ -23,7 +20,7 @@ def get_expenses():
     return expenses
 
 def add_expense(created_at, amount, category, description, user_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('''
         INSERT INTO expenses (created_at, amount, category, description, user_id)
@@ -1,30 +1,10 @@
 import flet as ft
-import sqlite3
+from database.reports import financial_sales
 import datetime
-import os
-
-DB_PATH = os.path.join("database", "restaurant.db")
 
 def get_financial_data(start_date, end_date, user_id=None):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    params = [start_date, end_date]
-    user_filter = ""
-    if user_id:
-        user_filter = "AND sales.user_id = ?"
-        params.append(user_id)
-    cursor.execute(f'''
-        SELECT sales.id, sales.created_at, users.username, SUM(order_items.quantity * order_items.unit_price) as total
-        FROM sales
-        JOIN order_items ON sales.id = order_items.order_id
-        JOIN users ON sales.user_id = users.id
-        WHERE sales.created_at BETWEEN ? AND ? {user_filter}
-        GROUP BY sales.id
-        ORDER BY sales.created_at DESC
-    ''', params)
-    sales = cursor.fetchall()
+    sales = financial_sales(start_date, end_date, user_id)
     total_sales = sum(row[3] for row in sales)
-    conn.close()
     return sales, total_sales
 
 def FinancialReportView(page: ft.Page, user, on_back=None):
@@ -1,5 +1,5 @@
 import flet as ft
-import sqlite3
+from database.reports import list_sales
 from datetime import datetime, timedelta
 
 def format_metical(value):
@@ -22,18 +22,7 @@ def MySalesView(page: ft.Page, user, on_back=None):
     def carregar_vendas():
         vendas_list.controls.clear()
         mensagem_vazia.value = ""
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        query = '''
-            SELECT s.id, s.created_at, s.total_amount, s.payment_method, u.name, u.username
-            FROM sales s
-            LEFT JOIN users u ON s.user_id = u.id
-            WHERE date(s.created_at) BETWEEN ? AND ? AND s.user_id = ?
-        '''
-        params = [data_inicio.value, data_fim.value, user_id]
-        query += " ORDER BY s.created_at DESC"
-        cursor.execute(query, params)
-        vendas = cursor.fetchall()
+        vendas = list_sales(data_inicio.value, data_fim.value, user_id=user_id)
         total = 0
         num_vendas = len(vendas)
         for vid, created_at, total_amount, payment_method, user_name, user_username in vendas:
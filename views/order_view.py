@@ -1,5 +1,8 @@
 import flet as ft
-import sqlite3
+from database.db import get_connection
+from database.orders import sync_cursor, list_changes_since
+from database.models import list_order_cards, get_order_cards, list_order_ids, cancel_orders, delete_orders
+from utils.db_worker import ViewWorker
 from datetime import datetime
 
 # Função utilitária para formatar valores em Metical
@@ -83,41 +86,55 @@ def OrderView(page: ft.Page, on_back=None, user=None):
     colunas = 3
     pagina_atual = {"value": 0}
 
-    # Buscar pedidos reais do banco
-    def fetch_pedidos_reais():
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT o.id, t.number as mesa, o.customer_name, o.status, o.total_amount
-            FROM orders o
-            LEFT JOIN tables t ON o.table_id = t.id
-            ORDER BY o.created_at DESC
-        ''')
-        pedidos = []
-        for row in cursor.fetchall():
-            pid, mesa, cliente, status, valor = row
-            # Buscar itens do pedido
-            cursor.execute('''
-                SELECT p.name, oi.quantity FROM order_items oi
-                JOIN products p ON oi.product_id = p.id
-                WHERE oi.order_id = ?
-            ''', (pid,))
-            itens = cursor.fetchall()
-            itens_str = ', '.join([f"{q}x {n}" for n, q in itens]) if itens else "-"
-            pedidos.append({
-                "id": pid,
-                "mesa": mesa if mesa is not None else "-",
-                "cliente": cliente or "-",
-                "itens": itens_str,
-                "valor": valor or 0.0,
-                "status": status or "-"
-            })
-        conn.close()
-        return pedidos
-
-    # Substituir o mock por dados reais
-    def get_pedidos():
-        return fetch_pedidos_reais()
+    # Pedidos consultados fora da thread da interface
+    loading_bar = ft.ProgressBar(visible=False, color=ft.colors.AMBER_400, bgcolor=ft.colors.BLUE_100)
+    worker = ViewWorker(page, indicator=loading_bar)
+
+    # Só a página visível vem do banco (list_order_cards, já filtrada e com o
+    # total). A cada verificação o cursor de sincronização (updated_at dos
+    # pedidos e lápides dos apagados, ver database/orders.py) diz o que mudou:
+    # se foram só pedidos desta página, os cards deles são trocados; se não,
+    # a página é relida.
+    cursores_pagina = [None]  # cursor de cada página já visitada
+    pedidos_visiveis = {}
+    sync_state = {"cursor": None, "lote": (frozenset(), frozenset()), "maior_id": 0, "recarregar": True}
+
+    def filtro_atual():
+        status = status_filtro_valor["value"]
+        return dict(
+            status=None if status == "todos" else status,
+            search=busca_valor["value"],
+        )
+
+    def maior_id_pedido():
+        conn = get_connection()
+        try:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM orders").fetchone()[0]
+        finally:
+            conn.close()
+
+    def sincronizar(cursor, lote_anterior, visiveis, consulta, recarregar):
+        """Roda no worker. Retorna (cursor, lote, página relida, cards trocados, maior id)"""
+        if cursor is None:
+            # O cursor vem antes da leitura: o que mudar no meio volta no próximo delta
+            novo_cursor = sync_cursor()
+            return novo_cursor, lote_anterior, list_order_cards(**consulta), None, maior_id_pedido()
+        estados, removidos, has_more, novo_cursor = set(), set(), True, cursor
+        while has_more:
+            mudados, apagados, novo_cursor, has_more = list_changes_since(novo_cursor)
+            estados.update((p["id"], p["updated_at"]) for p in mudados)
+            removidos.update(apagados)
+        lote = (frozenset(estados), frozenset(removidos))
+        # O cursor reenvia o último instante: (id, updated_at) já visto não é mudança
+        ids = {pid for pid, _ in estados - lote_anterior[0]}
+        removidos -= lote_anterior[1]
+        maior_id = max(ids, default=0)
+        if not recarregar:
+            if not ids and not removidos:
+                return novo_cursor, lote, None, None, maior_id
+            if ids <= visiveis and not removidos:
+                return novo_cursor, lote, None, get_order_cards(ids), maior_id
+        return novo_cursor, lote, list_order_cards(**consulta), None, maior_id
 
     # Campo de busca
     busca_valor = {"value": ""}
@@ -147,19 +164,8 @@ def OrderView(page: ft.Page, on_back=None, user=None):
 
 
     def excluir_pedidos_filtrados(e):
-        # Obter pedidos filtrados atuais
-        pedidos_lista = get_pedidos()
-        
-        # Aplicar os mesmos filtros da função atualizar_grid
-        status_filtro = status_filtro_valor["value"]
-        if status_filtro != "todos":
-            pedidos_lista = [p for p in pedidos_lista if p["status"] == status_filtro]
-        
-        filtro = busca_valor["value"].strip().lower()
-        if filtro:
-            pedidos_filtrados = [p for p in pedidos_lista if filtro in str(p["id"]).lower() or filtro in str(p["mesa"]).lower() or filtro in (p["cliente"] or "").lower()]
-        else:
-            pedidos_filtrados = pedidos_lista
+        # Ids de todos os pedidos do filtro atual, não só os da página
+        pedidos_filtrados = list_order_ids(**filtro_atual())
         
         if not pedidos_filtrados:
             page.show_snack_bar(ft.SnackBar(
@@ -170,37 +176,8 @@ def OrderView(page: ft.Page, on_back=None, user=None):
         
         # Confirmar exclusão
         def confirmar_exclusao(ev):
-            conn = None
             try:
-                conn = sqlite3.connect('database/restaurant.db')
-                cursor = conn.cursor()
-                
-                # Excluir pedidos filtrados
-                for pedido in pedidos_filtrados:
-                    pedido_id = pedido["id"]
-                    
-                    # Primeiro, restaurar estoque dos produtos
-                    cursor.execute('''
-                        SELECT product_id, quantity FROM order_items 
-                        WHERE order_id = ?
-                    ''', (pedido_id,))
-                    
-                    for prod_id, qty in cursor.fetchall():
-                        cursor.execute('UPDATE products SET stock = stock + ? WHERE id = ?', (qty, prod_id))
-                    
-                    # Liberar mesa se houver
-                    cursor.execute('SELECT table_id FROM orders WHERE id = ?', (pedido_id,))
-                    row = cursor.fetchone()
-                    if row and row[0]:
-                        cursor.execute('UPDATE tables SET status = "livre" WHERE id = ?', (row[0],))
-                    
-                    # Excluir itens do pedido
-                    cursor.execute('DELETE FROM order_items WHERE order_id = ?', (pedido_id,))
-                    
-                    # Excluir o pedido
-                    cursor.execute('DELETE FROM orders WHERE id = ?', (pedido_id,))
-                
-                conn.commit()
+                excluidos = delete_orders(pedidos_filtrados)
                 
                 dialog.open = False
                 page.update()
@@ -209,20 +186,15 @@ def OrderView(page: ft.Page, on_back=None, user=None):
                 atualizar_grid()
                 
                 page.show_snack_bar(ft.SnackBar(
-                    content=ft.Text(f"{len(pedidos_filtrados)} pedido(s) excluído(s) com sucesso!"),
+                    content=ft.Text(f"{excluidos} pedido(s) excluído(s) com sucesso!"),
                     bgcolor=ft.colors.GREEN
                 ))
                 
             except Exception as ex:
-                if conn:
-                    conn.rollback()
                 page.show_snack_bar(ft.SnackBar(
                     content=ft.Text(f"Erro ao excluir pedidos: {ex}"),
                     bgcolor=ft.colors.RED
                 ))
-            finally:
-                if conn:
-                    conn.close()
         
         dialog = ft.AlertDialog(
             title=ft.Text("Confirmar Exclusão"),
@@ -238,29 +210,44 @@ def OrderView(page: ft.Page, on_back=None, user=None):
 
     def on_status_filtro_change(e):
         status_filtro_valor["value"] = e.control.value
-        pagina_atual["value"] = 0
-        atualizar_grid()
+        carregar_pagina(0)
 
     def atualizar_grid():
-        pedidos_lista = get_pedidos()
-        
-        # Filtrar por status
+        """Busca no banco o que mudou e atualiza os cards (ou relê a página)"""
+        args = (sync_state["cursor"], sync_state["lote"], set(pedidos_visiveis), filtro_atual(), sync_state["recarregar"])
+        consulta = dict(args[3], cursor=cursores_pagina[pagina_atual["value"]], limit=cards_por_pagina)
+        worker.submit("pedidos", lambda: sincronizar(args[0], args[1], args[2], consulta, args[4]), aplicar_mudancas,
+                      on_error=lambda ex: print(f"Erro ao verificar novos pedidos: {ex}"))
+
+    def carregar_pagina(numero):
+        if numero == 0:
+            del cursores_pagina[1:]
+        pagina_atual["value"] = numero
+        # Fica marcado até uma página ser aplicada, mesmo que a verificação
+        # periódica substitua este pedido no worker
+        sync_state["recarregar"] = True
+        atualizar_grid()
+
+    def passa_filtro(p):
         status_filtro = status_filtro_valor["value"]
-        if status_filtro != "todos":
-            pedidos_lista = [p for p in pedidos_lista if p["status"] == status_filtro]
-        
-        # Filtrar pedidos pelo campo de busca
+        if status_filtro != "todos" and p["status"] != status_filtro:
+            return False
         filtro = busca_valor["value"].strip().lower()
-        if filtro:
-            pedidos_filtrados = [p for p in pedidos_lista if filtro in str(p["id"]).lower() or filtro in str(p["mesa"]).lower() or filtro in (p["cliente"] or "").lower()]
-        else:
-            pedidos_filtrados = pedidos_lista
-        
-        total_paginas_local = (len(pedidos_filtrados) + cards_por_pagina - 1) // cards_por_pagina
-        pagina_atual["value"] = min(pagina_atual["value"], max(0, total_paginas_local - 1))
-        inicio = pagina_atual["value"] * cards_por_pagina
-        fim = inicio + cards_por_pagina
-        pedidos_pagina = pedidos_filtrados[inicio:fim]
+        return not filtro or filtro in str(p["id"]).lower() or filtro in str(p["mesa"]).lower() or filtro in (p["cliente"] or "").lower()
+
+    def mostrar_pagina(resultado):
+        pedidos_pagina, proximo_cursor, total = resultado
+        numero = pagina_atual["value"]
+        if not pedidos_pagina and numero > 0:
+            # A página esvaziou (pedidos apagados ou fora do filtro): volta uma
+            carregar_pagina(numero - 1)
+            return
+        sync_state["recarregar"] = False
+        del cursores_pagina[numero + 1:]
+        if proximo_cursor:
+            cursores_pagina.append(proximo_cursor)
+        pedidos_visiveis.clear()
+        pedidos_visiveis.update((p["id"], p) for p in pedidos_pagina)
         grid = render_pedidos_grid(pedidos_pagina)
         
         pedidos_area.controls = [
@@ -275,14 +262,38 @@ def OrderView(page: ft.Page, on_back=None, user=None):
             )
         ]
         # Atualizar paginação
-        paginacao_row[0].controls[1].value = f"Página {pagina_atual['value']+1} de {max(1, total_paginas_local)}"
-        paginacao_row[0].controls[0].disabled = pagina_atual['value'] == 0
-        paginacao_row[0].controls[2].disabled = pagina_atual['value'] >= total_paginas_local-1
-        page.update()
+        total_paginas_local = (total + cards_por_pagina - 1) // cards_por_pagina
+        paginacao_row[0].controls[1].value = f"Página {numero+1} de {max(1, total_paginas_local)}"
+        paginacao_row[0].controls[0].disabled = numero == 0
+        paginacao_row[0].controls[2].disabled = proximo_cursor is None
+
+    # Card de cada pedido da página atual: id -> posição na GridView
+    cards_visiveis = {}
+    grid_ref = [None]
 
     def render_pedidos_grid(pedidos_pagina=None):
         if pedidos_pagina is None:
-            pedidos_pagina = get_pedidos()
+            pedidos_pagina = list(pedidos_visiveis.values())
+        cards_visiveis.clear()
+        cards_visiveis.update((p["id"], i) for i, p in enumerate(pedidos_pagina))
+        grid_ref[0] = ft.GridView(
+            runs_count=colunas,
+            max_extent=260,
+            child_aspect_ratio=1.1,
+            spacing=24,
+            run_spacing=24,
+            controls=[render_card(p) for p in pedidos_pagina]
+        )
+        grid = ft.Row([
+            ft.Container(
+                content=grid_ref[0],
+                alignment=ft.alignment.center,
+                expand=True
+            )
+        ], alignment=ft.MainAxisAlignment.CENTER)
+        return grid
+
+    def render_card(p):
         status_colors = {
             'pendente': ft.colors.ORANGE,
             'preparando': ft.colors.BLUE,
@@ -297,48 +308,32 @@ def OrderView(page: ft.Page, on_back=None, user=None):
             'entregue': ft.icons.CHECK,
             'cancelado': ft.icons.CANCEL
         }
-        grid = ft.Row([
-            ft.Container(
-                content=ft.GridView(
-                    runs_count=colunas,
-                    max_extent=260,
-                    child_aspect_ratio=1.1,
-                    spacing=24,
-                    run_spacing=24,
-                    controls=[
-                        ft.Container(
-                            content=ft.Column([
-                                ft.Icon(name=status_icons.get(p["status"], ft.icons.LIST_ALT), color=status_colors.get(p["status"], ft.colors.GREY), size=32),
-                                ft.Text(f"Pedido #{p['id']}", size=15, weight=ft.FontWeight.BOLD, color=ft.colors.WHITE, text_align=ft.TextAlign.CENTER),
-                                ft.Text(f"Mesa: {p['mesa']}", size=12, color=ft.colors.WHITE70, text_align=ft.TextAlign.CENTER),
-                                ft.Text(f"Cliente: {p['cliente']}", size=12, color=ft.colors.WHITE70, text_align=ft.TextAlign.CENTER),
-                                ft.Text(f"Itens: {p['itens']}", size=11, color=ft.colors.WHITE, text_align=ft.TextAlign.CENTER),
-                                ft.Text(format_metical(p['valor']), size=13, weight=ft.FontWeight.BOLD, color=ft.colors.AMBER_200, text_align=ft.TextAlign.CENTER),
-                                ft.Container(
-                                    content=ft.Text(p["status"].capitalize(), size=12, color=ft.colors.WHITE, weight=ft.FontWeight.BOLD, text_align=ft.TextAlign.CENTER),
-                                    bgcolor=status_colors.get(p["status"], ft.colors.GREY),
-                                    border_radius=7,
-                                    padding=ft.padding.symmetric(vertical=4, horizontal=8),
-                                    alignment=ft.alignment.center,
-                                    margin=ft.margin.only(top=6)
-                                ),
-                            ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, alignment=ft.MainAxisAlignment.CENTER, spacing=6),
-                            bgcolor=ft.colors.BLUE_800,
-                            border=ft.border.all(2, status_colors.get(p["status"], ft.colors.GREY)),
-                            border_radius=10,
-                            padding=10,
-                            width=220,
-                            alignment=ft.alignment.center,
-                            ink=True,
-                            on_click=lambda e, pedido=p: show_order_modal(pedido)
-                        ) for p in pedidos_pagina
-                    ]
+        return ft.Container(
+            content=ft.Column([
+                ft.Icon(name=status_icons.get(p["status"], ft.icons.LIST_ALT), color=status_colors.get(p["status"], ft.colors.GREY), size=32),
+                ft.Text(f"Pedido #{p['id']}", size=15, weight=ft.FontWeight.BOLD, color=ft.colors.WHITE, text_align=ft.TextAlign.CENTER),
+                ft.Text(f"Mesa: {p['mesa']}", size=12, color=ft.colors.WHITE70, text_align=ft.TextAlign.CENTER),
+                ft.Text(f"Cliente: {p['cliente']}", size=12, color=ft.colors.WHITE70, text_align=ft.TextAlign.CENTER),
+                ft.Text(f"Itens: {p['itens']}", size=11, color=ft.colors.WHITE, text_align=ft.TextAlign.CENTER),
+                ft.Text(format_metical(p['valor']), size=13, weight=ft.FontWeight.BOLD, color=ft.colors.AMBER_200, text_align=ft.TextAlign.CENTER),
+                ft.Container(
+                    content=ft.Text(p["status"].capitalize(), size=12, color=ft.colors.WHITE, weight=ft.FontWeight.BOLD, text_align=ft.TextAlign.CENTER),
+                    bgcolor=status_colors.get(p["status"], ft.colors.GREY),
+                    border_radius=7,
+                    padding=ft.padding.symmetric(vertical=4, horizontal=8),
+                    alignment=ft.alignment.center,
+                    margin=ft.margin.only(top=6)
                 ),
-                alignment=ft.alignment.center,
-                expand=True
-            )
-        ], alignment=ft.MainAxisAlignment.CENTER)
-        return grid
+            ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, alignment=ft.MainAxisAlignment.CENTER, spacing=6),
+            bgcolor=ft.colors.BLUE_800,
+            border=ft.border.all(2, status_colors.get(p["status"], ft.colors.GREY)),
+            border_radius=10,
+            padding=10,
+            width=220,
+            alignment=ft.alignment.center,
+            ink=True,
+            on_click=lambda e, pedido=p: show_order_modal(dict(pedido))
+        )
 
     def show_order_modal(pedido):
         # Modal de gerenciamento do pedido
@@ -411,7 +406,7 @@ def OrderView(page: ft.Page, on_back=None, user=None):
         )
         troco_text = ft.Text("", color=ft.colors.BLUE, size=15, visible=(pagamento_state["value"] == "dinheiro"))
         def salvar_status(ev):
-            conn = sqlite3.connect('database/restaurant.db')
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute('UPDATE orders SET status = ? WHERE id = ?', (status_state["value"], pedido["id"]))
             conn.commit()
@@ -426,7 +421,7 @@ def OrderView(page: ft.Page, on_back=None, user=None):
                     erro_valor_pago.value = "Valor insuficiente!"
                     page.update()
                     return
-            conn = sqlite3.connect('database/restaurant.db')
+            conn = get_connection()
             cursor = conn.cursor()
             # Baixar estoque dos produtos do pedido
             cursor.execute('SELECT product_id, quantity FROM order_items WHERE order_id = ?', (pedido['id'],))
@@ -452,35 +447,17 @@ def OrderView(page: ft.Page, on_back=None, user=None):
             dialog_ref["dialog"].open = False
             atualizar_grid()
         def cancelar_pedido(ev):
-            conn = None
             try:
-                conn = sqlite3.connect('database/restaurant.db')
-                cursor = conn.cursor()
-                # Devolver estoque dos produtos
-                cursor.execute('SELECT product_id, quantity FROM order_items WHERE order_id = ?', (pedido['id'],))
-                for prod_id, qty in cursor.fetchall():
-                    cursor.execute('UPDATE products SET stock = stock + ? WHERE id = ?', (qty, prod_id))
-                # Atualizar status do pedido
-                cursor.execute('UPDATE orders SET status = ? WHERE id = ?', ("cancelado", pedido['id']))
-                # Liberar mesa se houver
-                cursor.execute('SELECT table_id FROM orders WHERE id = ?', (pedido['id'],))
-                row = cursor.fetchone()
-                if row and row[0]:
-                    cursor.execute('UPDATE tables SET status = "livre" WHERE id = ?', (row[0],))
-                conn.commit()
+                # Devolve o estoque, libera a mesa e marca como cancelado
+                cancel_orders([pedido['id']])
                 pedido['status'] = 'cancelado'
                 dialog_ref["dialog"].open = False
                 atualizar_grid()
             except Exception as ex:
-                if conn:
-                    conn.rollback()
                 page.show_snack_bar(ft.SnackBar(
                     content=ft.Text(f"Erro ao cancelar pedido: {ex}"),
                     bgcolor=ft.colors.RED
                 ))
-            finally:
-                if conn:
-                    conn.close()
         # Função para atualizar os botões de ação
         def update_actions():
             if is_finalizado:
@@ -526,54 +503,45 @@ def OrderView(page: ft.Page, on_back=None, user=None):
 
     def on_busca_change(e):
         busca_valor["value"] = e.control.value
-        pagina_atual["value"] = 0
-        atualizar_grid()
+        carregar_pagina(0)
 
     def proxima_pagina():
-        pagina_atual['value'] += 1
-        atualizar_grid()
+        if pagina_atual['value'] + 1 < len(cursores_pagina):
+            carregar_pagina(pagina_atual['value'] + 1)
 
     def anterior_pagina():
-        pagina_atual['value'] -= 1
-        atualizar_grid()
+        if pagina_atual['value'] > 0:
+            carregar_pagina(pagina_atual['value'] - 1)
 
     # Sistema de auto-refresh para novos pedidos
-    last_order_count = {"value": 0}
-    
     def check_for_new_orders():
-        """Verifica se há novos pedidos e atualiza automaticamente"""
-        try:
-            # Animar o indicador de refresh
-            status_indicator.content.controls[0].name = ft.icons.SYNC
-            page.update()
-            
-            current_orders = get_pedidos()
-            current_count = len(current_orders)
-            
-            if current_count > last_order_count["value"]:
-                # Há novos pedidos, atualizar a grid
-                last_order_count["value"] = current_count
-                atualizar_grid()
-                # Mostrar notificação
-                page.show_snack_bar(ft.SnackBar(
-                    content=ft.Text(f"🆕 Novo pedido recebido! Total: {current_count} pedidos"),
-                    bgcolor=ft.colors.GREEN_400,
-                    duration=3000
-                ))
-            elif current_count != last_order_count["value"]:
-                # Atualizar contador (pode ter havido exclusões)
-                last_order_count["value"] = current_count
-                atualizar_grid()
-            
-            # Resetar o indicador
-            status_indicator.content.controls[0].name = ft.icons.SYNC
-            page.update()
-        except Exception as e:
-            print(f"Erro ao verificar novos pedidos: {e}")
-    
-    # Inicializar contador
-    last_order_count["value"] = len(get_pedidos())
-    
+        """Verifica se há pedidos novos ou alterados e atualiza automaticamente"""
+        atualizar_grid()
+
+    def aplicar_mudancas(resultado):
+        cursor, lote, pagina, cards, maior_id = resultado
+        primeira_carga = sync_state["cursor"] is None
+        novos = not primeira_carga and maior_id > sync_state["maior_id"]
+        sync_state.update(cursor=cursor, lote=lote, maior_id=max(maior_id, sync_state["maior_id"]))
+        if pagina is not None:
+            mostrar_pagina(pagina)
+        elif cards:
+            for p in cards:
+                if p["id"] not in cards_visiveis or not passa_filtro(p):
+                    # Saiu do filtro da página: relê a página
+                    carregar_pagina(pagina_atual["value"])
+                    break
+                if p != pedidos_visiveis.get(p["id"]):
+                    pedidos_visiveis[p["id"]] = p
+                    grid_ref[0].controls[cards_visiveis[p["id"]]] = render_card(p)
+
+        if novos:
+            page.show_snack_bar(ft.SnackBar(
+                content=ft.Text("🆕 Novo pedido recebido!"),
+                bgcolor=ft.colors.GREEN_400,
+                duration=3000
+            ))
+
     # Sistema de auto-refresh usando page.window.set_timer
     def schedule_next_check():
         """Agenda a próxima verificação de novos pedidos"""
@@ -591,7 +559,7 @@ def OrderView(page: ft.Page, on_back=None, user=None):
     # Iniciar o sistema de auto-refresh
     schedule_next_check()
 
-    # Inicializa grid e paginação
+    # Carga inicial da grade e da paginação (sem cursor: lê tudo)
     atualizar_grid()
 
     # Campos de filtro
@@ -615,6 +583,7 @@ def OrderView(page: ft.Page, on_back=None, user=None):
 
     return ft.Column([
         header,
+        loading_bar,
         ft.Container(height=8),
         # Área de filtros compacta
         ft.Container(
@@ -1,5 +1,9 @@
 import flet as ft
-import sqlite3
+from database.db import get_connection
+from database.models import get_menu_snapshot
+from database.orders import place_order, sell_counter_order, update_order_items, OrderError
+from utils.db_worker import ViewWorker
+from utils import ui_traffic
 from datetime import datetime
 
 
@@ -11,41 +15,62 @@ def format_metical(value):
 
 
 def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
-    current_order = {'id': None, 'table_id': None, 'items': [], 'total': 0.0}
+    # O carrinho fica em memória até processar_pedido / finalize_order.
+    # 'saved' guarda as quantidades já gravadas de um pedido aberto carregado
+    # do banco (o estoque delas já foi baixado).
+    current_order = {'id': None, 'table_id': None, 'items': [], 'total': 0.0, 'saved': {}}
     selected_table = {'id': None, 'number': None}
     user_id = user[0] if user else None
 
-    # Ao sair do PDV, descartar pedido de balcão não finalizado
+    # Estoque lido no último carregamento do cardápio e os textos "Estoque:"
+    # dos cards; o carrinho reserva localmente em cima desse valor
+    product_stock = {}
+    stock_labels = {}
+
+    # Cards do cardápio, criados uma vez por produto e reaproveitados: a
+    # categoria só muda a visibilidade e uma recarga do banco corrige apenas
+    # o que mudou (estoque, nome, preço, imagem), para que cada toque mande
+    # ao cliente Flet só as propriedades alteradas
+    product_cards = {}
+    current_category = {'id': None}
+
+    # Com PDV_UI_TRAFFIC=1 mede os bytes enviados ao cliente por interação
+    traffic = ui_traffic.attach(page)
+
+    def mark_interaction(name):
+        if traffic is not None:
+            traffic.interaction(name)
+
+    # Mesas e cardápio são consultados fora da thread da interface
+    loading_bar = ft.ProgressBar(visible=False, color=ft.colors.AMBER_400, bgcolor=ft.colors.BLUE_100)
+    worker = ViewWorker(page, indicator=loading_bar)
+
+    def clear_order():
+        released = {i['product_id'] for i in current_order['items']}
+        current_order['id'] = None
+        current_order['table_id'] = None
+        current_order['items'] = []
+        current_order['total'] = 0.0
+        current_order['saved'] = {}
+        order_items_list.controls.clear()
+        for product_id in released:
+            refresh_stock_label(product_id)
+
+    def available_stock(product_id):
+        """Estoque livre para o carrinho: o do banco menos o reservado aqui"""
+        in_cart = sum(i['quantity'] for i in current_order['items'] if i['product_id'] == product_id)
+        reserved = in_cart - current_order['saved'].get(product_id, 0)
+        return product_stock.get(product_id, 0) - reserved
+
+    def refresh_stock_label(product_id):
+        label = stock_labels.get(product_id)
+        text = f"Estoque: {available_stock(product_id)}"
+        if label is not None and label.value != text:
+            label.value = text
+
+    # Ao sair do PDV, descartar o carrinho: nada dele foi gravado no banco
     def descartar_pedido_balcao():
-        if current_order['id']:
-            conn = sqlite3.connect('database/restaurant.db')
-            try:
-                cursor = conn.cursor()
-                # Verificar status do pedido
-                cursor.execute('SELECT status, table_id FROM orders WHERE id = ?', (current_order['id'],))
-                row = cursor.fetchone()
-                if not row:
-                    return
-                status, table_id = row
-                # Só descartar se for balcão OU se for mesa e status ainda 'pendente'
-                if (not table_id) or (table_id and status == 'pendente'):
-                    # Devolver estoque dos produtos
-                    cursor.execute('SELECT product_id, quantity FROM order_items WHERE order_id = ?', (current_order['id'],))
-                    for prod_id, qty in cursor.fetchall():
-                        cursor.execute('UPDATE products SET stock = stock + ? WHERE id = ?', (qty, prod_id))
-                    # Liberar a mesa se for mesa
-                    if table_id:
-                        cursor.execute('UPDATE tables SET status = "livre" WHERE id = ?', (table_id,))
-                    # Remover itens e pedido
-                    cursor.execute('DELETE FROM order_items WHERE order_id = ?', (current_order['id'],))
-                    cursor.execute('DELETE FROM orders WHERE id = ?', (current_order['id'],))
-                    current_order['id'] = None
-                    current_order['table_id'] = None
-                    current_order['items'] = []
-                    current_order['total'] = 0.0
-                conn.commit()
-            finally:
-                conn.close()
+        clear_order()
     # Chamar descartar_pedido_balcao ao sair do PDV
     def on_back_pdv(e=None):
         descartar_pedido_balcao()
@@ -57,7 +82,7 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
         label="Categoria",
         width=200,
         options=[],
-        on_change=lambda e: load_products_by_category(e.control.value)
+        on_change=lambda e: (mark_interaction("categoria"), load_products_by_category(e.control.value))
     )
 
     # Definir products_grid antes de qualquer uso
@@ -203,90 +228,93 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
         on_change=lambda e: load_tables()
     )
 
-    def load_tables():
+    def fetch_tables(filtro):
+        conn = get_connection()
         try:
-            conn = sqlite3.connect('database/restaurant.db')
             cursor = conn.cursor()
-            filtro = mesa_status_filter.value or "livre"
             if filtro == "todas":
                 cursor.execute("SELECT id, number, status FROM tables ORDER BY number")
             else:
                 cursor.execute("SELECT id, number, status FROM tables WHERE status = ? ORDER BY number", (filtro,))
             tables = cursor.fetchall()
-            
+
             # Buscar contagem de pedidos ativos para cada mesa
-            active_orders_count = {}
             cursor.execute('''
                 SELECT table_id, COUNT(*) as count 
                 FROM orders 
                 WHERE table_id IS NOT NULL AND status IN ('pendente', 'preparando', 'pronto')
                 GROUP BY table_id
             ''')
-            for table_id, count in cursor.fetchall():
-                active_orders_count[table_id] = count
-            
+            return tables, dict(cursor.fetchall())
+        finally:
             conn.close()
-            tables_grid.controls.clear()
-            if not tables:
-                mesas_status_text.value = 'Nenhuma mesa encontrada para o filtro selecionado.'
-            else:
-                mesas_status_text.value = ''
-            for t in tables:
-                tid, number, status = t
-                is_selected = selected_table.get('id') == tid
-                active_orders = active_orders_count.get(tid, 0)
-                
-                status_colors = {
-                    'livre': ft.colors.GREEN,
-                    'ocupada': ft.colors.RED,
-                    'reservada': ft.colors.ORANGE,
-                    'limpeza': ft.colors.GREY
-                }
-                
-                # Conteúdo do card da mesa
-                mesa_content = [
-                        ft.Text(f"Mesa {number}", size=18, weight=ft.FontWeight.BOLD, color=ft.colors.WHITE),
-                        ft.Container(
-                            content=ft.Text(status.capitalize(), color=ft.colors.WHITE, size=12),
-                            bgcolor=status_colors.get(status, ft.colors.GREY),
-                            padding=5,
-                            border_radius=5
-                        )
-                ]
-                
-                # Adicionar indicador de pedidos ativos se houver
-                if active_orders > 0:
-                    mesa_content.append(
-                        ft.Container(
-                            content=ft.Text(f"{active_orders} pedido(s)", color=ft.colors.WHITE, size=11, weight=ft.FontWeight.BOLD),
-                            bgcolor=ft.colors.AMBER_600,
-                            padding=4,
-                            border_radius=8
-                        )
+
+    def load_tables():
+        filtro = mesa_status_filter.value or "livre"
+        worker.submit("mesas", lambda: fetch_tables(filtro), show_tables, on_error=show_tables_error)
+
+    def show_tables_error(ex):
+        mesas_status_text.value = f'Erro ao carregar mesas: {ex}'
+        tables_grid.controls.clear()
+
+    def show_tables(result):
+        tables, active_orders_count = result
+        tables_grid.controls.clear()
+        if not tables:
+            mesas_status_text.value = 'Nenhuma mesa encontrada para o filtro selecionado.'
+        else:
+            mesas_status_text.value = ''
+        for t in tables:
+            tid, number, status = t
+            is_selected = selected_table.get('id') == tid
+            active_orders = active_orders_count.get(tid, 0)
+            
+            status_colors = {
+                'livre': ft.colors.GREEN,
+                'ocupada': ft.colors.RED,
+                'reservada': ft.colors.ORANGE,
+                'limpeza': ft.colors.GREY
+            }
+            
+            # Conteúdo do card da mesa
+            mesa_content = [
+                    ft.Text(f"Mesa {number}", size=18, weight=ft.FontWeight.BOLD, color=ft.colors.WHITE),
+                    ft.Container(
+                        content=ft.Text(status.capitalize(), color=ft.colors.WHITE, size=12),
+                        bgcolor=status_colors.get(status, ft.colors.GREY),
+                        padding=5,
+                        border_radius=5
+                    )
+            ]
+            
+            # Adicionar indicador de pedidos ativos se houver
+            if active_orders > 0:
+                mesa_content.append(
+                    ft.Container(
+                        content=ft.Text(f"{active_orders} pedido(s)", color=ft.colors.WHITE, size=11, weight=ft.FontWeight.BOLD),
+                        bgcolor=ft.colors.AMBER_600,
+                        padding=4,
+                        border_radius=8
                     )
-                
-                table_card = ft.Container(
-                    content=ft.Column(
-                        mesa_content,
-                        alignment=ft.MainAxisAlignment.CENTER, 
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        spacing=8
-                    ),
-                    bgcolor=ft.colors.BLUE_800 if not is_selected else ft.colors.BLUE_900,
-                    border=ft.border.all(3, ft.colors.GREEN if is_selected else ft.colors.BLUE_600),
-                    border_radius=10,
-                    padding=16,
-                    on_click=lambda e, tid=tid, number=number: select_table_card(tid, number)
                 )
-                tables_grid.controls.append(table_card)
-            page.update()
-        except Exception as ex:
-            mesas_status_text.value = f'Erro ao carregar mesas: {ex}'
-            tables_grid.controls.clear()
-        page.update()
+            
+            table_card = ft.Container(
+                content=ft.Column(
+                    mesa_content,
+                    alignment=ft.MainAxisAlignment.CENTER, 
+                    horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                    spacing=8
+                ),
+                bgcolor=ft.colors.BLUE_800 if not is_selected else ft.colors.BLUE_900,
+                border=ft.border.all(3, ft.colors.GREEN if is_selected else ft.colors.BLUE_600),
+                border_radius=10,
+                padding=16,
+                on_click=lambda e, tid=tid, number=number: select_table_card(tid, number)
+            )
+            tables_grid.controls.append(table_card)
 
     def load_categories():
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT id, name FROM categories WHERE is_active = 1 ORDER BY name')
         categories = cursor.fetchall()
@@ -302,6 +330,7 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
         page.update()
 
     def select_table_card(tid, number):
+        mark_interaction("mesa")
         print(f"[DEBUG] select_table_card: tid={tid}, number={number}")
         selected_table['id'] = tid
         selected_table['number'] = number
@@ -309,7 +338,7 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
         if hasattr(header, 'content') and hasattr(header.content, 'controls') and len(header.content.controls) > 3:
             header.content.controls[3].value = f"Mesa: {number}"
         # Buscar pedidos abertos para a mesa
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT id, created_at, total_amount, status FROM orders
@@ -326,11 +355,9 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
             update_pedido_status()
             page.update()
         def preparar_novo_pedido(e=None):
-            current_order['id'] = None
+            clear_order()
             current_order['table_id'] = tid
-            current_order['items'] = []
-            current_order['total'] = 0.0
-            order_items_list.controls.clear()
+            update_total_display()
             update_pedido_status()
             if e is not None:
                 page.dialog.open = False
@@ -410,7 +437,7 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
         page.update()
 
     def check_active_order(table_id):
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''
             SELECT id, total_amount FROM orders 
@@ -426,185 +453,82 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
             load_order_items(order[0])
 
     def load_order_items(order_id):
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT oi.product_id, p.name, oi.quantity, oi.unit_price, oi.notes
-            FROM order_items oi
-            JOIN products p ON oi.product_id = p.id
-            WHERE oi.order_id = ?
-        ''', (order_id,))
-        items = cursor.fetchall()
-        
-        # Buscar o total do pedido
-        cursor.execute('SELECT COALESCE(total_amount, 0) FROM orders WHERE id = ?', (order_id,))
-        total = cursor.fetchone()[0] or 0
-        current_order['total'] = float(total)
-        
-        conn.close()
-        
+        """Carrega no carrinho um pedido aberto já gravado"""
+        conn = get_connection()
+        try:
+            items = conn.execute('''
+                SELECT oi.id, oi.product_id, p.name, oi.quantity, oi.unit_price, oi.notes
+                FROM order_items oi
+                JOIN products p ON oi.product_id = p.id
+                WHERE oi.order_id = ?
+            ''', (order_id,)).fetchall()
+        finally:
+            conn.close()
+
         current_order['items'] = []
-        order_items_list.controls.clear()
-        
-        for item in items:
-            product_id, name, quantity, unit_price, notes = item
+        current_order['saved'] = {}
+        for item_id, product_id, name, quantity, unit_price, notes in items:
             current_order['items'].append({
+                'item_id': item_id,
                 'product_id': product_id,
                 'name': name,
                 'quantity': quantity,
                 'unit_price': unit_price,
                 'notes': notes
             })
-            
-            def make_update_qty_fn(pid, delta):
-                def fn(e):
-                    update_item_quantity(pid, delta)
-                return fn
-                
-            def make_remove_fn(pid):
-                def fn(e):
-                    remove_item_from_order(pid)
-                return fn
+            current_order['saved'][product_id] = current_order['saved'].get(product_id, 0) + quantity
+        recalc_total()
+        load_order_items_mem()
 
-            # Container para cada item do pedido com melhor organização
-            item_container = ft.Container(
-                content=ft.Column([
-                    # Nome do produto em linha própria
-                    ft.Text(f"{name}", size=14, weight=ft.FontWeight.BOLD),
-                    # Controles em uma linha separada
-                    ft.Row([
-                        ft.Row([
-                            ft.IconButton(
-                                icon=ft.icons.REMOVE_CIRCLE_OUTLINE,
-                                on_click=make_update_qty_fn(product_id, -1),
-                                tooltip="Diminuir",
-                                icon_color=ft.colors.RED_400,
-                                icon_size=20
-                            ),
-                            ft.Text(
-                                str(quantity),
-                                size=14,
-                                width=30,
-                                text_align=ft.TextAlign.CENTER,
-                                weight=ft.FontWeight.BOLD
-                            ),
-                            ft.IconButton(
-                                icon=ft.icons.ADD_CIRCLE_OUTLINE,
-                                on_click=make_update_qty_fn(product_id, 1),
-                                tooltip="Aumentar",
-                                icon_color=ft.colors.GREEN_400,
-                                icon_size=20
-                            ),
-                        ], spacing=0),
-                        ft.Container(expand=True),  # Espaçador flexível
-                        ft.Text(
-                            format_metical(unit_price * quantity),
-                            size=14,
-                            weight=ft.FontWeight.BOLD,
-                            color=ft.colors.BLUE_900
-                        ),
-                        ft.IconButton(
-                            icon=ft.icons.DELETE_OUTLINE,
-                            on_click=make_remove_fn(product_id),
-                            tooltip="Remover",
-                            icon_color=ft.colors.RED,
-                            icon_size=20
-                        )
-            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
-                ]),
-                padding=ft.padding.all(8),
-                border=ft.border.all(1, ft.colors.GREY_300),
-                border_radius=8,
-                bgcolor=ft.colors.WHITE
-            )
-            order_items_list.controls.append(item_container)
-        
-        # Atualizar o total usando a função auxiliar
-        update_total_display()
-        
-        page.update()
+    def recalc_total():
+        current_order['total'] = sum(i['quantity'] * i['unit_price'] for i in current_order['items'])
+
+    def reserve(product_id, name, delta):
+        """Confere o estoque local para mais ``delta`` unidades.
+
+        Retorna None se não houver estoque, senão se já mostrou um aviso.
+        """
+        remaining = available_stock(product_id) - delta
+        if remaining < 0:
+            page.show_snack_bar(ft.SnackBar(
+                content=ft.Text(f"Estoque insuficiente para {name}!", color=ft.colors.WHITE),
+                bgcolor=ft.colors.RED_400
+            ))
+            return None
+        if remaining == 0:
+            page.show_snack_bar(ft.SnackBar(
+                content=ft.Text(f"Última unidade de {name}!", color=ft.colors.WHITE),
+                bgcolor=ft.colors.ORANGE_400
+            ))
+            return True
+        if remaining < 2:
+            page.show_snack_bar(ft.SnackBar(
+                content=ft.Text(f"Estoque baixo de {name}!", color=ft.colors.WHITE),
+                bgcolor=ft.colors.AMBER_400
+            ))
+            return True
+        return False
 
     def update_item_quantity(product_id, delta):
-        if not current_order['id']:
+        mark_interaction("carrinho")
+        item = next((i for i in current_order['items'] if i['product_id'] == product_id), None)
+        if item is None:
             return
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT quantity FROM order_items WHERE order_id = ? AND product_id = ?
-        ''', (current_order['id'], product_id))
-        row = cursor.fetchone()
-        if not row:
-            conn.close()
+        if delta > 0 and reserve(product_id, item['name'], delta) is None:
             return
-        new_qty = row[0] + delta
-        # Buscar estoque do produto
-        cursor.execute('SELECT stock FROM products WHERE id = ?', (product_id,))
-        stock_row = cursor.fetchone()
-        stock = stock_row[0] if stock_row else 0
-        if delta > 0:
-            if new_qty > stock:
-                conn.close()
-                page.show_snack_bar(ft.SnackBar(
-                    content=ft.Text("Estoque insuficiente!", color=ft.colors.WHITE),
-                    bgcolor=ft.colors.RED_400
-                ))
-                return
-            elif new_qty == stock:
-                page.show_snack_bar(ft.SnackBar(
-                    content=ft.Text("Última unidade!", color=ft.colors.WHITE),
-                    bgcolor=ft.colors.ORANGE_400
-                ))
-            elif stock - new_qty < 2:
-                page.show_snack_bar(
-                    ft.SnackBar(
-                        content=ft.Text("Estoque baixo!", color=ft.colors.AMBER_400),
-                        bgcolor=ft.colors.AMBER_400
-                    )
-                )
-        # Ajustar estoque de balcão ao incrementar/decrementar
-        if not selected_table['id']:
-            if delta > 0:
-                cursor.execute('UPDATE products SET stock = stock - 1 WHERE id = ?', (product_id,))
-            elif delta < 0:
-                cursor.execute('UPDATE products SET stock = stock + 1 WHERE id = ?', (product_id,))
-        if new_qty < 1:
-            # Remove item se quantidade < 1
-            cursor.execute('DELETE FROM order_items WHERE order_id = ? AND product_id = ?', (current_order['id'], product_id))
-        else:
-            cursor.execute('UPDATE order_items SET quantity = ? WHERE order_id = ? AND product_id = ?', (new_qty, current_order['id'], product_id))
-        # Atualizar total do pedido
-        cursor.execute('''
-            UPDATE orders 
-            SET total_amount = COALESCE((
-                SELECT SUM(quantity * unit_price) 
-                FROM order_items 
-                WHERE order_id = ?
-            ), 0)
-            WHERE id = ?
-        ''', (current_order['id'], current_order['id']))
-        conn.commit()
-        conn.close()
-        load_order_items(current_order['id'])
+        item['quantity'] += delta
+        if item['quantity'] < 1:
+            current_order['items'].remove(item)
+        recalc_total()
+        refresh_stock_label(product_id)
+        load_order_items_mem()
 
     def remove_item_from_order(product_id):
-        if not current_order['id']:
-            return
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM order_items WHERE order_id = ? AND product_id = ?', (current_order['id'], product_id))
-        # Atualizar total do pedido
-        cursor.execute('''
-            UPDATE orders 
-            SET total_amount = COALESCE((
-                SELECT SUM(quantity * unit_price) 
-                FROM order_items 
-                WHERE order_id = ?
-            ), 0)
-            WHERE id = ?
-        ''', (current_order['id'], current_order['id']))
-        conn.commit()
-        conn.close()
-        load_order_items(current_order['id'])
+        mark_interaction("carrinho")
+        current_order['items'] = [i for i in current_order['items'] if i['product_id'] != product_id]
+        recalc_total()
+        refresh_stock_label(product_id)
+        load_order_items_mem()
 
     def show_product_details_pdv(product):
         prod_id, name, description, price, image_url, stock = product
@@ -624,229 +548,136 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
         dialog.open = True
         page.update()
 
-    # Ajustar products_grid para exibir imagem, nome, preço, botão adicionar
     def load_products_by_category(category_id=None):
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        if not category_id or category_id == "all":
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock 
-                FROM products 
-                WHERE is_active = 1
-                ORDER BY name
-            ''')
-        else:
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock 
-                FROM products 
-                WHERE category_id = ? AND is_active = 1
-                ORDER BY name
-            ''', (category_id,))
-        products = cursor.fetchall()
-        conn.close()
-        products_grid.controls.clear()
-        for product in products:
-            prod_id, name, description, price, image_url, stock = product
-            img = ft.Image(src=image_url if image_url else None, width=80, height=80, fit=ft.ImageFit.CONTAIN) if image_url else ft.Icon(ft.icons.IMAGE, size=70, color=ft.colors.GREY_400)
-            product_card = ft.Container(
-                width=180,
-                height=200,
-                content=ft.Stack([
-                    ft.Container(
-                        content=ft.Column([
-                            img,
-                            ft.Text(name, size=15, weight=ft.FontWeight.BOLD, color=ft.colors.WHITE, text_align=ft.TextAlign.CENTER, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS),
-                            ft.Text(format_metical(price), size=14, weight=ft.FontWeight.BOLD, color=ft.colors.AMBER_200, text_align=ft.TextAlign.CENTER),
-                            ft.Text(f"Estoque: {stock}", size=12, color=ft.colors.WHITE70, text_align=ft.TextAlign.CENTER),
-                        ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, alignment=ft.MainAxisAlignment.CENTER, spacing=5),
-                        alignment=ft.alignment.center,
-                        expand=True
-                    )
-                ]),
-                bgcolor=ft.colors.BLUE_800,
-                padding=6,
-                border_radius=12,
-                alignment=ft.alignment.center,
-                border=ft.border.all(2, ft.colors.AMBER_200),
-                on_click=lambda e, p=product: add_to_order(p),
-                tooltip="Adicionar ao pedido"
-            )
-            products_grid.controls.append(product_card)
+        """Mostra só os cards da categoria; o banco é lido só na primeira vez"""
+        current_category['id'] = None if category_id in (None, "", "all") else str(category_id)
+        if not product_cards:
+            refresh_products()
+            return
+        apply_category_filter()
         page.update()
 
-    def add_to_order(product):
-        try:
-            show_success = True
-            prod_id, name, description, price, image_url, stock = product
-            
-            # --- MESA: manter em memória até processar ---
-            if selected_table['id']:
-                # Verificar se já existe o item no pedido em memória
-                found = False
-                for item in current_order.get('items', []):
-                    if item['product_id'] == prod_id:
-                        # Verificar estoque
-                        if item['quantity'] + 1 > stock:
-                            page.show_snack_bar(ft.SnackBar(
-                                content=ft.Text(f"Estoque insuficiente para {name}!", color=ft.colors.WHITE),
-                                bgcolor=ft.colors.RED_400
-                            ))
-                            return
-                        item['quantity'] += 1
-                        found = True
-                        break
-                
-                if not found:
-                    # Verificar estoque para novo item
-                    if 1 > stock:
-                        page.show_snack_bar(ft.SnackBar(
-                            content=ft.Text(f"Estoque insuficiente para {name}!", color=ft.colors.WHITE),
-                            bgcolor=ft.colors.RED_400
-                        ))
-                        return
-                    # Adicionar novo item em memória
-                    current_order['items'].append({
-                        'product_id': prod_id,
-                        'name': name,
-                        'quantity': 1,
-                        'unit_price': price
-                    })
-                
-                # Atualizar total em memória
-                current_order['total'] = sum(i['quantity'] * i['unit_price'] for i in current_order['items'])
-                
-                # Atualizar interface
-                load_order_items_mem()
-                update_total_display()
-                update_pedido_status()
-                load_tables()
-                
-                page.show_snack_bar(ft.SnackBar(
-                    content=ft.Text(f"{name} adicionado ao pedido", color=ft.colors.WHITE),
-                    bgcolor=ft.colors.GREEN_400
-                ))
-                return
-            
-            # --- BALCÃO: fluxo normal (criar no banco imediatamente) ---
-            # Se não existe pedido, criar um novo
-            if not current_order['id']:
-                pedido_status_text.value = "Pedido de Balcão (sem mesa associada)"
-                conn = sqlite3.connect('database/restaurant.db')
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO orders (table_id, status, total_amount, created_at)
-                    VALUES (?, 'pendente', 0.0, ?)
-                ''', (None, datetime.now().isoformat()))
-                current_order['id'] = cursor.lastrowid
-                conn.commit()
-                conn.close()
-            
-            # Verificar quantidade já no pedido atual
-            qty_in_order = 0
-            conn = sqlite3.connect('database/restaurant.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT quantity FROM order_items 
-                WHERE order_id = ? AND product_id = ?
-            ''', (current_order['id'], prod_id))
-            existing_item = cursor.fetchone()
-            if existing_item:
-                qty_in_order = existing_item[0]
-            
-            # Checar estoque
-            if qty_in_order + 1 > stock:
-                conn.close()
-                page.show_snack_bar(ft.SnackBar(
-                    content=ft.Text(f"Estoque insuficiente para {name}!", color=ft.colors.WHITE),
-                    bgcolor=ft.colors.RED_400
-                ))
-                return
-            elif qty_in_order + 1 == stock:
-                page.show_snack_bar(ft.SnackBar(
-                    content=ft.Text(f"Última unidade de {name}!", color=ft.colors.WHITE),
-                    bgcolor=ft.colors.ORANGE_400
-                ))
-            elif stock - (qty_in_order + 1) < 2:
-                page.show_snack_bar(
-                    ft.SnackBar(
-                        content=ft.Text(f"Estoque baixo de {name}!", color=ft.colors.WHITE),
-                        bgcolor=ft.colors.AMBER_400
-                    )
+    def refresh_products():
+        """Relê o cardápio (estoque de outros terminais, preços) e corrige os cards"""
+        worker.submit("produtos", get_menu_snapshot, sync_product_cards)
+
+    def apply_category_filter():
+        category_id = current_category['id']
+        for entry in product_cards.values():
+            visible = category_id is None or str(entry['category_id']) == category_id
+            if entry['card'].visible != visible:
+                entry['card'].visible = visible
+
+    def product_image(image_url):
+        if image_url:
+            return ft.Image(src=image_url, width=80, height=80, fit=ft.ImageFit.CONTAIN)
+        return ft.Icon(ft.icons.IMAGE, size=70, color=ft.colors.GREY_400)
+
+    def build_product_card(product):
+        prod_id, name, description, price, image_url, stock = product
+        entry = {
+            'product': product,
+            'image_box': ft.Container(content=product_image(image_url)),
+            'name_text': ft.Text(name, size=15, weight=ft.FontWeight.BOLD, color=ft.colors.WHITE, text_align=ft.TextAlign.CENTER, no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS),
+            'price_text': ft.Text(format_metical(price), size=14, weight=ft.FontWeight.BOLD, color=ft.colors.AMBER_200, text_align=ft.TextAlign.CENTER),
+        }
+        stock_labels[prod_id] = ft.Text(f"Estoque: {available_stock(prod_id)}", size=12, color=ft.colors.WHITE70, text_align=ft.TextAlign.CENTER)
+        entry['card'] = ft.Container(
+            width=180,
+            height=200,
+            content=ft.Stack([
+                ft.Container(
+                    content=ft.Column([
+                        entry['image_box'],
+                        entry['name_text'],
+                        entry['price_text'],
+                        stock_labels[prod_id],
+                    ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, alignment=ft.MainAxisAlignment.CENTER, spacing=5),
+                    alignment=ft.alignment.center,
+                    expand=True
                 )
-                show_success = False
-            else:
-                show_success = True
-            
-            # Adicionar novo item ou atualizar quantidade
-            if existing_item:
-                new_qty = qty_in_order + 1
-                cursor.execute('''
-                    UPDATE order_items 
-                    SET quantity = ? 
-                    WHERE order_id = ? AND product_id = ?
-                ''', (new_qty, current_order['id'], prod_id))
+            ]),
+            bgcolor=ft.colors.BLUE_800,
+            padding=6,
+            border_radius=12,
+            alignment=ft.alignment.center,
+            border=ft.border.all(2, ft.colors.AMBER_200),
+            # Os dados atuais do registro, não os do momento em que o card nasceu
+            on_click=lambda e, pid=prod_id: (mark_interaction("adicionar"), add_to_order(product_cards[pid]['product'])),
+            tooltip="Adicionar ao pedido"
+        )
+        return entry
+
+    def sync_product_cards(snapshot):
+        cards = []
+        for p in snapshot:
+            product = (p['id'], p['name'], p['description'], p['price'], p['image_url'], p['stock'])
+            prod_id = p['id']
+            product_stock[prod_id] = p['stock']
+            entry = product_cards.get(prod_id)
+            if entry is None:
+                entry = product_cards[prod_id] = build_product_card(product)
             else:
-                cursor.execute('''
-                    INSERT INTO order_items (order_id, product_id, quantity, unit_price)
-                    VALUES (?, ?, 1, ?)
-                ''', (current_order['id'], prod_id, price))
-            
-            # Baixar estoque imediatamente se for balcão
-            cursor.execute('UPDATE products SET stock = stock - 1 WHERE id = ?', (prod_id,))
-            
-            # Atualizar total do pedido
-            cursor.execute('''
-                UPDATE orders SET total_amount = (
-                    SELECT SUM(quantity * unit_price) 
-                    FROM order_items 
-                    WHERE order_id = ?
-                ) WHERE id = ?
-            ''', (current_order['id'], current_order['id']))
-            conn.commit()
-            conn.close()
-            
-            # Recarregar itens do pedido
-            load_order_items(current_order['id'])
-            if show_success:
-                page.show_snack_bar(ft.SnackBar(
-                    content=ft.Text(f"{name} adicionado ao pedido", color=ft.colors.WHITE),
-                    bgcolor=ft.colors.GREEN_400
-                ))
-            update_pedido_status()
-            load_tables()
-            
-        except Exception as e:
-            print(f"[ERROR] Erro ao adicionar produto: {e}")
+                old = entry['product']
+                if old[1] != product[1]:
+                    entry['name_text'].value = product[1]
+                if old[3] != product[3]:
+                    entry['price_text'].value = format_metical(product[3])
+                if old[4] != product[4]:
+                    entry['image_box'].content = product_image(product[4])
+                entry['product'] = product
+                refresh_stock_label(prod_id)
+            entry['category_id'] = p['category_id']
+            cards.append(entry['card'])
+
+        # Produtos desativados ou apagados saem do registro
+        listed = {p['id'] for p in snapshot}
+        for prod_id in [pid for pid in product_cards if pid not in listed]:
+            del product_cards[prod_id]
+            stock_labels.pop(prod_id, None)
+        # A lista só é trocada se entrou, saiu ou mudou de posição algum card
+        if len(cards) != len(products_grid.controls) or any(a is not b for a, b in zip(cards, products_grid.controls)):
+            products_grid.controls = cards
+        apply_category_filter()
+
+    def add_to_order(product):
+        """Põe uma unidade do produto no carrinho (mesa ou balcão), sem gravar"""
+        prod_id, name, description, price, image_url, stock = product
+        warned = reserve(prod_id, name, 1)
+        if warned is None:
+            return
+        item = next((i for i in current_order['items'] if i['product_id'] == prod_id), None)
+        if item is None:
+            current_order['items'].append({
+                'product_id': prod_id,
+                'name': name,
+                'quantity': 1,
+                'unit_price': price
+            })
+        else:
+            item['quantity'] += 1
+        recalc_total()
+        refresh_stock_label(prod_id)
+        load_order_items_mem()
+        update_pedido_status()
+        if not warned:
             page.show_snack_bar(ft.SnackBar(
-                content=ft.Text(f"Erro ao adicionar produto: {str(e)}"),
-                bgcolor=ft.colors.RED_400
+                content=ft.Text(f"{name} adicionado ao pedido", color=ft.colors.WHITE),
+                bgcolor=ft.colors.GREEN_400
             ))
-    # Função para exibir itens do carrinho em memória (mesa)
+            page.update()
+
+    # Itens do carrinho em memória
     def load_order_items_mem():
         order_items_list.controls.clear()
         for item in current_order.get('items', []):
             def make_update_qty_fn(pid, delta):
                 def fn(e):
-                    for it in current_order['items']:
-                        if it['product_id'] == pid:
-                            if it['quantity'] + delta < 1:
-                                current_order['items'].remove(it)
-                            else:
-                                it['quantity'] += delta
-                            break
-                    current_order['total'] = sum(i['quantity'] * i['unit_price'] for i in current_order['items'])
-                    load_order_items_mem()
-                    update_total_display()
+                    update_item_quantity(pid, delta)
                 return fn
             def make_remove_fn(pid):
                 def fn(e):
-                    for it in current_order['items']:
-                        if it['product_id'] == pid:
-                            current_order['items'].remove(it)
-                            break
-                    current_order['total'] = sum(i['quantity'] * i['unit_price'] for i in current_order['items'])
-                    load_order_items_mem()
-                    update_total_display()
+                    remove_item_from_order(pid)
                 return fn
             item_container = ft.Container(
                 content=ft.Column([
@@ -902,7 +733,8 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
 
     def finalize_order():
         """Finaliza o pedido atual, atualiza o estoque e registra a venda"""
-        if not current_order['id']:
+        mark_interaction("venda")
+        if not current_order['items'] and not current_order['id']:
             page.show_snack_bar(ft.SnackBar(
                 content=ft.Text("Nenhum pedido para finalizar", color=ft.colors.WHITE),
                 bgcolor=ft.colors.ORANGE_400
@@ -943,26 +775,22 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
                         erro_valor_pago.value = "Valor insuficiente!"
                         page.update()
                         return
-                conn = sqlite3.connect('database/restaurant.db')
-                cursor = conn.cursor()
-                # Registrar venda
-                cursor.execute('''
-                    INSERT INTO sales (order_id, user_id, payment_method, total_amount, created_at)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (current_order["id"], user_id, pagamento_state["value"], current_order["total"], datetime.now().isoformat()))
-                # Remover pedido do banco (não deixar como entregue nos pedidos), mas manter os itens para cálculo do lucro
-                cursor.execute('DELETE FROM orders WHERE id = ?', (current_order["id"],))
-                conn.commit()
-                conn.close()
-                # Limpar pedido atual
-                current_order['id'] = None
-                current_order['table_id'] = None
-                current_order['items'] = []
-                current_order['total'] = 0.0
-                order_items_list.controls.clear()
+                # Pedido, itens, baixa de estoque e venda numa só transação
+                try:
+                    sell_counter_order(cart_items(), user_id, pagamento_state["value"])
+                except OrderError as ex:
+                    page.dialog.open = False
+                    refresh_products()
+                    page.show_snack_bar(ft.SnackBar(
+                        content=ft.Text(str(ex), color=ft.colors.WHITE),
+                        bgcolor=ft.colors.RED_400
+                    ))
+                    page.update()
+                    return
+                clear_order()
                 update_total_display()
                 load_tables()
-                load_products_by_category()
+                refresh_products()
                 page.dialog.open = False
                 page.show_snack_bar(ft.SnackBar(
                     content=ft.Text("Venda finalizada com sucesso!", color=ft.colors.WHITE),
@@ -1016,7 +844,7 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
         # (Fluxo normal para pedidos de mesa)
         conn = None
         try:
-            conn = sqlite3.connect('database/restaurant.db')
+            conn = get_connection()
             cursor = conn.cursor()
             # Buscar a mesa associada ao pedido
             cursor.execute('SELECT table_id FROM orders WHERE id = ?', (current_order['id'],))
@@ -1037,14 +865,10 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
                 cursor.execute('UPDATE tables SET status = "livre" WHERE id = ?', (table_id,))
             conn.commit()
             # Limpar pedido atual
-            current_order['id'] = None
-            current_order['table_id'] = None
-            current_order['items'] = []
-            current_order['total'] = 0.0
-            order_items_list.controls.clear()
+            clear_order()
             update_total_display()
             load_tables()
-            load_products_by_category()
+            refresh_products()
             page.show_snack_bar(ft.SnackBar(
                 content=ft.Text("Venda finalizada com sucesso!", color=ft.colors.WHITE),
                 bgcolor=ft.colors.GREEN_400
@@ -1062,22 +886,28 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
         page.update()
 
     def cancel_order():
+        mark_interaction("cancelar")
         if not current_order['id']:
+            if not current_order['items']:
+                page.show_snack_bar(ft.SnackBar(
+                    content=ft.Text("Nenhum pedido para cancelar", color=ft.colors.WHITE),
+                    bgcolor=ft.colors.ORANGE_400
+                ))
+                return
+            # Carrinho ainda não gravado: basta descartar e soltar a reserva
+            clear_order()
+            update_total_display()
             page.show_snack_bar(ft.SnackBar(
-                content=ft.Text("Nenhum pedido para cancelar", color=ft.colors.WHITE),
-                bgcolor=ft.colors.ORANGE_400
+                content=ft.Text("Pedido cancelado", color=ft.colors.WHITE),
+                bgcolor=ft.colors.AMBER_700
             ))
+            page.update()
             return
         
         conn = None
         try:
-            conn = sqlite3.connect('database/restaurant.db')
+            conn = get_connection()
             cursor = conn.cursor()
-            # Devolver estoque dos produtos se for balcão
-            if not selected_table['id']:
-                cursor.execute('SELECT product_id, quantity FROM order_items WHERE order_id = ?', (current_order['id'],))
-                for prod_id, qty in cursor.fetchall():
-                    cursor.execute('UPDATE products SET stock = stock + ? WHERE id = ?', (qty, prod_id))
             # Buscar a mesa associada ao pedido
             cursor.execute('SELECT table_id FROM orders WHERE id = ?', (current_order['id'],))
             table_id = cursor.fetchone()[0]
@@ -1092,11 +922,7 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
                 bgcolor=ft.colors.AMBER_700
             ))
             # Limpar pedido atual
-            current_order['id'] = None
-            current_order['table_id'] = None
-            current_order['items'] = []
-            current_order['total'] = 0.0
-            order_items_list.controls.clear()
+            clear_order()
             update_total_display()
         except Exception as e:
             if conn:
@@ -1119,7 +945,7 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
             try:
                 number = int(number_field.value)
                 capacity = int(capacity_field.value)
-                conn = sqlite3.connect('database/restaurant.db')
+                conn = get_connection()
                 try:
                     cursor = conn.cursor()
                     cursor.execute('SELECT 1 FROM tables WHERE number = ?', (number,))
@@ -1184,92 +1010,64 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
         print(f"[DEBUG] update_pedido_status: pedido_btn.text = {pedido_btn.text}")
         page.update()
 
+    def cart_items():
+        return [
+            {
+                'item_id': i.get('item_id'),
+                'product_id': i['product_id'],
+                'quantity': i['quantity'],
+                'price': i['unit_price'],
+                'notes': i.get('notes'),
+            }
+            for i in current_order['items']
+        ]
+
     def processar_pedido():
-        """Processa o pedido de mesa: cria o pedido no banco, ocupa a mesa, baixa o estoque e muda status para pendente"""
-        print(f"[LOG] Iniciando processamento do pedido para a mesa: {selected_table['number']} (id={selected_table['id']})")
-        print(f"[LOG] Estado atual do pedido: {current_order}")
-        
+        """Grava o carrinho da mesa numa só transação: pedido novo (ocupa a mesa,
+        baixa o estoque, status pendente) ou a edição de um pedido aberto"""
+        mark_interaction("pedido")
         if not current_order.get('items') or not selected_table['id']:
             page.show_snack_bar(ft.SnackBar(
                 content=ft.Text("Nenhum pedido para processar", color=ft.colors.WHITE),
                 bgcolor=ft.colors.ORANGE_400
             ))
-            print("[LOG] Nenhum item no pedido ou mesa não selecionada. Abortando processamento.")
             return
-        
-        # Verificar se a mesa está livre (só ocupar se estiver livre)
-        conn = sqlite3.connect('database/restaurant.db')
+
         try:
-            cursor = conn.cursor()
-            cursor.execute('SELECT status FROM tables WHERE id = ?', (selected_table['id'],))
-            table_status = cursor.fetchone()
-            
-            if not table_status:
-                page.show_snack_bar(ft.SnackBar(
-                    content=ft.Text("Mesa não encontrada!", color=ft.colors.WHITE),
-                    bgcolor=ft.colors.RED_400
-                ))
-                return
-            
-            # Se a mesa estiver livre, ocupá-la. Se já estiver ocupada, apenas criar o pedido
-            should_occupy_table = (table_status[0] == 'livre')
-            
-            # Criar pedido
-            cursor.execute('''
-                INSERT INTO orders (table_id, status, total_amount, created_at)
-                VALUES (?, 'pendente', ?, ?)
-            ''', (selected_table['id'], current_order['total'], datetime.now().isoformat()))
-            order_id = cursor.lastrowid
-            print(f"[LOG] Pedido criado no banco: order_id={order_id}")
-            
-            # Criar itens
-            for item in current_order['items']:
-                print(f"[LOG] Adicionando item ao pedido: {item}")
-                cursor.execute('''
-                    INSERT INTO order_items (order_id, product_id, quantity, unit_price)
-                    VALUES (?, ?, ?, ?)
-                ''', (order_id, item['product_id'], item['quantity'], item['unit_price']))
-            
-            # Ocupar a mesa apenas se estiver livre
-            if should_occupy_table:
-                cursor.execute('UPDATE tables SET status = "ocupada" WHERE id = ?', (selected_table['id'],))
-                print(f"[LOG] Mesa {selected_table['number']} ocupada")
+            if current_order['id']:
+                update_order_items(current_order['id'], cart_items())
+                mensagem = f"Pedido #{current_order['id']} atualizado!"
             else:
-                print(f"[LOG] Mesa {selected_table['number']} já estava ocupada, mantendo status")
-            
-            # Baixar estoque dos produtos
-            for item in current_order['items']:
-                print(f"[LOG] Baixando estoque do produto {item['product_id']} em {item['quantity']} unidade(s)")
-                cursor.execute('UPDATE products SET stock = stock - ? WHERE id = ?', (item['quantity'], item['product_id']))
-            
-            conn.commit()
-            print(f"[LOG] Pedido processado com sucesso para a mesa {selected_table['number']} (id={selected_table['id']})")
-            
+                place_order(selected_table['id'], cart_items(), check_capacity=False)
+                mensagem = "Pedido enviado para a cozinha! O pagamento será feito depois, na tela de Pedidos."
+        except OrderError as e:
+            # Outro terminal levou o estoque: recarregar o cardápio e manter o carrinho
+            refresh_products()
+            page.show_snack_bar(ft.SnackBar(
+                content=ft.Text(str(e), color=ft.colors.WHITE),
+                bgcolor=ft.colors.RED_400
+            ))
+            page.update()
+            return
         except Exception as e:
-            conn.rollback()
             print(f"[ERROR] Erro ao processar pedido: {e}")
             page.show_snack_bar(ft.SnackBar(
                 content=ft.Text(f"Erro ao processar pedido: {str(e)}", color=ft.colors.WHITE),
                 bgcolor=ft.colors.RED_400
             ))
+            page.update()
             return
-        finally:
-            conn.close()
-        
+
         page.show_snack_bar(ft.SnackBar(
-            content=ft.Text("Pedido enviado para a cozinha! O pagamento será feito depois, na tela de Pedidos.", color=ft.colors.WHITE),
+            content=ft.Text(mensagem, color=ft.colors.WHITE),
             bgcolor=ft.colors.GREEN_400
         ))
-        
+
         # Limpa o pedido atual
-        current_order['id'] = None
-        current_order['table_id'] = None
-        current_order['items'] = []
-        current_order['total'] = 0.0
-        order_items_list.controls.clear()
+        clear_order()
         update_total_display()
         load_tables()
-        load_products_by_category()
+        refresh_products()
         page.update()
 
     # Área do pedido atual (movida para depois das definições das funções)
@@ -1308,13 +1106,14 @@ def PDVView(page: ft.Page, on_back=None, user=None, on_navigate=None):
     # Carregar dados iniciais
     load_tables()
     load_categories()
-    load_products_by_category()  # Mostrar todos os produtos ao abrir
+    refresh_products()  # Mostrar todos os produtos ao abrir
     update_pedido_status()
 
     # Remover logs visuais e debug
     # Ajustar layout: header fixo no topo, colunas alinhadas
     return ft.Column([
             header,
+            loading_bar,
             ft.Container(height=12),
             ft.Row([
                 # Coluna esquerda: Resumo do pedido
@@ -1,5 +1,5 @@
 import flet as ft
-from database.models import get_products, create_product, update_product, set_product_active, delete_product, add_stock_entry, get_product_by_id, register_missing_stock_entries, fix_invalid_image_urls
+from database.models import get_products, search_products, create_product, update_product, set_product_active, delete_product, add_stock_entry, get_product_by_id, register_missing_stock_entries, fix_invalid_image_urls
 import os
 import shutil
 import uuid
@@ -97,6 +97,7 @@ class ProductCard(ft.UserControl):
 
 # Dados mockados para simular muitos produtos
 PAGE_SIZE = 12
+SEARCH_RESULTS = 500
 
 def view(page: ft.Page, on_back=None):
     state = {"current_page": 1}
@@ -150,14 +151,18 @@ def view(page: ft.Page, on_back=None):
     # Remover filtro de inativos
     # show_inactive = ft.Checkbox(label="Mostrar inativos", value=False)
 
-    def update_grid():
-        filtro = search_field.value.lower() if search_field.value else ""
+    def load_products():
+        # Com texto na busca a lista vem do índice FTS, já filtrada e na ordem
+        # de relevância; sem texto, todos os ativos da categoria
+        filtro = (search_field.value or "").strip()
         categoria = category_field.value
-        produtos_db = get_products(False)  # Só ativos
+        if filtro:
+            produtos_db = search_products(filtro, category_id=categoria, limit=SEARCH_RESULTS)
+        else:
+            produtos_db = [p for p in get_products(False) if not categoria or str(p[4]) == categoria]
         produtos = []
         for p in produtos_db:
             img_url = p[8]
-            print(f"[DEBUG] update_grid: produto {p[0]} image_url do banco = {img_url}")
             if isinstance(img_url, str) and img_url.startswith("static/images/"):
                 img_url = img_url.replace("\\", "/")
             produtos.append({
@@ -169,7 +174,10 @@ def view(page: ft.Page, on_back=None):
                 "is_active": True,  # Sempre ativo
                 "category_id": p[4] if len(p) > 4 else None
             })
-        produtos_filtrados = [p for p in produtos if filtro in p["name"].lower() and (not categoria or str(p.get("category_id")) == categoria)]
+        return produtos
+
+    def update_grid():
+        produtos_filtrados = load_products()
         total = len(produtos_filtrados)
         total_pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
         state["current_page"] = min(state["current_page"], total_pages)
@@ -201,19 +209,7 @@ def view(page: ft.Page, on_back=None):
             update_grid()
 
     def go_next(e):
-        filtro = search_field.value.lower() if search_field.value else ""
-        produtos_db = get_products()
-        produtos = []
-        for p in produtos_db:
-            produtos.append({
-                "id": p[0],
-                "name": p[1],
-                "price": p[3],
-                "code": f"COD: {p[0]:04d}",
-                "image_url": p[8],
-                "is_active": p[9] == 1
-            })
-        produtos_filtrados = [p for p in produtos if filtro in p["name"].lower()]
+        produtos_filtrados = load_products()
         total = len(produtos_filtrados)
         total_pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
         if state["current_page"] < total_pages:
@@ -1,7 +1,8 @@
 import flet as ft
-import sqlite3
+from database.db import get_connection
 from datetime import datetime, timedelta
-from database.models import get_stock_entries, get_product_by_id
+from database.reports import list_sales, list_stock_entries, sales_summary, stock_entries_summary
+from utils.db_worker import ViewWorker
 
 # Utilitário para formatar valores em Metical
 
@@ -78,9 +79,14 @@ def ReportView(page: ft.Page, on_back=None):
     ticket_medio_text = ft.Text("", size=15, color=ft.colors.BLUE_900)
     mensagem_vazia = ft.Text("", size=16, color=ft.colors.GREY)
 
+    # Consultas dos relatórios rodam fora da thread da interface; filtros
+    # trocados em sequência só aplicam o resultado do último
+    loading_bar = ft.ProgressBar(visible=False, color=ft.colors.AMBER_400, bgcolor=ft.colors.BLUE_100)
+    worker = ViewWorker(page, indicator=loading_bar)
+
     # Carregar operadores
     def carregar_operadores():
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('SELECT id, username, name, role FROM users ORDER BY name')
         ops = cursor.fetchall()
@@ -121,32 +127,18 @@ def ReportView(page: ft.Page, on_back=None):
     )
 
     def carregar_vendas():
+        filtros = dict(
+            payment_method=metodo_pagamento.value or None,
+            user_id=operador.value or None,
+            min_amount=float(valor_min.value.replace(",", ".")) if valor_min.value else None,
+            max_amount=float(valor_max.value.replace(",", ".")) if valor_max.value else None,
+        )
+        inicio, fim = data_inicio.value, data_fim.value
+        worker.submit("vendas", lambda: list_sales(inicio, fim, **filtros), mostrar_vendas)
+
+    def mostrar_vendas(vendas):
         vendas_list.controls.clear()
         mensagem_vazia.value = ""
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        query = '''
-            SELECT s.id, s.created_at, s.total_amount, s.payment_method, u.name, u.username
-            FROM sales s
-            LEFT JOIN users u ON s.user_id = u.id
-            WHERE date(s.created_at) BETWEEN ? AND ?
-        '''
-        params = [data_inicio.value, data_fim.value]
-        if metodo_pagamento.value:
-            query += " AND s.payment_method = ?"
-            params.append(metodo_pagamento.value)
-        if operador.value:
-            query += " AND s.user_id = ?"
-            params.append(operador.value)
-        if valor_min.value:
-            query += " AND s.total_amount >= ?"
-            params.append(float(valor_min.value.replace(",", ".")))
-        if valor_max.value:
-            query += " AND s.total_amount <= ?"
-            params.append(float(valor_max.value.replace(",", ".")))
-        query += " ORDER BY s.created_at DESC"
-        cursor.execute(query, params)
-        vendas = cursor.fetchall()
         total = 0
         num_vendas = len(vendas)
         for vid, created_at, total_amount, payment_method, user_name, user_username in vendas:
@@ -180,7 +172,6 @@ def ReportView(page: ft.Page, on_back=None):
         ticket_medio_text.value = f"Ticket médio: {format_metical(ticket_medio)}"
         if not vendas:
             mensagem_vazia.value = "Nenhuma venda encontrada para os filtros selecionados."
-        page.update()
 
     def on_filtrar_vendas(e):
         filtro_rapido_valor["value"] = "Personalizado"
@@ -191,45 +182,74 @@ def ReportView(page: ft.Page, on_back=None):
     # --- Relatório de Entradas (Compras/Estoque) ---
     data_inicio_entrada = ft.TextField(label="Data Início", width=120, value=hoje.strftime("%Y-%m-%d"))
     data_fim_entrada = ft.TextField(label="Data Fim", width=120, value=hoje.strftime("%Y-%m-%d"))
-    entradas_list = ft.ListView(expand=1, spacing=8, padding=10)
     total_entradas_text = ft.Text("", size=16, weight=ft.FontWeight.BOLD, color=ft.colors.BLUE_900)
     mensagem_vazia_entrada = ft.Text("", size=16, color=ft.colors.GREY)
+    # Entradas em páginas: a lista ganha a próxima página quando a rolagem
+    # chega perto do fim. "cursor" é o da próxima página (None = acabou).
+    entradas_state = {"filtro": None, "cursor": None, "carregando": False}
+
+    def card_entrada(entry):
+        eid, product_id, prod_name, quantity, unit_cost, total_cost, supplier, notes, created_at = entry
+        return ft.Container(
+            bgcolor=ft.colors.WHITE,
+            border_radius=16,
+            border=ft.border.all(1, ft.colors.GREY_200),
+            shadow=ft.BoxShadow(blur_radius=8, color=ft.colors.with_opacity(ft.colors.BLACK, 0.06)),
+            margin=ft.margin.all(4),
+            padding=0,
+            content=ft.Column([
+                ft.Text(f"{created_at[:16]}", size=14, color=ft.colors.BLUE_900, text_align=ft.TextAlign.CENTER),
+                ft.Text(prod_name, size=14, weight=ft.FontWeight.BOLD, color=ft.colors.BLUE_700, text_align=ft.TextAlign.CENTER),
+                ft.Text(f"Qtd: {quantity}", size=13, color=ft.colors.BLUE_700, text_align=ft.TextAlign.CENTER),
+                ft.Text(f"Unit: {format_metical(unit_cost)}", size=13, color=ft.colors.GREEN_700, text_align=ft.TextAlign.CENTER),
+                ft.Text(f"Total: {format_metical(total_cost)}", size=20, weight=ft.FontWeight.BOLD, color=ft.colors.GREEN_900, text_align=ft.TextAlign.CENTER),
+                ft.Text(f"Fornecedor: {supplier if supplier else '-'}", size=13, color=ft.colors.GREY_700, text_align=ft.TextAlign.CENTER),
+                ft.Text(f"Obs: {notes if notes else '-'}", size=12, color=ft.colors.GREY_600, text_align=ft.TextAlign.CENTER),
+            ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=6),
+        )
 
     def carregar_entradas():
+        inicio, fim = data_inicio_entrada.value, data_fim_entrada.value
+        entradas_state.update(filtro=(inicio, fim), cursor=None, carregando=True)
+        worker.submit(
+            "entradas",
+            lambda: (list_stock_entries(inicio, fim), stock_entries_summary(inicio, fim)),
+            mostrar_entradas,
+            on_error=erro_entradas
+        )
+
+    def carregar_mais_entradas():
+        if entradas_state["carregando"] or not entradas_state["cursor"]:
+            return
+        inicio, fim = entradas_state["filtro"]
+        cursor = entradas_state["cursor"]
+        entradas_state["carregando"] = True
+        # Mesma chave: trocar o filtro descarta uma página que ainda estava a caminho
+        worker.submit("entradas", lambda: list_stock_entries(inicio, fim, cursor), acrescentar_entradas,
+                      on_error=erro_entradas)
+
+    def mostrar_entradas(resultado):
+        (entries, cursor), (count, total) = resultado
         entradas_list.controls.clear()
-        mensagem_vazia_entrada.value = ""
-        entries = get_stock_entries(start_date=data_inicio_entrada.value, end_date=data_fim_entrada.value)
-        print(f"[DEBUG] Entradas encontradas: {len(entries)}")
-        for entry in entries:
-            print(f"[DEBUG] Entrada: {entry}")
-        total = 0
-        for eid, product_id, quantity, unit_cost, total_cost, supplier, notes, created_at in entries:
-            total += total_cost or 0
-            prod = get_product_by_id(product_id)
-            prod_name = prod[1] if prod and prod[1] else f"ID {product_id}"
-            entradas_list.controls.append(
-                ft.Container(
-                    bgcolor=ft.colors.WHITE,
-                    border_radius=16,
-                    border=ft.border.all(1, ft.colors.GREY_200),
-                    shadow=ft.BoxShadow(blur_radius=8, color=ft.colors.with_opacity(ft.colors.BLACK, 0.06)),
-                    margin=ft.margin.all(4),
-                    padding=0,
-                    content=ft.Column([
-                        ft.Text(f"{created_at[:16]}", size=14, color=ft.colors.BLUE_900, text_align=ft.TextAlign.CENTER),
-                        ft.Text(prod_name, size=14, weight=ft.FontWeight.BOLD, color=ft.colors.BLUE_700, text_align=ft.TextAlign.CENTER),
-                        ft.Text(f"Qtd: {quantity}", size=13, color=ft.colors.BLUE_700, text_align=ft.TextAlign.CENTER),
-                        ft.Text(f"Unit: {format_metical(unit_cost)}", size=13, color=ft.colors.GREEN_700, text_align=ft.TextAlign.CENTER),
-                        ft.Text(f"Total: {format_metical(total_cost)}", size=20, weight=ft.FontWeight.BOLD, color=ft.colors.GREEN_900, text_align=ft.TextAlign.CENTER),
-                        ft.Text(f"Fornecedor: {supplier if supplier else '-'}", size=13, color=ft.colors.GREY_700, text_align=ft.TextAlign.CENTER),
-                        ft.Text(f"Obs: {notes if notes else '-'}", size=12, color=ft.colors.GREY_600, text_align=ft.TextAlign.CENTER),
-                    ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=6),
-                )
-            )
-        total_entradas_text.value = f"Total em Entradas: {format_metical(total)}"
-        if not entries:
-            mensagem_vazia_entrada.value = "Nenhuma entrada encontrada para os filtros selecionados."
-        page.update()
+        acrescentar_entradas((entries, cursor))
+        total_entradas_text.value = f"Total em Entradas: {format_metical(total)} ({count} entradas)"
+        mensagem_vazia_entrada.value = "" if count else "Nenhuma entrada encontrada para os filtros selecionados."
+
+    def acrescentar_entradas(pagina):
+        entries, cursor = pagina
+        entradas_list.controls.extend(card_entrada(entry) for entry in entries)
+        entradas_state.update(cursor=cursor, carregando=False)
+
+    def erro_entradas(erro):
+        entradas_state["carregando"] = False
+        mensagem_vazia_entrada.value = f"Erro ao carregar entradas: {erro}"
+
+    def on_scroll_entradas(e):
+        # Faltando menos de ~uma tela para o fim, busca a próxima página
+        if e.max_scroll_extent is not None and e.pixels >= e.max_scroll_extent - 300:
+            carregar_mais_entradas()
+
+    entradas_list = ft.ListView(expand=1, spacing=8, padding=10, on_scroll_interval=100, on_scroll=on_scroll_entradas)
 
     def on_filtrar_entradas(e):
         carregar_entradas()
@@ -245,31 +265,20 @@ def ReportView(page: ft.Page, on_back=None):
     num_entradas_resumo = ft.Text("", size=16, color=ft.colors.BLUE_900)
 
     def carregar_resumo():
-        # Vendas
-        conn = sqlite3.connect('database/restaurant.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT COUNT(*), COALESCE(SUM(total_amount),0) FROM sales
-            WHERE date(created_at) BETWEEN ? AND ?
-        ''', (data_inicio_resumo.value, data_fim_resumo.value))
-        num_vendas, total_vendas = cursor.fetchone()
+        inicio, fim = data_inicio_resumo.value, data_fim_resumo.value
+        worker.submit("resumo", lambda: (sales_summary(inicio, fim), stock_entries_summary(inicio, fim)), mostrar_resumo)
+
+    def mostrar_resumo(resultado):
+        (num_vendas, total_vendas), (num_entradas, total_entradas) = resultado
         ticket_medio = total_vendas / num_vendas if num_vendas else 0
-        # Entradas
-        cursor.execute('''
-            SELECT COUNT(*), COALESCE(SUM(total_cost),0) FROM stock_entries
-            WHERE date(created_at) BETWEEN ? AND ?
-        ''', (data_inicio_resumo.value, data_fim_resumo.value))
-        num_entradas, total_entradas = cursor.fetchone()
         # Lucro bruto
         lucro = total_vendas - total_entradas
-        conn.close()
         total_vendas_resumo.value = f"Total de Vendas: {format_metical(total_vendas)}"
         total_entradas_resumo.value = f"Total de Entradas: {format_metical(total_entradas)}"
         lucro_resumo.value = f"Lucro Bruto: {format_metical(lucro)}"
         ticket_medio_resumo.value = f"Ticket Médio: {format_metical(ticket_medio)}"
         num_vendas_resumo.value = f"Nº de Vendas: {num_vendas}"
         num_entradas_resumo.value = f"Nº de Entradas: {num_entradas}"
-        page.update()
 
     def on_filtrar_resumo(e):
         carregar_resumo()
@@ -421,6 +430,7 @@ def ReportView(page: ft.Page, on_back=None):
         expand=True,
         content=ft.Column([
             header,
+            loading_bar,
             ft.Container(height=20),
             abas
         ], expand=True, scroll=ft.ScrollMode.AUTO)
@@ -1,5 +1,6 @@
 import flet as ft
 import sqlite3
+from database.db import get_connection
 from datetime import datetime
 
 
@@ -63,7 +64,7 @@ def TableView(page: ft.Page, on_back=None):
 
     def load_tables():
         tables_grid.controls.clear()
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -163,7 +164,7 @@ def TableView(page: ft.Page, on_back=None):
                 number = int(number_field.value)
                 capacity = int(capacity_field.value)
                 
-                conn = sqlite3.connect('database/restaurant.db')
+                conn = get_connection()
                 cursor = conn.cursor()
                 try:
                     cursor.execute('''
@@ -239,7 +240,7 @@ def TableView(page: ft.Page, on_back=None):
                 new_capacity = int(capacity_field.value)
                 new_status = status_dropdown.value
                 
-                conn = sqlite3.connect('database/restaurant.db')
+                conn = get_connection()
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE tables 
@@ -293,7 +294,7 @@ def TableView(page: ft.Page, on_back=None):
                 dialog.open = False
                 page.update()
                 return
-            conn = sqlite3.connect('database/restaurant.db')
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute('DELETE FROM tables WHERE id = ?', (table_id,))
             conn.commit()
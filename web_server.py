@@ -1,20 +1,34 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for
 import sqlite3
 import hashlib
+from functools import wraps
 from datetime import datetime, time
 import os
-from database import init_db
+from database.db import init_db, get_connection
+from database.models import get_menu_snapshot
+from database.cache import cached_json
+from database import idempotency, tracing
+from database.orders import (
+    list_orders_page, list_changes_since, sync_cursor, place_order, OrderError, OutOfStock, DEFAULT_LIMIT
+)
+from database.events import order_bus, sse_messages
+from utils.metrics import init_metrics
 
 app = Flask(__name__)
 app.secret_key = 'pdv_restaurant_secret_key_2024'
 
+# Latência, consultas SQL e tamanho das respostas por rota, em /metrics
+init_metrics(app)
+
+# Duração de cada conexão do stream de pedidos; o navegador reconecta em seguida
+STREAM_SECONDS = 300
+
 # Inicializar banco de dados
 init_db()
 
 def get_db_connection():
-    conn = sqlite3.connect('database/restaurant.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Conexão do pool compartilhado; conn.close() devolve-a ao pool
+    return get_connection(row_factory=sqlite3.Row)
 
 def format_metical(value):
     return f"{value:,.2f} MT"
@@ -22,6 +36,47 @@ def format_metical(value):
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
+def cached_json_response(group, key, build):
+    """Resposta JSON do cache versionado; 304 se o cliente já tem o mesmo ETag"""
+    body, etag = cached_json(group, key, build)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # O navegador guarda a resposta mas revalida sempre (If-None-Match)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def idempotente(view):
+    """Com o cabeçalho Idempotency-Key, uma repetição recebe a resposta guardada"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > idempotency.MAX_KEY_LENGTH:
+            return jsonify({'success': False, 'message': 'Idempotency-Key muito longa'}), 400
+        scope = f"{request.method} {request.path}"
+        state, stored = idempotency.claim(scope, key)
+        if state == idempotency.DONE:
+            status, body = stored
+            response = app.response_class(body, status=status, mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        if state == idempotency.BUSY:
+            return jsonify({'success': False, 'message': 'Requisição em processamento, tente novamente'}), 409
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except BaseException:
+            idempotency.release(scope, key)
+            raise
+        # Só o sucesso é guardado; numa falha nada foi gravado e a repetição executa
+        data = response.get_json(silent=True)
+        if response.status_code < 400 and isinstance(data, dict) and data.get('success'):
+            idempotency.complete(scope, key, response.status_code, response.get_data())
+        else:
+            idempotency.release(scope, key)
+        return response
+    return wrapper
+
 def is_restaurant_open():
     """Verifica se o restaurante está aberto baseado no horário atual"""
     current_time = datetime.now().time()
@@ -80,84 +135,28 @@ def servicos():
 
 @app.route('/api/categorias')
 def get_categorias():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('SELECT id, name FROM categories WHERE active = 1 ORDER BY name')
-    except:
-        # Se não existir coluna active, pega todas as categorias
-        cursor.execute('SELECT id, name FROM categories ORDER BY name')
-    categorias = [{'id': row['id'], 'name': row['name']} for row in cursor.fetchall()]
-    conn.close()
-    return jsonify(categorias)
+    def montar():
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, name FROM categories WHERE is_active = 1 ORDER BY name')
+        categorias = [{'id': row['id'], 'name': row['name']} for row in cursor.fetchall()]
+        conn.close()
+        return categorias
+
+    return cached_json_response('catalogo', 'categorias', montar)
 
 @app.route('/api/produtos')
 def get_produtos():
     categoria_id = request.args.get('categoria_id')
     busca = request.args.get('busca', '')
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    if categoria_id and categoria_id != 'todos':
-        try:
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock, has_variations
-                FROM products 
-                WHERE category_id = ? AND active = 1 AND stock > 0
-                ORDER BY name
-            ''', (categoria_id,))
-        except:
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock, has_variations
-                FROM products 
-                WHERE category_id = ? AND stock > 0
-                ORDER BY name
-            ''', (categoria_id,))
-    else:
-        try:
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock, has_variations
-                FROM products 
-                WHERE active = 1 AND stock > 0
-                ORDER BY name
-            ''')
-        except:
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock, has_variations
-                FROM products 
-                WHERE stock > 0
-                ORDER BY name
-            ''')
-    
-    produtos = cursor.fetchall()
-    conn.close()
-    
-    # Filtrar por busca
-    if busca:
-        produtos = [p for p in produtos if busca.lower() in p['name'].lower()]
-    
-    produtos_json = []
-    for produto in produtos:
-        # Se o produto tem variações, buscar as variações
-        variations = []
-        if produto['has_variations']:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            try:
-                cursor.execute('''
-                    SELECT id, variation_name, price, stock
-                    FROM product_variations 
-                    WHERE product_id = ? AND is_active = 1 AND stock > 0
-                    ORDER BY variation_name
-                ''', (produto['id'],))
-                variations = cursor.fetchall()
-            except:
-                # Se a tabela não existir, não mostrar variações
-                pass
-            conn.close()
-        
-        produtos_json.append({
+    if categoria_id == 'todos':
+        categoria_id = None
+
+    def montar():
+        # Produtos e variações numa única consulta (antes: uma consulta por produto)
+        produtos = get_menu_snapshot(categoria_id, busca, in_stock_only=True)
+
+        produtos_json = [{
             'id': produto['id'],
             'name': produto['name'],
             'description': produto['description'] or 'Sem descrição',
@@ -165,17 +164,18 @@ def get_produtos():
             'price_formatted': format_metical(produto['price']),
             'image_url': produto['image_url'] or '/static/default_product.png',
             'stock': produto['stock'],
-            'has_variations': produto['has_variations'],
+            'has_variations': int(produto['has_variations']),
             'variations': [{
                 'id': v['id'],
-                'name': v['variation_name'],
+                'name': v['name'],
                 'price': v['price'],
                 'price_formatted': format_metical(v['price']),
                 'stock': v['stock']
-            } for v in variations]
-        })
-    
-    return jsonify(produtos_json)
+            } for v in produto['variations']]
+        } for produto in produtos]
+        return produtos_json
+
+    return cached_json_response('catalogo', ('produtos', categoria_id, busca), montar)
 
 @app.route('/api/produto/<int:product_id>/variacoes')
 def get_produto_variacoes(product_id):
@@ -207,6 +207,7 @@ def get_produto_variacoes(product_id):
         return jsonify([])
 
 @app.route('/api/fazer_pedido', methods=['POST'])
+@idempotente
 def fazer_pedido():
     data = request.json
     mesa_id = data.get('mesa_id')
@@ -215,96 +216,24 @@ def fazer_pedido():
     if not itens:
         return jsonify({'success': False, 'message': 'Nenhum item no pedido'})
     
+    # Pedido, itens e baixa de estoque numa só transação; se faltar estoque
+    # de algum item nada é gravado e a resposta diz qual foi
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verificar capacidade da mesa
-        cursor.execute('''
-            SELECT t.capacity, t.status, COUNT(o.id) as active_orders
-            FROM tables t
-            LEFT JOIN orders o ON t.id = o.table_id AND o.status IN ('pendente', 'preparando', 'pronto')
-            WHERE t.id = ?
-            GROUP BY t.id, t.capacity, t.status
-        ''', (mesa_id,))
-        
-        mesa_info = cursor.fetchone()
-        if not mesa_info:
-            return jsonify({'success': False, 'message': 'Mesa não encontrada'})
-        
-        capacity, status, active_orders = mesa_info
-        
-        # Verificar se a mesa está lotada
-        if active_orders >= capacity:
-            return jsonify({
-                'success': False, 
-                'message': f'Mesa lotada! Capacidade: {capacity} pessoas. Pedidos ativos: {active_orders}'
-            })
-        
-        # Criar pedido
-        cursor.execute('''
-            INSERT INTO orders (table_id, status, created_at)
-            VALUES (?, 'pendente', ?)
-        ''', (mesa_id, datetime.now()))
-        
-        order_id = cursor.lastrowid
-        
-        # Adicionar itens
-        total = 0
-        for item in itens:
-            # Verificar se é uma variação ou produto normal
-            if item.get('variation_id'):
-                # É uma variação
-                cursor.execute('''
-                    INSERT INTO order_items (order_id, product_id, quantity, unit_price, notes)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (order_id, item['product_id'], item['quantity'], item['price'], f"Variação: {item.get('variation_name', '')}"))
-                
-                # Baixar estoque da variação
-                cursor.execute('''
-                    UPDATE product_variations 
-                    SET stock = stock - ? 
-                    WHERE id = ?
-                ''', (item['quantity'], item['variation_id']))
-            else:
-                # É um produto normal
-                cursor.execute('''
-                    INSERT INTO order_items (order_id, product_id, quantity, unit_price)
-                    VALUES (?, ?, ?, ?)
-                ''', (order_id, item['product_id'], item['quantity'], item['price']))
-                
-                # Baixar estoque do produto
-                cursor.execute('''
-                    UPDATE products 
-                    SET stock = stock - ? 
-                    WHERE id = ?
-                ''', (item['quantity'], item['product_id']))
-            
-            total += item['price'] * item['quantity']
-        
-        # Atualizar total do pedido
-        cursor.execute('UPDATE orders SET total_amount = ? WHERE id = ?', (total, order_id))
-        
-        # Marcar mesa como ocupada se estiver livre
-        cursor.execute('SELECT status FROM tables WHERE id = ?', (mesa_id,))
-        mesa_status = cursor.fetchone()['status']
-        if mesa_status == 'livre':
-            cursor.execute('UPDATE tables SET status = ? WHERE id = ?', ('ocupada', mesa_id))
-        
-        conn.commit()
-        conn.close()
-        
-        return jsonify({
-            'success': True, 
-            'message': f'Pedido #{order_id} criado com sucesso!',
-            'order_id': order_id,
-            'total': format_metical(total)
-        })
-        
+        order_id, total = place_order(mesa_id, itens)
+    except OutOfStock as e:
+        return jsonify({'success': False, 'message': str(e), 'item': e.as_dict()})
+    except OrderError as e:
+        return jsonify({'success': False, 'message': str(e)})
     except Exception as e:
-        conn.rollback()
-        conn.close()
         return jsonify({'success': False, 'message': f'Erro ao criar pedido: {str(e)}'})
+    
+    order_bus.notify()
+    return jsonify({
+        'success': True, 
+        'message': f'Pedido #{order_id} criado com sucesso!',
+        'order_id': order_id,
+        'total': format_metical(total)
+    })
 
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -344,60 +273,83 @@ def funcionario_pedidos():
     
     return render_template('funcionario_pedidos.html')
 
+def pedido_json(pedido):
+    return {
+        'id': pedido['id'],
+        'status': pedido['status'],
+        'created_at': pedido['created_at'],
+        'total': pedido['total'],
+        'total_formatted': format_metical(pedido['total']),
+        'observations': '',  # Campo não existe na tabela
+        'table_name': f"Mesa {pedido['table_number']}" if pedido['table_number'] else 'Balcão'
+    }
+
 @app.route('/api/pedidos')
 def get_pedidos():
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': 'Não autorizado'})
     
-    status_filter = request.args.get('status', '')
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # ?since=<cursor>: só o que mudou depois do cursor, com os ids apagados
+    since = request.args.get('since')
+    if since:
+        try:
+            pedidos, removidos, cursor, mais = list_changes_since(since)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        return jsonify({
+            'pedidos': [pedido_json(pedido) for pedido in pedidos],
+            'removidos': removidos,
+            'cursor': cursor,
+            'mais': mais
+        })
     
-    if status_filter:
-        cursor.execute('''
-            SELECT o.id, o.status, o.created_at,
-                   t.number as table_number
-            FROM orders o
-            LEFT JOIN tables t ON o.table_id = t.id
-            WHERE o.status = ?
-            ORDER BY o.created_at DESC
-        ''', (status_filter,))
-    else:
-        cursor.execute('''
-            SELECT o.id, o.status, o.created_at,
-                   t.number as table_number
-            FROM orders o
-            LEFT JOIN tables t ON o.table_id = t.id
-            ORDER BY o.created_at DESC
-        ''')
+    status_filter = request.args.get('status', '')
+    # Lido antes da listagem, para que nada escape entre as duas leituras
+    cursor_sync = sync_cursor()
     
-    pedidos = cursor.fetchall()
+    # Página de pedidos (em andamento + recentes, salvo ?historico=1) com o
+    # total de cada pedido somado na mesma consulta
+    try:
+        pedidos, proximo_cursor = list_orders_page(
+            status=status_filter or None,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', DEFAULT_LIMIT),
+            history=request.args.get('historico') == '1'
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    pedidos_json = [pedido_json(pedido) for pedido in pedidos]
+    
+    response = jsonify(pedidos_json)
+    # O corpo continua sendo a lista; o cursor da próxima página vai no cabeçalho
+    if proximo_cursor:
+        response.headers['X-Next-Cursor'] = proximo_cursor
+    response.headers['X-Sync-Cursor'] = cursor_sync
+    return response
+
+@app.route('/api/pedidos/stream')
+def pedidos_stream():
+    """Server-Sent Events com pedidos criados, status alterados e pagamentos"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 401
     
-    pedidos_json = []
-    for pedido in pedidos:
-        # Calcular total dos itens do pedido
-        cursor.execute('''
-            SELECT SUM(quantity * unit_price) as total
-            FROM order_items 
-            WHERE order_id = ?
-        ''', (pedido['id'],))
-        
-        total_result = cursor.fetchone()
-        total = total_result['total'] if total_result['total'] else 0
-        
-        pedidos_json.append({
-            'id': pedido['id'],
-            'status': pedido['status'],
-            'created_at': pedido['created_at'],
-            'total': total,
-            'total_formatted': format_metical(total),
-            'observations': '',  # Campo não existe na tabela
-            'table_name': f"Mesa {pedido['table_number']}" if pedido['table_number'] else 'Balcão'
-        })
+    # Na reconexão o navegador informa o último evento recebido
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    
+    def gerar():
+        yield 'retry: 3000\n\n'
+        for lote in order_bus.listen(last_event_id, duration=STREAM_SECONDS):
+            if lote:
+                yield from sse_messages(lote, pedido_json)
+            else:
+                yield ': ping\n\n'
     
-    conn.close()
-    return jsonify(pedidos_json)
+    return Response(gerar(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/pedido/<int:pedido_id>/itens')
 def get_pedido_itens(pedido_id):
@@ -483,6 +435,7 @@ def atualizar_status_pedido(pedido_id):
                     cursor.execute('UPDATE tables SET status = ? WHERE id = ?', ('livre', table_id))
         
         conn.commit()
+        order_bus.notify()
         conn.close()
         
         return jsonify({'success': True, 'message': f'Status atualizado para {novo_status}'})
@@ -512,15 +465,15 @@ def get_restaurant_status_api():
 
 @app.route('/api/mesas')
 def get_mesas():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute('SELECT id, number, capacity, status FROM tables WHERE active = 1 ORDER BY number')
-    except:
+    def montar():
+        conn = get_db_connection()
+        cursor = conn.cursor()
         cursor.execute('SELECT id, number, capacity, status FROM tables ORDER BY number')
-    mesas = [{'id': row['id'], 'name': f'Mesa {row["number"]}', 'capacity': row['capacity'], 'status': row['status']} for row in cursor.fetchall()]
-    conn.close()
-    return jsonify(mesas)
+        mesas = [{'id': row['id'], 'name': f'Mesa {row["number"]}', 'capacity': row['capacity'], 'status': row['status']} for row in cursor.fetchall()]
+        conn.close()
+        return mesas
+
+    return cached_json_response('mesas', 'mesas', montar)
 
 @app.route('/logout')
 def logout():
@@ -528,6 +481,7 @@ def logout():
     return redirect('/')
 
 @app.route('/api/pedido/<int:order_id>/pagar', methods=['POST'])
+@idempotente
 def process_payment(order_id):
     try:
         data = request.get_json()
@@ -537,7 +491,7 @@ def process_payment(order_id):
         if not payment_method:
             return jsonify({'success': False, 'message': 'Método de pagamento não fornecido'})
         
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Buscar informações do pedido
@@ -574,6 +528,7 @@ def process_payment(order_id):
             cursor.execute('UPDATE tables SET status = "livre" WHERE id = ?', (table_id,))
         
         conn.commit()
+        order_bus.notify()
         conn.close()
         
         return jsonify({'success': True, 'message': 'Pagamento processado com sucesso'})
@@ -582,6 +537,7 @@ def process_payment(order_id):
         return jsonify({'success': False, 'message': str(e)})
 
 @app.route('/api/pedido/<int:order_id>/finalizar-venda', methods=['POST'])
+@idempotente
 def finalize_sale(order_id):
     try:
         print(f"[DEBUG] Finalizando venda para pedido {order_id}")
@@ -594,7 +550,7 @@ def finalize_sale(order_id):
         if not payment_method:
             return jsonify({'success': False, 'message': 'Método de pagamento não fornecido'})
         
-        conn = sqlite3.connect('database/restaurant.db')
+        conn = get_connection()
         cursor = conn.cursor()
         
         # Buscar informações do pedido
@@ -636,6 +592,7 @@ def finalize_sale(order_id):
             print(f"[DEBUG] Mesa {table_id} liberada")
         
         conn.commit()
+        order_bus.notify()
         conn.close()
         
         print(f"[DEBUG] Venda finalizada com sucesso")
@@ -645,6 +602,18 @@ def finalize_sale(order_id):
         print(f"[ERROR] Erro ao finalizar venda: {e}")
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/admin/consultas-lentas', methods=['GET', 'DELETE'])
+def consultas_lentas():
+    """Ranking das consultas SQL mais lentas deste worker, com parâmetros e plano"""
+    if session.get('user_role') != 'admin':
+        return jsonify({'success': False, 'message': 'Não autorizado'}), 403
+    if request.method == 'DELETE':
+        tracing.reset_slow_queries()
+    return jsonify({
+        'threshold_ms': tracing.SLOW_QUERY_MS,
+        'queries': tracing.slow_queries(request.args.get('limit', type=int))
+    })
+
 if __name__ == '__main__':
     # Criar pasta templates se não existir
     if not os.path.exists('templates'):
@@ -5,7 +5,7 @@ import hashlib
 from datetime import datetime, time
 import os
 import logging
-from database.db import init_db
+from database.db import init_db, get_connection
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -30,9 +30,7 @@ except Exception as e:
 def get_db_connection():
     """Conexão com o banco de dados SQLite"""
     try:
-        conn = sqlite3.connect('database/restaurant.db')
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_connection(row_factory=sqlite3.Row)
     except Exception as e:
         logger.error(f"Erro ao conectar com banco: {e}")
         raise
@@ -1,18 +1,26 @@
-from flask import Flask, request, jsonify, session, send_from_directory
+from flask import Flask, Response, request, jsonify, session, send_from_directory
 from flask_cors import CORS
 import sqlite3
 import hashlib
+from functools import wraps
 from datetime import datetime, time
 import os
 import logging
-from database.db import init_db
+from database.db import init_db, get_connection
+from database.cache import cached_json
+from database import idempotency, tracing
+from database.orders import (
+    list_orders_page, list_changes_since, sync_cursor, place_order, OrderError, OutOfStock, DEFAULT_LIMIT
+)
+from database.events import order_bus, sse_messages
+from utils.metrics import init_metrics
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder='static')
-CORS(app, supports_credentials=True, origins=['*'])
+CORS(app, supports_credentials=True, origins=['*'], expose_headers=['X-Next-Cursor', 'X-Sync-Cursor', 'Idempotent-Replayed'])
 
 # Configurações para produção
 app.secret_key = os.environ.get('SECRET_KEY', 'pdv_restaurant_secret_key_2024')
@@ -20,6 +28,12 @@ app.config['SESSION_COOKIE_SECURE'] = os.environ.get('FLASK_ENV') == 'production
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 
+# Latência, consultas SQL e tamanho das respostas por rota, em /metrics
+init_metrics(app)
+
+# Duração de cada conexão do stream de pedidos; o navegador reconecta em seguida
+STREAM_SECONDS = 300
+
 # Inicializar banco de dados
 try:
     init_db()
@@ -30,9 +44,7 @@ except Exception as e:
 def get_db_connection():
     """Conexão com o banco de dados SQLite"""
     try:
-        conn = sqlite3.connect('database/restaurant.db')
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_connection(row_factory=sqlite3.Row)
     except Exception as e:
         logger.error(f"Erro ao conectar com banco: {e}")
         raise
@@ -45,6 +57,47 @@ def hash_password(password):
     """Hash da senha usando SHA256"""
     return hashlib.sha256(password.encode()).hexdigest()
 
+def cached_json_response(group, key, build):
+    """Resposta JSON do cache versionado; 304 se o cliente já tem o mesmo ETag"""
+    body, etag = cached_json(group, key, build)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # O navegador guarda a resposta mas revalida sempre (If-None-Match)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def idempotente(view):
+    """Com o cabeçalho Idempotency-Key, uma repetição recebe a resposta guardada"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > idempotency.MAX_KEY_LENGTH:
+            return jsonify({'success': False, 'message': 'Idempotency-Key muito longa'}), 400
+        scope = f"{request.method} {request.path}"
+        state, stored = idempotency.claim(scope, key)
+        if state == idempotency.DONE:
+            status, body = stored
+            response = app.response_class(body, status=status, mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        if state == idempotency.BUSY:
+            return jsonify({'success': False, 'message': 'Requisição em processamento, tente novamente'}), 409
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except BaseException:
+            idempotency.release(scope, key)
+            raise
+        # Só o sucesso é guardado; numa falha nada foi gravado e a repetição executa
+        data = response.get_json(silent=True)
+        if response.status_code < 400 and isinstance(data, dict) and data.get('success'):
+            idempotency.complete(scope, key, response.status_code, response.get_data())
+        else:
+            idempotency.release(scope, key)
+        return response
+    return wrapper
+
 # Rotas de páginas estáticas
 @app.route('/styles.css')
 def styles():
@@ -154,12 +207,15 @@ def api_info():
 def get_categorias():
     """Retorna todas as categorias"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name FROM categories ORDER BY name')
-        categorias = [{'id': row['id'], 'name': row['name']} for row in cursor.fetchall()]
-        conn.close()
-        return jsonify(categorias)
+        def montar():
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, name FROM categories ORDER BY name')
+            categorias = [{'id': row['id'], 'name': row['name']} for row in cursor.fetchall()]
+            conn.close()
+            return categorias
+
+        return cached_json_response('catalogo', 'categorias', montar)
     except Exception as e:
         logger.error(f"Erro ao buscar categorias: {e}")
         return jsonify({'error': str(e)}), 500
@@ -168,31 +224,34 @@ def get_categorias():
 def get_produtos():
     """Retorna todos os produtos ativos"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT p.id, p.name, p.description, p.price, p.stock, p.image_url, 
-                   c.name as category_name
-            FROM products p
-            LEFT JOIN categories c ON p.category_id = c.id
-            WHERE p.is_active = 1 AND p.stock > 0
-            ORDER BY p.name
-        ''')
-        produtos = []
-        for row in cursor.fetchall():
-            produtos.append({
-                'id': row['id'],
-                'name': row['name'],
-                'description': row['description'] or '',
-                'price': row['price'],
-                'price_formatted': format_metical(row['price']),
-                'stock': row['stock'],
-                'image_url': row['image_url'],
-                'category': row['category_name'] or 'Sem categoria',
-                'has_variations': False
-            })
-        conn.close()
-        return jsonify(produtos)
+        def montar():
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT p.id, p.name, p.description, p.price, p.stock, p.image_url, 
+                       c.name as category_name
+                FROM products p
+                LEFT JOIN categories c ON p.category_id = c.id
+                WHERE p.is_active = 1 AND p.stock > 0
+                ORDER BY p.name
+            ''')
+            produtos = []
+            for row in cursor.fetchall():
+                produtos.append({
+                    'id': row['id'],
+                    'name': row['name'],
+                    'description': row['description'] or '',
+                    'price': row['price'],
+                    'price_formatted': format_metical(row['price']),
+                    'stock': row['stock'],
+                    'image_url': row['image_url'],
+                    'category': row['category_name'] or 'Sem categoria',
+                    'has_variations': False
+                })
+            conn.close()
+            return produtos
+
+        return cached_json_response('catalogo', 'produtos', montar)
     except Exception as e:
         logger.error(f"Erro ao buscar produtos: {e}")
         return jsonify({'error': str(e)}), 500
@@ -201,24 +260,28 @@ def get_produtos():
 def get_mesas():
     """Retorna todas as mesas"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, number, capacity, status FROM tables ORDER BY number')
-        mesas = []
-        for row in cursor.fetchall():
-            mesas.append({
-                'id': row['id'],
-                'name': f"Mesa {row['number']}",
-                'capacity': row['capacity'],
-                'status': row['status']
-            })
-        conn.close()
-        return jsonify(mesas)
+        def montar():
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT id, number, capacity, status FROM tables ORDER BY number')
+            mesas = []
+            for row in cursor.fetchall():
+                mesas.append({
+                    'id': row['id'],
+                    'name': f"Mesa {row['number']}",
+                    'capacity': row['capacity'],
+                    'status': row['status']
+                })
+            conn.close()
+            return mesas
+
+        return cached_json_response('mesas', 'mesas', montar)
     except Exception as e:
         logger.error(f"Erro ao buscar mesas: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/fazer_pedido', methods=['POST'])
+@idempotente
 def fazer_pedido():
     """Cria um novo pedido"""
     try:
@@ -229,58 +292,11 @@ def fazer_pedido():
         if not itens:
             return jsonify({'success': False, 'message': 'Nenhum item no pedido'}), 400
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Criar pedido
-        cursor.execute('''
-            INSERT INTO orders (table_id, status, created_at) 
-            VALUES (?, "pendente", ?)
-        ''', (mesa_id, datetime.now()))
-        order_id = cursor.lastrowid
-        total = 0
-        
-        # Adicionar itens
-        for item in itens:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity', 1)
-            
-            cursor.execute('SELECT price, stock FROM products WHERE id = ?', (product_id,))
-            product = cursor.fetchone()
-            if product:
-                unit_price = product['price']
-                item_total = unit_price * quantity
-                total += item_total
-                
-                # Verificar estoque
-                if product['stock'] < quantity:
-                    conn.rollback()
-                    conn.close()
-                    return jsonify({
-                        'success': False, 
-                        'message': f'Estoque insuficiente para o produto ID {product_id}'
-                    }), 400
-                
-                # Inserir item do pedido
-                cursor.execute('''
-                    INSERT INTO order_items (order_id, product_id, quantity, unit_price) 
-                    VALUES (?, ?, ?, ?)
-                ''', (order_id, product_id, quantity, unit_price))
-                
-                # Atualizar estoque
-                cursor.execute('''
-                    UPDATE products SET stock = stock - ? WHERE id = ?
-                ''', (quantity, product_id))
-        
-        # Atualizar total do pedido
-        cursor.execute('UPDATE orders SET total_amount = ? WHERE id = ?', (total, order_id))
-        
-        # Atualizar status da mesa
-        if mesa_id:
-            cursor.execute('UPDATE tables SET status = ? WHERE id = ?', ('ocupada', mesa_id))
-        
-        conn.commit()
-        conn.close()
+        # O preço vem do banco, não do cliente; pedido, itens e baixa de
+        # estoque numa só transação
+        itens = [{'product_id': item.get('product_id'), 'quantity': item.get('quantity', 1)} for item in itens]
+        order_id, total = place_order(mesa_id, itens, check_capacity=False)
+        order_bus.notify()
         
         logger.info(f"Pedido {order_id} criado com sucesso - Total: {total}")
         return jsonify({
@@ -290,6 +306,10 @@ def fazer_pedido():
             'message': 'Pedido criado com sucesso!'
         })
         
+    except OutOfStock as e:
+        return jsonify({'success': False, 'message': str(e), 'item': e.as_dict()}), 400
+    except OrderError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         logger.error(f"Erro ao criar pedido: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -384,50 +404,86 @@ def get_user_info():
         logger.error(f"Erro ao buscar usuário: {e}")
         return jsonify({'logged_in': False, 'error': str(e)}), 500
 
+def pedido_json(pedido):
+    """Formato de um pedido nas telas da equipe"""
+    return {
+        'id': pedido['id'],
+        'status': pedido['status'],
+        'total': pedido['total'],
+        'total_formatted': format_metical(pedido['total']),
+        'created_at': pedido['created_at'],
+        'table_name': f"Mesa {pedido['table_number']}" if pedido['table_number'] else 'Balcão',
+        'table_number': pedido['table_number'],
+        'capacity': pedido['table_capacity'],
+        'observations': pedido['notes'] or ''
+    }
+
 @app.route('/api/pedidos')
 def get_pedidos():
-    """Retorna todos os pedidos"""
+    """Retorna uma página de pedidos (em andamento e recentes, salvo ?historico=1)"""
     if 'user_id' not in session:
         return jsonify({'error': 'Usuário não logado'}), 401
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        # ?since=<cursor>: só o que mudou depois do cursor, com os ids apagados
+        since = request.args.get('since')
+        if since:
+            pedidos, removidos, cursor, mais = list_changes_since(since)
+            return jsonify({
+                'pedidos': [pedido_json(pedido) for pedido in pedidos],
+                'removidos': removidos,
+                'cursor': cursor,
+                'mais': mais
+            })
         
-        cursor.execute('''
-            SELECT o.id, o.status, o.total_amount, o.created_at, o.notes,
-                   t.number as table_number, t.capacity,
-                   CASE 
-                       WHEN t.number IS NOT NULL THEN 'Mesa ' || t.number
-                       ELSE 'Balcão'
-                   END as table_name
-            FROM orders o
-            LEFT JOIN tables t ON o.table_id = t.id
-            ORDER BY o.created_at DESC
-        ''')
+        # Lido antes da listagem, para que nada escape entre as duas leituras
+        cursor_sync = sync_cursor()
+        pedidos, proximo_cursor = list_orders_page(
+            status=request.args.get('status') or None,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', DEFAULT_LIMIT),
+            history=request.args.get('historico') == '1'
+        )
         
-        pedidos = []
-        for row in cursor.fetchall():
-            pedido = {
-                'id': row['id'],
-                'status': row['status'],
-                'total': row['total_amount'] or 0,
-                'total_formatted': format_metical(row['total_amount'] or 0),
-                'created_at': row['created_at'],
-                'table_name': row['table_name'],
-                'table_number': row['table_number'],
-                'capacity': row['capacity'],
-                'observations': row['notes'] or ''
-            }
-            pedidos.append(pedido)
+        pedidos_json = [pedido_json(pedido) for pedido in pedidos]
         
-        conn.close()
-        return jsonify(pedidos)
+        response = jsonify(pedidos_json)
+        # O corpo continua sendo a lista; o cursor da próxima página vai no cabeçalho
+        if proximo_cursor:
+            response.headers['X-Next-Cursor'] = proximo_cursor
+        response.headers['X-Sync-Cursor'] = cursor_sync
+        return response
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erro ao buscar pedidos: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/pedidos/stream')
+def pedidos_stream():
+    """Server-Sent Events com pedidos criados, status alterados e pagamentos"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Usuário não logado'}), 401
+    
+    # Na reconexão o navegador informa o último evento recebido
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    
+    def gerar():
+        yield 'retry: 3000\n\n'
+        for lote in order_bus.listen(last_event_id, duration=STREAM_SECONDS):
+            if lote:
+                yield from sse_messages(lote, pedido_json)
+            else:
+                # Comentário SSE: mantém a conexão viva (o roteador do Heroku corta após 55 s)
+                yield ': ping\n\n'
+    
+    return Response(gerar(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/logout')
 def logout():
     """Logout do usuário"""
@@ -435,6 +491,18 @@ def logout():
     return jsonify({'success': True, 'message': 'Logout realizado com sucesso'})
 
 # Error handlers
+@app.route('/api/admin/consultas-lentas', methods=['GET', 'DELETE'])
+def consultas_lentas():
+    """Ranking das consultas SQL mais lentas deste worker, com parâmetros e plano"""
+    if session.get('role') != 'admin':
+        return jsonify({'error': 'Não autorizado'}), 403
+    if request.method == 'DELETE':
+        tracing.reset_slow_queries()
+    return jsonify({
+        'threshold_ms': tracing.SLOW_QUERY_MS,
+        'queries': tracing.slow_queries(request.args.get('limit', type=int))
+    })
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint não encontrado'}), 404
@@ -4,7 +4,8 @@ import sqlite3
 import hashlib
 from datetime import datetime, time
 import os
-from database.db import init_db
+from database.db import init_db, get_connection
+from database.models import get_menu_snapshot
 
 app = Flask(__name__, static_folder='static')
 CORS(app, supports_credentials=True)  # Permitir CORS com credenciais
@@ -21,10 +22,8 @@ except Exception as e:
     print(f"⚠️ Erro ao inicializar banco: {e}")
 
 def get_db_connection():
-    # Usar o mesmo banco que o sistema principal
-    conn = sqlite3.connect('database/restaurant.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Usar o mesmo banco que o sistema principal (pool compartilhado)
+    return get_connection(row_factory=sqlite3.Row)
 
 def format_metical(value):
     return f"{value:,.2f} MT"
@@ -149,66 +148,33 @@ def get_categorias():
 def get_produtos():
     categoria_id = request.args.get('categoria_id')
     busca = request.args.get('busca', '')
-    
+    if categoria_id == 'todos':
+        categoria_id = None
+
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if categoria_id and categoria_id != 'todos':
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock, has_variations
-                FROM products 
-                WHERE category_id = ? AND is_active = 1 AND stock > 0
-                ORDER BY name
-            ''', (categoria_id,))
-        else:
-            cursor.execute('''
-                SELECT id, name, description, price, image_url, stock, has_variations
-                FROM products 
-                WHERE is_active = 1 AND stock > 0
-                ORDER BY name
-            ''')
-        
-        produtos = cursor.fetchall()
-        
-        # Filtrar por busca
-        if busca:
-            produtos = [p for p in produtos if busca.lower() in p['name'].lower()]
-        
-        produtos_json = []
-        for produto in produtos:
-            # Se o produto tem variações, buscar as variações
-            variations = []
-            if produto['has_variations']:
-                cursor.execute('''
-                    SELECT id, variation_name, price, stock
-                    FROM product_variations 
-                    WHERE product_id = ? AND is_active = 1 AND stock > 0
-                    ORDER BY variation_name
-                ''', (produto['id'],))
-                variations = cursor.fetchall()
-            
-            produtos_json.append({
-                'id': produto['id'],
-                'name': produto['name'],
-                'description': produto['description'] or 'Sem descrição',
-                'price': produto['price'],
-                'price_formatted': format_metical(produto['price']),
-                'image_url': produto['image_url'] or '/static/default_product.png',
-                'stock': produto['stock'],
-                'has_variations': produto['has_variations'],
-                'variations': [{
-                    'id': v['id'],
-                    'name': v['variation_name'],
-                    'price': v['price'],
-                    'price_formatted': format_metical(v['price']),
-                    'stock': v['stock']
-                } for v in variations]
-            })
-        
-        conn.close()
+        # Produtos e variações numa única consulta (antes: uma consulta por produto)
+        produtos = get_menu_snapshot(categoria_id, busca, in_stock_only=True)
+
+        produtos_json = [{
+            'id': produto['id'],
+            'name': produto['name'],
+            'description': produto['description'] or 'Sem descrição',
+            'price': produto['price'],
+            'price_formatted': format_metical(produto['price']),
+            'image_url': produto['image_url'] or '/static/default_product.png',
+            'stock': produto['stock'],
+            'has_variations': int(produto['has_variations']),
+            'variations': [{
+                'id': v['id'],
+                'name': v['name'],
+                'price': v['price'],
+                'price_formatted': format_metical(v['price']),
+                'stock': v['stock']
+            } for v in produto['variations']]
+        } for produto in produtos]
+
         return jsonify(produtos_json)
-        
+
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 